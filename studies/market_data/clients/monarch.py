@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable
+
+from studies.market_data.config import MONARCH_LOOKUP_BATCH_SIZE, MONARCH_MARKETS_PAGE_SIZE
+from studies.market_data.env import monarch_api_key, monarch_api_url
+from studies.market_data.http import json_post
+
+
+MONARCH_MARKETS_QUERY = """
+query EnvioMarketsPage($limit: Int!, $offset: Int!, $zeroAddress: String!) {
+  Market(
+    where: {
+      collateralToken: { _neq: $zeroAddress }
+      irm: { _neq: $zeroAddress }
+    }
+    limit: $limit
+    offset: $offset
+    order_by: [{ chainId: asc }, { marketId: asc }]
+  ) {
+    chainId
+    marketId
+    collateralToken
+    oracle
+  }
+}
+"""
+
+
+# Same universe filters as MONARCH_MARKETS_QUERY, restricted to known market IDs on one chain.
+MONARCH_MARKETS_BY_ID_QUERY = """
+query EnvioMarketsById($chainId: Int!, $marketIds: [String!]!, $zeroAddress: String!) {
+  Market(
+    where: {
+      chainId: { _eq: $chainId }
+      marketId: { _in: $marketIds }
+      collateralToken: { _neq: $zeroAddress }
+      irm: { _neq: $zeroAddress }
+    }
+  ) {
+    chainId
+    marketId
+    collateralToken
+    oracle
+  }
+}
+"""
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def _headers() -> dict[str, str]:
+    api_key = monarch_api_key()
+    return {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+
+def _add_oracles(markets: dict[tuple[int, str], str], rows: list[dict]) -> None:
+    for row in rows:
+        chain_id = int(row["chainId"])
+        unique_key = row["marketId"].lower()
+        oracle_address = (row.get("oracle") or "").lower()
+        if oracle_address:
+            markets[(chain_id, unique_key)] = oracle_address
+
+
+def fetch_monarch_market_universe() -> dict[tuple[int, str], str]:
+    api_url = monarch_api_url()
+    headers = _headers()
+
+    markets: dict[tuple[int, str], str] = {}
+    offset = 0
+    while True:
+        result = json_post(
+            api_url,
+            {
+                "query": MONARCH_MARKETS_QUERY,
+                "variables": {
+                    "limit": MONARCH_MARKETS_PAGE_SIZE,
+                    "offset": offset,
+                    "zeroAddress": ZERO_ADDRESS,
+                },
+            },
+            headers=headers,
+        )
+        rows = result.get("data", {}).get("Market", [])
+        if not rows:
+            break
+
+        _add_oracles(markets, rows)
+
+        if len(rows) < MONARCH_MARKETS_PAGE_SIZE:
+            break
+        offset += len(rows)
+
+    return markets
+
+
+# Oracle addresses for specific (chain_id, unique_key) markets, looked up in
+# `marketId _in` batches instead of paging the whole indexer universe.
+def fetch_monarch_market_oracles(keys: Iterable[tuple[int, str]]) -> dict[tuple[int, str], str]:
+    api_url = monarch_api_url()
+    headers = _headers()
+    ids_by_chain: dict[int, list[str]] = defaultdict(list)
+    for chain_id, unique_key in dict.fromkeys(keys):
+        ids_by_chain[int(chain_id)].append(unique_key.lower())
+
+    markets: dict[tuple[int, str], str] = {}
+    for chain_id, market_ids in sorted(ids_by_chain.items()):
+        for start in range(0, len(market_ids), MONARCH_LOOKUP_BATCH_SIZE):
+            result = json_post(
+                api_url,
+                {
+                    "query": MONARCH_MARKETS_BY_ID_QUERY,
+                    "variables": {
+                        "chainId": chain_id,
+                        "marketIds": market_ids[start:start + MONARCH_LOOKUP_BATCH_SIZE],
+                        "zeroAddress": ZERO_ADDRESS,
+                    },
+                },
+                headers=headers,
+            )
+            if result.get("errors"):
+                raise RuntimeError(f"Monarch market lookup failed: {result['errors']}")
+            _add_oracles(markets, result.get("data", {}).get("Market", []))
+    return markets
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator
+
+from studies.market_data.config import (
+    HISTORY_CHUNK_DAYS,
+    HISTORY_CHUNK_WORKERS,
+    HISTORY_INTERVAL_SECONDS,
+    MORPHO_API_URL,
+    MORPHO_MARKETS_PAGE_SIZE,
+)
+from studies.market_data.http import json_post, post_json_bytes
+from studies.market_data.models import MarketRef
+
+
+MORPHO_MARKETS_QUERY = """
+query getMarkets($first: Int, $skip: Int, $where: MarketFilters) {
+  markets(first: $first, skip: $skip, where: $where) {
+    items {
+      uniqueKey
+      oracle {
+        address
+      }
+      morphoBlue {
+        chain {
+          id
+        }
+      }
+      loanAsset {
+        address
+        symbol
+        decimals
+      }
+      collateralAsset {
+        address
+        symbol
+        decimals
+      }
+      state {
+        borrowAssets
+        supplyAssets
+        borrowAssetsUsd
+        supplyAssetsUsd
+      }
+    }
+    pageInfo {
+      countTotal
+    }
+  }
+}
+"""
+
+MARKET_HISTORICAL_DATA_QUERY = """
+query getMarketHistoricalData($uniqueKey: String!, $options: TimeseriesOptions!, $chainId: Int) {
+  marketByUniqueKey(uniqueKey: $uniqueKey, chainId: $chainId) {
+    historicalState {
+      supplyAssetsUsd(options: $options) {
+        x
+        y
+      }
+      borrowAssetsUsd(options: $options) {
+        x
+        y
+      }
+      supplyAssets(options: $options) {
+        x
+        y
+      }
+      borrowAssets(options: $options) {
+        x
+        y
+      }
+    }
+  }
+}
+"""
+
+
+# Yields one parsed page at a time so callers can start work before the chain is fully paged.
+def iter_morpho_market_pages(chain_id: int) -> Iterator[list[MarketRef]]:
+    skip = 0
+    total = None
+
+    while True:
+        result = json_post(
+            MORPHO_API_URL,
+            {
+                "query": MORPHO_MARKETS_QUERY,
+                "variables": {
+                    "first": MORPHO_MARKETS_PAGE_SIZE,
+                    "skip": skip,
+                    "where": {"chainId_in": [chain_id]},
+                },
+            },
+        )
+        page = result.get("data", {}).get("markets", {})
+        items = page.get("items", [])
+        total = page.get("pageInfo", {}).get("countTotal", total)
+        if not items:
+            break
+
+        markets: list[MarketRef] = []
+        for item in items:
+            loan_asset = item.get("loanAsset") or {}
+            collateral_asset = item.get("collateralAsset") or {}
+            state = item.get("state") or {}
+            oracle = item.get("oracle") or {}
+            if not loan_asset.get("address") or not collateral_asset.get("address"):
+                continue
+            markets.append(
+                MarketRef(
+                    unique_key=item["uniqueKey"].lower(),
+                    chain_id=int(item["morphoBlue"]["chain"]["id"]),
+                    oracle_address=(oracle.get("address") or "").lower(),
+                    loan_asset_address=loan_asset["address"].lower(),
+                    loan_asset_symbol=loan_asset.get("symbol") or "UNKNOWN",
+                    loan_asset_decimals=int(loan_asset.get("decimals") or 18),
+                    collateral_asset_address=collateral_asset["address"].lower(),
+                    collateral_asset_symbol=collateral_asset.get("symbol") or "UNKNOWN",
+                    supply_assets=state.get("supplyAssets"),
+                    borrow_assets=state.get("borrowAssets"),
+                    supply_assets_usd=float(state.get("supplyAssetsUsd") or 0),
+                    borrow_assets_usd=float(state.get("borrowAssetsUsd") or 0),
+                )
+            )
+        yield markets
+
+        skip += len(items)
+        if total is not None and skip >= total:
+            break
+
+
+def fetch_morpho_markets_for_chain(chain_id: int) -> list[MarketRef]:
+    return [market for page in iter_morpho_market_pages(chain_id) for market in page]
+
+
+def history_windows(days: int, interval: str = "DAY", end: datetime | None = None) -> list[tuple[int, int]]:
+    if interval not in HISTORY_INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported history interval: {interval}")
+    end_ts = int((end or datetime.now(timezone.utc)).timestamp())
+    start_ts = end_ts - int(timedelta(days=days).total_seconds())
+    chunk_seconds = int(timedelta(days=HISTORY_CHUNK_DAYS[interval]).total_seconds())
+    windows: list[tuple[int, int]] = []
+    chunk_start = start_ts
+    while chunk_start < end_ts:
+        chunk_end = min(chunk_start + chunk_seconds, end_ts)
+        windows.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    return windows
+
+
+def history_window_payload(unique_key: str, chain_id: int, start_ts: int, end_ts: int, interval: str = "DAY") -> dict:
+    return {
+        "query": MARKET_HISTORICAL_DATA_QUERY,
+        "variables": {
+            "uniqueKey": unique_key,
+            "chainId": chain_id,
+            "options": {
+                "startTimestamp": start_ts,
+                "endTimestamp": end_ts,
+                "interval": interval,
+            },
+        },
+    }
+
+
+def parse_market_history_window(result: dict | bytes) -> list[dict]:
+    if isinstance(result, bytes):
+        result = json.loads(result)
+    historical = result.get("data", {}).get("marketByUniqueKey", {}).get("historicalState", {})
+    by_ts: dict[int, dict] = {}
+    for field in ("supplyAssets", "borrowAssets", "supplyAssetsUsd", "borrowAssetsUsd"):
+        for point in historical.get(field, []) or []:
+            ts = int(point["x"])
+            row = by_ts.setdefault(ts, {"timestamp": ts})
+            row[field] = point.get("y")
+    return [by_ts[key] for key in sorted(by_ts)]
+
+
+def fetch_market_history_window(unique_key: str, chain_id: int, start_ts: int, end_ts: int, interval: str = "DAY") -> list[dict]:
+    return parse_market_history_window(json_post(MORPHO_API_URL, history_window_payload(unique_key, chain_id, start_ts, end_ts, interval)))
+
+
+# Chunks in time order, dropping timestamps repeated on chunk boundaries.
+def merge_history_chunks(chunks: Iterable[list[dict]]) -> Iterator[dict]:
+    last_ts: int | None = None
+    for rows in chunks:
+        for row in rows:
+            if last_ts is not None and row["timestamp"] <= last_ts:
+                continue
+            last_ts = row["timestamp"]
+            yield row
+
+
+# Long windows are split into chunks fetched concurrently and yielded in time order.
+def iter_market_history(
+    unique_key: str,
+    chain_id: int,
+    days: int = 180,
+    interval: str = "DAY",
+    max_workers: int = HISTORY_CHUNK_WORKERS,
+) -> Iterator[dict]:
+    windows = history_windows(days, interval)
+    if len(windows) == 1:
+        yield from fetch_market_history_window(unique_key, chain_id, *windows[0], interval=interval)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(windows))) as executor:
+        yield from merge_history_chunks(
+            executor.map(lambda window: fetch_market_history_window(unique_key, chain_id, *window, interval=interval), windows)
+        )
+
+
+# Undecoded response bodies of every chunk, in time order; parse_market_history_window
+# and merge_history_chunks turn them into the rows fetch_market_history returns.
+def fetch_market_history_bodies(
+    unique_key: str,
+    chain_id: int,
+    days: int = 180,
+    interval: str = "DAY",
+    max_workers: int = HISTORY_CHUNK_WORKERS,
+) -> list[bytes]:
+    windows = history_windows(days, interval)
+    payloads = [history_window_payload(unique_key, chain_id, *window, interval=interval) for window in windows]
+    if len(payloads) == 1:
+        return [post_json_bytes(MORPHO_API_URL, payloads[0])]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(payloads))) as executor:
+        return list(executor.map(lambda payload: post_json_bytes(MORPHO_API_URL, payload), payloads))
+
+
+def fetch_market_history(unique_key: str, chain_id: int, days: int = 180, interval: str = "DAY") -> list[dict]:
+    return list(iter_market_history(unique_key, chain_id, days=days, interval=interval))
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from studies.oracle_dominance_v1.utils.env import oracle_gist_base_url
-from studies.oracle_dominance_v1.utils.http import json_get
+from studies.market_data.env import oracle_gist_base_url
+from studies.market_data.http import json_get
 
 
 def fetch_oracle_metadata(chain_ids: list[int]) -> dict[tuple[int, str], dict]:
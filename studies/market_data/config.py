@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+MORPHO_API_URL = "https://blue-api.morpho.org/graphql"
+DEFAULT_ORACLE_GIST_BASE_URL = "https://gist.githubusercontent.com/starksama/087ce4682243a059d77b1361fcccf221/raw"
+MONARCH_MARKETS_PAGE_SIZE = 1_000
+MONARCH_LOOKUP_BATCH_SIZE = 200
+MORPHO_MARKETS_PAGE_SIZE = 500
+HISTORY_INTERVAL_SECONDS = {"HOUR": 3_600, "DAY": 86_400, "WEEK": 604_800}
+HISTORY_CHUNK_DAYS = {"HOUR": 14, "DAY": 180, "WEEK": 730}
+HISTORY_CHUNK_WORKERS = 4
+
+# Setting this (or passing --cache-dir) adds a disk tier shared by every study on the machine.
+CACHE_DIR_ENV = "MARKET_DATA_CACHE_DIR"
+
+# Seconds a cached value stays fresh per namespace; None never expires.
+UNIVERSE_MAX_AGE = 60
+MONARCH_UNIVERSE_MAX_AGE = 15 * 60
+MONARCH_ORACLES_MAX_AGE = 15 * 60
+ORACLE_METADATA_MAX_AGE = 60 * 60
+HISTORY_MAX_AGE = 60 * 60
+
+# Encoded bytes kept in the per-process memory tier before least recently used entries are dropped.
+MEMORY_CACHE_BYTES = 256 * 2**20
+# Larger entries (e.g. long hourly histories) skip the memory tier and are re-read from disk.
+MEMORY_ENTRY_MAX_BYTES = 4 * 2**20
+
+
+def cache_dir_from_env() -> Path | None:
+    value = (os.getenv(CACHE_DIR_ENV) or "").strip()
+    return Path(value).expanduser() if value else None
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+
+from studies.market_data.config import DEFAULT_ORACLE_GIST_BASE_URL
+
+
+def env(name: str) -> str | None:
+    value = os.getenv(name)
+    return value.strip() if value else None
+
+
+def monarch_api_url() -> str:
+    for key in (
+        "MONARCH_INDEXER_ENDPOINT",
+        "MONARCH_API_ENDPOINT",
+        "NEXT_PUBLIC_MONARCH_API_NEW",
+        "MONARCH_API_URL",
+        "MONARCH_GRAPHQL_API_URL",
+    ):
+        value = env(key)
+        if value:
+            return value
+    raise RuntimeError("Monarch endpoint not configured. Set MONARCH_INDEXER_ENDPOINT or MONARCH_API_ENDPOINT locally.")
+
+
+def monarch_api_key() -> str | None:
+    for key in ("MONARCH_API_KEY", "NEXT_PUBLIC_MONARCH_API_KEY", "MONARCH_GRAPHQL_API_KEY"):
+        value = env(key)
+        if value:
+            return value
+    return None
+
+
+def oracle_gist_base_url() -> str:
+    for key in ("ORACLE_GIST_BASE_URL", "NEXT_PUBLIC_ORACLE_GIST_BASE_URL"):
+        value = env(key)
+        if value:
+            return value.rstrip("/")
+    return DEFAULT_ORACLE_GIST_BASE_URL
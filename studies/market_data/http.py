@@ -5,7 +5,8 @@ from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
 
-def json_post(url: str, payload: dict, headers: dict[str, str] | None = None) -> dict:
+# Raw response body, for callers that decode it elsewhere (e.g. in a process pool).
+def post_json_bytes(url: str, payload: dict | list, headers: dict[str, str] | None = None) -> bytes:
     request_headers = {"Content-Type": "application/json", **(headers or {})}
     request = Request(
         url,
@@ -15,7 +16,7 @@ def json_post(url: str, payload: dict, headers: dict[str, str] | None = None) ->
     )
     try:
         with urlopen(request, timeout=30) as response:
-            return json.loads(response.read().decode("utf-8"))
+            return response.read()
     except HTTPError as exc:
         body = exc.read().decode("utf-8", errors="ignore")
         raise RuntimeError(f"HTTP {exc.code} from {url}: {body[:400]}") from exc
@@ -23,6 +24,10 @@ def json_post(url: str, payload: dict, headers: dict[str, str] | None = None) ->
         raise RuntimeError(f"Request failed for {url}: {exc}") from exc
 
 
+def json_post(url: str, payload: dict | list, headers: dict[str, str] | None = None) -> dict | list:
+    return json.loads(post_json_bytes(url, payload, headers).decode("utf-8"))
+
+
 def json_get(url: str) -> dict:
     request = Request(url, headers={"Accept": "application/json"}, method="GET")
     try:
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class MarketRef:
+    unique_key: str
+    chain_id: int
+    oracle_address: str
+    loan_asset_address: str
+    loan_asset_symbol: str
+    loan_asset_decimals: int
+    collateral_asset_address: str
+    collateral_asset_symbol: str
+    supply_assets: str | None = None
+    borrow_assets: str | None = None
+    supply_assets_usd: float | None = None
+    borrow_assets_usd: float | None = None
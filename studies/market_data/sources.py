@@ -0,0 +1,228 @@
+"""Cached market data sources shared by every study.
+
+Same signatures as the clients in `studies.market_data.clients`, routed through a
+MarketDataStore: the Morpho universe per chain, the Monarch indexer universe, Monarch
+oracles of specific markets per (chain, market set), scanner oracle metadata per chain,
+and per-market history per (days, interval). Values are cached as JSON, so each caller
+gets its own objects and may mutate them freely.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import asdict
+from typing import Iterable, Iterator
+
+from studies.market_data.clients import monarch, morpho, oracle_gist
+from studies.market_data.config import (
+    HISTORY_MAX_AGE,
+    MONARCH_ORACLES_MAX_AGE,
+    MONARCH_UNIVERSE_MAX_AGE,
+    MORPHO_API_URL,
+    ORACLE_METADATA_MAX_AGE,
+    UNIVERSE_MAX_AGE,
+)
+from studies.market_data.env import monarch_api_url, oracle_gist_base_url
+from studies.market_data.models import MarketRef
+from studies.market_data.store import CacheMiss, CachePolicy, MarketDataStore, default_store, iter_json_array
+
+
+POLICIES = {
+    "universe": CachePolicy(UNIVERSE_MAX_AGE),
+    "monarch_universe": CachePolicy(MONARCH_UNIVERSE_MAX_AGE),
+    "monarch_oracles": CachePolicy(MONARCH_ORACLES_MAX_AGE),
+    "oracle_metadata": CachePolicy(ORACLE_METADATA_MAX_AGE),
+    "history": CachePolicy(HISTORY_MAX_AGE),
+}
+
+
+def policy(namespace: str, mode: str = "use") -> CachePolicy:
+    return POLICIES[namespace].with_mode(mode)
+
+
+# Keys include the endpoint, so studies pointed at different deployments never share entries.
+def universe_key(chain_id: int) -> list:
+    return [MORPHO_API_URL, chain_id]
+
+
+def monarch_oracles_key(chain_id: int, unique_keys: Iterable[str]) -> list:
+    return [monarch_api_url(), chain_id, sorted({unique_key.lower() for unique_key in unique_keys})]
+
+
+def oracle_metadata_key(chain_id: int) -> list:
+    return [oracle_gist_base_url(), chain_id]
+
+
+def history_key(unique_key: str, chain_id: int, days: int, interval: str) -> list:
+    return [MORPHO_API_URL, chain_id, unique_key.lower(), days, interval]
+
+
+def fetch_morpho_markets_for_chain(chain_id: int, store: MarketDataStore | None = None, mode: str = "use") -> list[MarketRef]:
+    rows = (store or default_store()).get(
+        "universe",
+        universe_key(chain_id),
+        policy("universe", mode),
+        lambda: [asdict(market) for market in morpho.fetch_morpho_markets_for_chain(chain_id)],
+    )
+    return [MarketRef(**row) for row in rows]
+
+
+# Serves a fresh cached universe as one page; otherwise pages live and caches the chain once paged.
+def iter_morpho_market_pages(chain_id: int, store: MarketDataStore | None = None, mode: str = "use") -> Iterator[list[MarketRef]]:
+    store = store or default_store()
+    key = universe_key(chain_id)
+    if mode != "refresh":
+        rows = store.lookup("universe", key, policy("universe", mode))
+        if rows is not None:
+            yield [MarketRef(**row) for row in rows]
+            return
+    if mode == "offline":
+        raise CacheMiss(f"No cached universe for chain {chain_id}")
+    markets: list[MarketRef] = []
+    for page in morpho.iter_morpho_market_pages(chain_id):
+        markets.extend(page)
+        yield page
+    store.put("universe", key, [asdict(market) for market in markets])
+
+
+def fetch_monarch_market_universe(store: MarketDataStore | None = None, mode: str = "use") -> dict[tuple[int, str], str]:
+    rows = (store or default_store()).get(
+        "monarch_universe",
+        [monarch_api_url()],
+        policy("monarch_universe", mode),
+        lambda: [[chain_id, unique_key, oracle] for (chain_id, unique_key), oracle in monarch.fetch_monarch_market_universe().items()],
+    )
+    return {(chain_id, unique_key): oracle for chain_id, unique_key, oracle in rows}
+
+
+# One entry per chain and exact set of looked-up markets: a run that finds the same
+# markets without an oracle reuses the answer, a different set is looked up afresh.
+def fetch_monarch_market_oracles(
+    keys: Iterable[tuple[int, str]],
+    store: MarketDataStore | None = None,
+    mode: str = "use",
+) -> dict[tuple[int, str], str]:
+    store = store or default_store()
+    unique_keys_by_chain: dict[int, set[str]] = defaultdict(set)
+    for chain_id, unique_key in keys:
+        unique_keys_by_chain[int(chain_id)].add(unique_key.lower())
+    oracles: dict[tuple[int, str], str] = {}
+    for chain_id, unique_keys in sorted(unique_keys_by_chain.items()):
+        rows = store.get(
+            "monarch_oracles",
+            monarch_oracles_key(chain_id, unique_keys),
+            policy("monarch_oracles", mode),
+            lambda chain_id=chain_id, unique_keys=unique_keys: [
+                [unique_key, oracle]
+                for (_, unique_key), oracle in monarch.fetch_monarch_market_oracles(
+                    (chain_id, unique_key) for unique_key in sorted(unique_keys)
+                ).items()
+            ],
+        )
+        for unique_key, oracle in rows:
+            oracles[(chain_id, unique_key)] = oracle
+    return oracles
+
+
+def fetch_oracle_metadata(chain_ids: Iterable[int], store: MarketDataStore | None = None, mode: str = "use") -> dict[tuple[int, str], dict]:
+    store = store or default_store()
+    metadata: dict[tuple[int, str], dict] = {}
+    for chain_id in sorted(set(chain_ids)):
+        oracles = store.get(
+            "oracle_metadata",
+            oracle_metadata_key(chain_id),
+            policy("oracle_metadata", mode),
+            lambda chain_id=chain_id: [[address, oracle] for (_, address), oracle in oracle_gist.fetch_oracle_metadata([chain_id]).items()],
+        )
+        for address, oracle in oracles:
+            metadata[(chain_id, address)] = oracle
+    return metadata
+
+
+def fetch_market_history(
+    unique_key: str,
+    chain_id: int,
+    days: int = 180,
+    interval: str = "DAY",
+    store: MarketDataStore | None = None,
+    mode: str = "use",
+) -> list[dict]:
+    return (store or default_store()).get(
+        "history",
+        history_key(unique_key, chain_id, days, interval),
+        policy("history", mode),
+        lambda: morpho.fetch_market_history(unique_key, chain_id, days=days, interval=interval),
+    )
+
+
+# History for callers that decode off-thread: (cached JSON text, []) for a fresh entry,
+# otherwise (None, live chunk response bodies). Decoded rows go back through put_market_history_text.
+def fetch_market_history_raw(
+    unique_key: str,
+    chain_id: int,
+    days: int = 180,
+    interval: str = "DAY",
+    store: MarketDataStore | None = None,
+    mode: str = "use",
+) -> tuple[str | None, list[bytes]]:
+    store = store or default_store()
+    key = history_key(unique_key, chain_id, days, interval)
+    if mode != "refresh":
+        text = store.lookup_text("history", key, policy("history", mode))
+        if text is not None:
+            return text, []
+    if mode == "offline":
+        raise CacheMiss(f"No cached history for {unique_key} on chain {chain_id}")
+    return None, morpho.fetch_market_history_bodies(unique_key, chain_id, days=days, interval=interval)
+
+
+# `text` is the JSON of the merged rows fetch_market_history would have returned.
+def put_market_history_text(
+    unique_key: str,
+    chain_id: int,
+    days: int,
+    interval: str,
+    text: str,
+    store: MarketDataStore | None = None,
+) -> None:
+    (store or default_store()).put_text("history", history_key(unique_key, chain_id, days, interval), text)
+
+
+# Rows are decoded one at a time from the cached JSON text, so a consumer holds that
+# text (a few hundred bytes per point) plus the current row, never a decoded list. A
+# live fetch still builds the client's list once before it is cached; histories above
+# MEMORY_ENTRY_MAX_BYTES are kept on disk only, not in the memory tier.
+def iter_market_history(
+    unique_key: str,
+    chain_id: int,
+    days: int = 180,
+    interval: str = "DAY",
+    store: MarketDataStore | None = None,
+    mode: str = "use",
+) -> Iterator[dict]:
+    text = (store or default_store()).get_text(
+        "history",
+        history_key(unique_key, chain_id, days, interval),
+        policy("history", mode),
+        lambda: morpho.fetch_market_history(unique_key, chain_id, days=days, interval=interval),
+    )
+    yield from iter_json_array(text)
+
+
+__all__ = [
+    "POLICIES",
+    "fetch_market_history",
+    "fetch_market_history_raw",
+    "fetch_monarch_market_oracles",
+    "fetch_monarch_market_universe",
+    "fetch_morpho_markets_for_chain",
+    "fetch_oracle_metadata",
+    "history_key",
+    "iter_market_history",
+    "iter_morpho_market_pages",
+    "monarch_oracles_key",
+    "oracle_metadata_key",
+    "policy",
+    "put_market_history_text",
+    "universe_key",
+]
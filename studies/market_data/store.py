@@ -0,0 +1,306 @@
+"""Two-tier cache for fetched market data.
+
+The store is generic: it knows namespaces, keys and JSON text, not what is cached.
+`sources.py` wires it to the clients in this package. Values are kept in a bounded
+LRU tier in process memory that skips oversized entries and, when a root directory
+is configured, a disk tier any process on the machine can share. Disk entries are
+replaced atomically, so readers never take locks. A miss is fetched once: threads
+asking for the same entry wait on one in-flight fetch, and processes serialize on a
+per-entry lock file and re-check the disk before fetching.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Iterator
+
+from studies.market_data.config import MEMORY_CACHE_BYTES, MEMORY_ENTRY_MAX_BYTES, cache_dir_from_env
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process single-flight; writes stay atomic.
+    fcntl = None
+
+
+CACHE_MODES = ("use", "refresh", "offline")
+
+
+class CacheMiss(LookupError):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class CachePolicy:
+    # Seconds an entry stays fresh; None never expires.
+    max_age: float | None = None
+    # use: serve fresh entries, fetch otherwise; refresh: always fetch and overwrite;
+    # offline: serve any cached entry regardless of age, never fetch.
+    mode: str = "use"
+
+    def __post_init__(self) -> None:
+        if self.mode not in CACHE_MODES:
+            raise ValueError(f"Unsupported cache mode: {self.mode}")
+
+    def with_mode(self, mode: str) -> CachePolicy:
+        return replace(self, mode=mode)
+
+    def is_fresh(self, fetched_at: float, now: float) -> bool:
+        if self.mode == "offline":
+            return True
+        if self.mode == "refresh":
+            return False
+        return self.max_age is None or now - fetched_at <= self.max_age
+
+
+def entry_id(key: object) -> str:
+    return json.dumps(key, separators=(",", ":"), sort_keys=True)
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+# Decode a JSON array's items one at a time, so only the text and the current item
+# are alive rather than the whole decoded list.
+def iter_json_array(text: str) -> Iterator[object]:
+    index = _WHITESPACE.match(text).end()
+    if not text.startswith("[", index):
+        raise ValueError("Expected a JSON array")
+    index = _WHITESPACE.match(text, index + 1).end()
+    if text.startswith("]", index):
+        return
+    while True:
+        item, index = _DECODER.raw_decode(text, index)
+        yield item
+        index = _WHITESPACE.match(text, index).end()
+        if text.startswith("]", index):
+            return
+        if not text.startswith(",", index):
+            raise ValueError(f"Expected ',' or ']' at offset {index}")
+        index = _WHITESPACE.match(text, index + 1).end()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class MarketDataStore:
+    def __init__(
+        self,
+        root: str | Path | None = None,
+        memory_bytes: int = MEMORY_CACHE_BYTES,
+        clock: Callable[[], float] = time.time,
+        memory_entry_bytes: int = MEMORY_ENTRY_MAX_BYTES,
+    ) -> None:
+        self.root = Path(root) if root is not None else None
+        self.memory_bytes = memory_bytes
+        self.memory_entry_bytes = min(memory_entry_bytes, memory_bytes)
+        self.clock = clock
+        self.stats: Counter[str] = Counter()
+        self._memory: OrderedDict[tuple[str, str], tuple[float, str]] = OrderedDict()
+        self._memory_size = 0
+        self._inflight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, namespace: str, slot_id: str, suffix: str = ".json") -> Path:
+        digest = hashlib.blake2b(slot_id.encode(), digest_size=16).hexdigest()
+        return self.root / namespace / digest[:2] / f"{digest}{suffix}"
+
+    def _remember(self, slot: tuple[str, str], fetched_at: float, text: str) -> None:
+        with self._lock:
+            previous = self._memory.pop(slot, None)
+            if previous is not None:
+                self._memory_size -= len(previous[1])
+            if len(text) > self.memory_entry_bytes:
+                self.stats["memory_skips"] += 1
+                return
+            self._memory[slot] = (fetched_at, text)
+            self._memory_size += len(text)
+            while self._memory_size > self.memory_bytes:
+                _, (_, dropped) = self._memory.popitem(last=False)
+                self._memory_size -= len(dropped)
+
+    # Disk entries are a header line ({"key", "fetched_at"}) followed by the value's JSON text.
+    def _read_disk(self, namespace: str, slot_id: str) -> tuple[float, str] | None:
+        if self.root is None:
+            return None
+        try:
+            with self._path(namespace, slot_id).open(encoding="utf-8") as handle:
+                header = json.loads(handle.readline())
+                text = handle.read()
+        except (OSError, ValueError):
+            return None
+        if header.get("key") != slot_id:
+            return None
+        return float(header["fetched_at"]), text
+
+    def _write_disk(self, namespace: str, slot_id: str, fetched_at: float, text: str) -> None:
+        target = self._path(namespace, slot_id)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        handle, staging = tempfile.mkstemp(dir=target.parent, prefix=target.name, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as output:
+                output.write(json.dumps({"key": slot_id, "fetched_at": fetched_at}) + "\n")
+                output.write(text)
+            os.replace(staging, target)
+        except BaseException:
+            Path(staging).unlink(missing_ok=True)
+            raise
+
+    def _cached(self, namespace: str, slot_id: str, policy: CachePolicy) -> str | None:
+        slot = (namespace, slot_id)
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(slot)
+            if entry is not None:
+                self._memory.move_to_end(slot)
+        if entry is not None and policy.is_fresh(entry[0], now):
+            self.stats["memory_hits"] += 1
+            return entry[1]
+        entry = self._read_disk(namespace, slot_id)
+        if entry is not None and policy.is_fresh(entry[0], now):
+            self.stats["disk_hits"] += 1
+            self._remember(slot, *entry)
+            return entry[1]
+        return None
+
+    def contains(self, namespace: str, key: object, policy: CachePolicy = CachePolicy()) -> bool:
+        slot_id = entry_id(key)
+        with self._lock:
+            entry = self._memory.get((namespace, slot_id))
+        if entry is None:
+            entry = self._read_disk(namespace, slot_id)
+        return entry is not None and policy.is_fresh(entry[0], self.clock())
+
+    def lookup(self, namespace: str, key: object, policy: CachePolicy = CachePolicy()) -> object | None:
+        text = self.lookup_text(namespace, key, policy)
+        return json.loads(text) if text is not None else None
+
+    # The cached JSON text itself, for callers that parse it elsewhere.
+    def lookup_text(self, namespace: str, key: object, policy: CachePolicy = CachePolicy()) -> str | None:
+        return self._cached(namespace, entry_id(key), policy)
+
+    def put(self, namespace: str, key: object, value: object) -> None:
+        self.put_text(namespace, key, json.dumps(value, separators=(",", ":")))
+
+    # Store already-serialized JSON text; it must be what json.dumps would give for the value.
+    def put_text(self, namespace: str, key: object, text: str) -> None:
+        slot_id = entry_id(key)
+        fetched_at = self.clock()
+        if self.root is not None:
+            self._write_disk(namespace, slot_id, fetched_at, text)
+        self._remember((namespace, slot_id), fetched_at, text)
+
+    # Return the cached value for (namespace, key), or fetch it exactly once across
+    # this process's threads and, with a disk tier, across processes.
+    def get(self, namespace: str, key: object, policy: CachePolicy, fetch: Callable[[], object]) -> object:
+        return json.loads(self.get_text(namespace, key, policy, fetch))
+
+    # `get` without the final decode, for callers that parse the JSON text themselves.
+    def get_text(self, namespace: str, key: object, policy: CachePolicy, fetch: Callable[[], object]) -> str:
+        slot_id = entry_id(key)
+        text = self._cached(namespace, slot_id, policy) if policy.mode != "refresh" else None
+        if text is not None:
+            return text
+        if policy.mode == "offline":
+            raise CacheMiss(f"No cached {namespace} entry for {slot_id}")
+
+        slot = (namespace, slot_id)
+        with self._lock:
+            future = self._inflight.get(slot)
+            owner = future is None
+            if owner:
+                future = self._inflight[slot] = Future()
+        if not owner:
+            self.stats["shared_fetches"] += 1
+            return future.result()
+        try:
+            text = self._fetch(namespace, slot_id, policy, fetch)
+            future.set_result(text)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(slot, None)
+        return text
+
+    def _fetch(self, namespace: str, slot_id: str, policy: CachePolicy, fetch: Callable[[], object]) -> str:
+        if self.root is None:
+            return self._fetch_and_store(namespace, slot_id, fetch)
+        started = self.clock()
+        with _file_lock(self._path(namespace, slot_id, ".lock")):
+            # Another process may have fetched (or refreshed) it while we waited for the lock.
+            entry = self._read_disk(namespace, slot_id)
+            if entry is not None and (entry[0] >= started or (policy.mode != "refresh" and policy.is_fresh(entry[0], self.clock()))):
+                self.stats["disk_hits"] += 1
+                self._remember((namespace, slot_id), *entry)
+                return entry[1]
+            return self._fetch_and_store(namespace, slot_id, fetch)
+
+    def _fetch_and_store(self, namespace: str, slot_id: str, fetch: Callable[[], object]) -> str:
+        value = fetch()
+        fetched_at = self.clock()
+        text = json.dumps(value, separators=(",", ":"))
+        self.stats["fetches"] += 1
+        if self.root is not None:
+            self._write_disk(namespace, slot_id, fetched_at, text)
+        self._remember((namespace, slot_id), fetched_at, text)
+        return text
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+
+_default_store: MarketDataStore | None = None
+_default_lock = threading.Lock()
+
+
+# Process-wide store used when callers pass none; its disk tier comes from MARKET_DATA_CACHE_DIR.
+def default_store() -> MarketDataStore:
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = MarketDataStore(cache_dir_from_env())
+        return _default_store
+
+
+def set_default_store(store: MarketDataStore) -> MarketDataStore:
+    global _default_store
+    with _default_lock:
+        _default_store = store
+    return store
+
+
+__all__ = [
+    "CACHE_MODES",
+    "CacheMiss",
+    "CachePolicy",
+    "MarketDataStore",
+    "default_store",
+    "entry_id",
+    "iter_json_array",
+    "set_default_store",
+]
@@ -0,0 +1,124 @@
+"""Pluggable vendor attribution schemes.
+
+Each scheme maps a market's `flatten_vendor_legs` output to vendor weights that
+sum to one. Weights are exact fractions so the default `even` scheme divides
+exactly like `allocate_evenly`. For a market universe the weights form a sparse
+market x vendor matrix (CSR layout), and every requested scheme is applied to
+the same fetched history.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass, field
+from fractions import Fraction
+from typing import Callable, Iterable
+
+from studies.oracle_dominance_v1.models import VendorLeg
+
+
+DEFAULT_ALLOCATION_SCHEME = "even"
+UNRECOGNIZED_VENDORS = {"Unknown", "HardcodedAssumption"}
+
+WeightRow = tuple[tuple[str, Fraction], ...]
+
+
+def _recognized(legs: Iterable[VendorLeg]) -> list[VendorLeg]:
+    return [leg for leg in legs if leg.vendor not in UNRECOGNIZED_VENDORS]
+
+
+def _even_row(vendors: Iterable[str]) -> WeightRow:
+    vendor_list = sorted(set(vendors))
+    if not vendor_list:
+        return ()
+    weight = Fraction(1, len(vendor_list))
+    return tuple((vendor, weight) for vendor in vendor_list)
+
+
+# Current methodology: every distinct recognized vendor gets an equal share.
+def even_weights(legs: list[VendorLeg]) -> WeightRow:
+    return _even_row(leg.vendor for leg in _recognized(legs))
+
+
+# Meta oracles count only their primary source; other oracle types are unchanged.
+def primary_only_weights(legs: list[VendorLeg]) -> WeightRow:
+    return even_weights([leg for leg in legs if not leg.leg_key.startswith("meta.backup:")])
+
+
+# Vendors are weighted by how many recognized feed legs they serve.
+def per_leg_weights(legs: list[VendorLeg]) -> WeightRow:
+    recognized = _recognized(legs)
+    counts: dict[str, int] = defaultdict(int)
+    for leg in recognized:
+        counts[leg.vendor] += 1
+    return tuple((vendor, Fraction(counts[vendor], len(recognized))) for vendor in sorted(counts))
+
+
+# Base and quote sides each carry an equal share, split evenly among that side's vendors.
+def base_quote_weights(legs: list[VendorLeg]) -> WeightRow:
+    sides: dict[str, set[str]] = defaultdict(set)
+    for leg in _recognized(legs):
+        side = "quote" if (leg.source_field or "").startswith("quote") else "base"
+        sides[side].add(leg.vendor)
+    weights: dict[str, Fraction] = defaultdict(Fraction)
+    for vendors in sides.values():
+        for vendor, weight in _even_row(vendors):
+            weights[vendor] += weight / len(sides)
+    return tuple((vendor, weights[vendor]) for vendor in sorted(weights))
+
+
+ALLOCATION_SCHEMES: dict[str, Callable[[list[VendorLeg]], WeightRow]] = {
+    "even": even_weights,
+    "primary_only": primary_only_weights,
+    "per_leg": per_leg_weights,
+    "base_quote": base_quote_weights,
+}
+
+
+def resolve_allocation_schemes(schemes: Iterable[str]) -> list[str]:
+    resolved = list(dict.fromkeys(schemes)) or [DEFAULT_ALLOCATION_SCHEME]
+    unknown = [scheme for scheme in resolved if scheme not in ALLOCATION_SCHEMES]
+    if unknown:
+        raise ValueError(f"Unknown allocation scheme(s): {', '.join(unknown)}")
+    return resolved
+
+
+@dataclass(slots=True)
+class WeightMatrix:
+    scheme: str
+    vendors: list[str] = field(default_factory=list)
+    indptr: array = field(default_factory=lambda: array("i", [0]))
+    indices: array = field(default_factory=lambda: array("i"))
+    data: list[Fraction] = field(default_factory=list)
+    _vendor_ids: dict[str, int] = field(default_factory=dict)
+
+    def append_row(self, row: WeightRow) -> None:
+        for vendor, weight in row:
+            vendor_id = self._vendor_ids.get(vendor)
+            if vendor_id is None:
+                vendor_id = len(self.vendors)
+                self._vendor_ids[vendor] = vendor_id
+                self.vendors.append(vendor)
+            self.indices.append(vendor_id)
+            self.data.append(weight)
+        self.indptr.append(len(self.indices))
+
+    def row(self, index: int) -> WeightRow:
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return tuple((self.vendors[self.indices[position]], self.data[position]) for position in range(start, end))
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+
+def weight_rows(legs: list[VendorLeg], schemes: Iterable[str]) -> tuple[WeightRow, ...]:
+    return tuple(ALLOCATION_SCHEMES[scheme](legs) for scheme in schemes)
+
+
+def build_weight_matrices(market_legs: Iterable[list[VendorLeg]], schemes: Iterable[str]) -> dict[str, WeightMatrix]:
+    matrices = {scheme: WeightMatrix(scheme) for scheme in resolve_allocation_schemes(schemes)}
+    for legs in market_legs:
+        for scheme, matrix in matrices.items():
+            matrix.append_row(ALLOCATION_SCHEMES[scheme](legs))
+    return matrices
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import json
+import math
 from collections import defaultdict
 from datetime import date, datetime, timezone
-from typing import Iterable
-
+from typing import Iterable, Iterator
+
+from studies.oracle_dominance_v1.allocation import (
+    DEFAULT_ALLOCATION_SCHEME,
+    WeightRow,
+    build_weight_matrices,
+    resolve_allocation_schemes,
+)
 from studies.oracle_dominance_v1.config import STABLE_REFERENCE_SYMBOLS
+from studies.oracle_dominance_v1.market_table import MarketTable
 from studies.oracle_dominance_v1.models import MarketRef, MarketVendorAllocation, VendorExposurePoint, VendorLeg
+from studies.oracle_dominance_v1.price_index import AssetExposureAccumulator, unit_history_rows, validate_repricing_mode
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL
 
 
 def _normalize_symbol(value: str | None) -> str:
@@ -124,12 +134,16 @@ def flatten_vendor_legs(oracle_output: dict) -> list[VendorLeg]:
     return []
 
 
+def leg_assumption_labels(legs: Iterable[VendorLeg]) -> tuple[str, ...]:
+    return tuple(sorted({leg.assumption_label for leg in legs if leg.assumption_label}))
+
+
 def build_market_vendor_allocation(market: MarketRef, oracle_output: dict | None) -> MarketVendorAllocation:
     legs = flatten_vendor_legs(oracle_output or {})
     vendors = sorted({leg.vendor for leg in legs if leg.vendor not in {"Unknown", "HardcodedAssumption"}})
     hardcoded_leg_count = sum(1 for leg in legs if leg.is_hardcoded_assumption)
     unknown_leg_count = sum(1 for leg in legs if leg.vendor == "Unknown")
-    assumption_labels = sorted({leg.assumption_label for leg in legs if leg.assumption_label})
+    assumption_labels = list(leg_assumption_labels(legs))
     peg_assumption_count = sum(1 for leg in legs if leg.assumption_kind == "peg" and leg.assumption_label)
     vault_assumption_count = sum(1 for leg in legs if leg.assumption_kind == "vault" and leg.assumption_label)
     return MarketVendorAllocation(
@@ -153,111 +167,254 @@ def allocate_evenly(total_usd: float, vendors: Iterable[str]) -> dict[str, float
     return {vendor: weight for vendor in vendor_list}
 
 
-def infer_current_loan_asset_prices(markets: list[MarketRef]) -> dict[tuple[int, str], float]:
+def infer_current_loan_asset_prices(markets: Iterable[MarketRef] | MarketTable) -> dict[tuple[int, str], float]:
+    table = markets if isinstance(markets, MarketTable) else MarketTable.from_markets(markets)
     prices: dict[tuple[int, str], list[float]] = defaultdict(list)
-    for market in markets:
-        supply_assets = market.supply_assets
-        supply_usd = market.supply_assets_usd
-        if not supply_assets or supply_usd is None:
+    for chain_id, asset_id, decimals, raw, units, supply_usd in zip(
+        table.chain_id,
+        table.loan_asset,
+        table.loan_decimals,
+        table.supply_raw,
+        table.supply_units,
+        table.supply_usd,
+    ):
+        if raw is None or math.isnan(supply_usd):
             continue
-        raw = int(supply_assets)
-        if raw <= 0 or market.loan_asset_decimals < 0:
+        if raw <= 0 or decimals < 0 or units <= 0:
             continue
-        units = raw / (10 ** market.loan_asset_decimals)
-        if units <= 0:
-            continue
-        prices[(market.chain_id, market.loan_asset_address)].append(supply_usd / units)
+        prices[(chain_id, table.pool[asset_id])].append(supply_usd / units)
 
     return {key: sum(samples) / len(samples) for key, samples in prices.items() if samples}
 
 
-def build_current_exposure_table(markets: list[MarketRef], oracle_metadata: dict) -> list[dict]:
-    rows: list[dict] = []
+CURRENT_EXPOSURE_FIELDS = (
+    "chain_id",
+    "unique_key",
+    "oracle_address",
+    "loan_asset_symbol",
+    "collateral_asset_symbol",
+    "vendors",
+    "recognized_vendor_count",
+    "hardcoded_leg_count",
+    "unknown_leg_count",
+    "assumption_labels",
+    "assumption_count",
+    "peg_assumption_count",
+    "vault_assumption_count",
+    "supply_assets_usd",
+    "borrow_assets_usd",
+    "supply_split_json",
+    "borrow_split_json",
+    "assumption_supply_split_json",
+    "assumption_borrow_split_json",
+)
+HARDCODED_SUMMARY_FIELDS = ("metric", "value")
+
+
+# Rows are built one market at a time, so exporters can stream the table.
+def iter_current_exposure_rows(markets: Iterable[MarketRef], oracle_metadata: dict) -> Iterator[dict]:
     for market in markets:
-        oracle_output = oracle_metadata.get((market.chain_id, market.oracle_address))
-        allocation = build_market_vendor_allocation(market, oracle_output)
-        supply_split = allocate_evenly(float(market.supply_assets_usd or 0), allocation.vendors)
-        borrow_split = allocate_evenly(float(market.borrow_assets_usd or 0), allocation.vendors)
-        assumption_supply_split = allocate_evenly(float(market.supply_assets_usd or 0), allocation.assumption_labels)
-        assumption_borrow_split = allocate_evenly(float(market.borrow_assets_usd or 0), allocation.assumption_labels)
-        rows.append(
-            {
-                "chain_id": market.chain_id,
-                "unique_key": market.unique_key,
-                "oracle_address": market.oracle_address,
-                "loan_asset_symbol": market.loan_asset_symbol,
-                "collateral_asset_symbol": market.collateral_asset_symbol,
-                "vendors": "|".join(allocation.vendors),
-                "recognized_vendor_count": allocation.recognized_vendor_count,
-                "hardcoded_leg_count": allocation.hardcoded_leg_count,
-                "unknown_leg_count": allocation.unknown_leg_count,
-                "assumption_labels": "|".join(allocation.assumption_labels),
-                "assumption_count": len(allocation.assumption_labels),
-                "peg_assumption_count": allocation.peg_assumption_count,
-                "vault_assumption_count": allocation.vault_assumption_count,
-                "supply_assets_usd": float(market.supply_assets_usd or 0),
-                "borrow_assets_usd": float(market.borrow_assets_usd or 0),
-                "supply_split_json": json.dumps(supply_split, sort_keys=True),
-                "borrow_split_json": json.dumps(borrow_split, sort_keys=True),
-                "assumption_supply_split_json": json.dumps(assumption_supply_split, sort_keys=True),
-                "assumption_borrow_split_json": json.dumps(assumption_borrow_split, sort_keys=True),
-            }
+        yield build_current_exposure_row(market, oracle_metadata.get((market.chain_id, market.oracle_address)))
+
+
+def build_current_exposure_table(markets: Iterable[MarketRef], oracle_metadata: dict) -> list[dict]:
+    return list(iter_current_exposure_rows(markets, oracle_metadata))
+
+
+def build_current_exposure_row(market: MarketRef, oracle_output: dict | None) -> dict:
+    allocation = build_market_vendor_allocation(market, oracle_output)
+    supply_split = allocate_evenly(float(market.supply_assets_usd or 0), allocation.vendors)
+    borrow_split = allocate_evenly(float(market.borrow_assets_usd or 0), allocation.vendors)
+    assumption_supply_split = allocate_evenly(float(market.supply_assets_usd or 0), allocation.assumption_labels)
+    assumption_borrow_split = allocate_evenly(float(market.borrow_assets_usd or 0), allocation.assumption_labels)
+    return {
+        "chain_id": market.chain_id,
+        "unique_key": market.unique_key,
+        "oracle_address": market.oracle_address,
+        "loan_asset_symbol": market.loan_asset_symbol,
+        "collateral_asset_symbol": market.collateral_asset_symbol,
+        "vendors": "|".join(allocation.vendors),
+        "recognized_vendor_count": allocation.recognized_vendor_count,
+        "hardcoded_leg_count": allocation.hardcoded_leg_count,
+        "unknown_leg_count": allocation.unknown_leg_count,
+        "assumption_labels": "|".join(allocation.assumption_labels),
+        "assumption_count": len(allocation.assumption_labels),
+        "peg_assumption_count": allocation.peg_assumption_count,
+        "vault_assumption_count": allocation.vault_assumption_count,
+        "supply_assets_usd": float(market.supply_assets_usd or 0),
+        "borrow_assets_usd": float(market.borrow_assets_usd or 0),
+        "supply_split_json": json.dumps(supply_split, sort_keys=True),
+        "borrow_split_json": json.dumps(borrow_split, sort_keys=True),
+        "assumption_supply_split_json": json.dumps(assumption_supply_split, sort_keys=True),
+        "assumption_borrow_split_json": json.dumps(assumption_borrow_split, sort_keys=True),
+    }
+
+
+def history_bucket(timestamp: int, interval: str = "DAY") -> date:
+    if interval == "HOUR":
+        return datetime.fromtimestamp(timestamp - timestamp % 3_600, tz=timezone.utc)
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).date()
+
+
+def vendor_signature(vendors: Iterable[str]) -> str:
+    return "|".join(sorted(set(vendors)))
+
+
+# (weight rows per scheme, assumption labels): markets sharing a key share a group.
+GroupKey = tuple[tuple[WeightRow, ...], tuple[str, ...]]
+
+
+class HistoricalExposureBuilder:
+    """Streams market histories into per-group totals and applies scheme weights at the end.
+
+    Markets with identical weight rows under every requested scheme and the same
+    assumption labels share a group, so allocation runs once per group rather than once
+    per market. Histories are kept as USD and loan-asset units per (group, asset) and
+    repriced once per asset series when points are requested, so current prices need
+    not be known while histories stream in.
+    """
+
+    def __init__(
+        self,
+        days: int = 180,
+        interval: str = "DAY",
+        schemes: Iterable[str] = (DEFAULT_ALLOCATION_SCHEME,),
+        repricing: str = "current",
+        gap_fill: str = DEFAULT_GAP_FILL,
+        end: datetime | None = None,
+    ) -> None:
+        self.schemes = resolve_allocation_schemes(schemes)
+        self.repricing = validate_repricing_mode(repricing)
+        self.exposure = AssetExposureAccumulator(days, interval, end=end, gap_fill=gap_fill)
+        # Pinned window end; outputs slice their windows back from it.
+        self.end = self.exposure.end
+        self.group_labels: dict[GroupKey, str] = {}
+
+    def add_history(
+        self,
+        market: MarketRef,
+        rows: tuple[WeightRow, ...],
+        history: Iterable[dict],
+        assumptions: tuple[str, ...] = (),
+    ) -> None:
+        label = self.group_labels.setdefault((rows, tuple(assumptions)), f"group:{len(self.group_labels)}")
+        self.exposure.add_history(
+            label,
+            (market.chain_id, market.loan_asset_address),
+            unit_history_rows(history, market.loan_asset_decimals),
         )
-    return rows
+
+    def points_by_scheme(self, current_prices: dict[tuple[int, str], float]) -> dict[str, list[VendorExposurePoint]]:
+        totals = self.exposure.group_totals(current_prices, self.repricing)
+        return {
+            scheme: list(totals.weigh_keys({label: key[0][position] for key, label in self.group_labels.items()}).iter_points())
+            for position, scheme in enumerate(self.schemes)
+        }
+
+    # (as_of, chain_id, vendor, assumption, metric, value) cells under the default scheme
+    # (or the first requested one). A group's value is split evenly over its assumption
+    # labels, with "" standing for "no assumption", so every marginal matches the flat outputs.
+    def cube_cells(self, current_prices: dict[tuple[int, str], float]) -> Iterator[tuple[str, int, str, str, str, float]]:
+        position = self.schemes.index(DEFAULT_ALLOCATION_SCHEME) if DEFAULT_ALLOCATION_SCHEME in self.schemes else 0
+        keys = {label: key for key, label in self.group_labels.items()}
+        totals = self.exposure.group_totals(current_prices, self.repricing, key=lambda group, asset: f"{group}@{asset[0]}")
+        for key_id, label in enumerate(totals.vendors):
+            group, _, chain_id = label.rpartition("@")
+            rows, assumptions = keys[group]
+            labels = assumptions or ("",)
+            for metric_id, metric in enumerate(totals.metrics):
+                values, touched = totals.series(key_id, metric_id)
+                for offset, flag in enumerate(touched):
+                    if not flag:
+                        continue
+                    as_of = totals.bucket_as_of(offset).isoformat()
+                    for vendor, weight in rows[position]:
+                        share = values[offset] * weight.numerator / weight.denominator / len(labels)
+                        for assumption in labels:
+                            yield as_of, int(chain_id), vendor, assumption, metric, share
+
+
+# Fetch and aggregate every attributable market's history; the builder serves both the
+# per-scheme points and the exposure cube.
+def build_historical_exposure_builder(
+    markets: Iterable[MarketRef],
+    oracle_metadata: dict,
+    fetch_market_history,
+    days: int = 180,
+    interval: str = "DAY",
+    schemes: Iterable[str] = (DEFAULT_ALLOCATION_SCHEME,),
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
+    end: datetime | None = None,
+) -> HistoricalExposureBuilder:
+    market_list = list(markets)
+    builder = HistoricalExposureBuilder(days, interval, schemes, repricing, gap_fill, end)
+    market_legs = [flatten_vendor_legs(oracle_metadata.get((market.chain_id, market.oracle_address)) or {}) for market in market_list]
+    matrices = build_weight_matrices(market_legs, builder.schemes)
+    for index, market in enumerate(market_list):
+        rows = tuple(matrix.row(index) for matrix in matrices.values())
+        if not any(rows):
+            continue
+        history = fetch_market_history(market.unique_key, market.chain_id, days=days, interval=interval)
+        builder.add_history(market, rows, history, leg_assumption_labels(market_legs[index]))
+    return builder
+
+
+def build_historical_exposure_by_scheme(
+    markets: Iterable[MarketRef],
+    oracle_metadata: dict,
+    current_prices: dict[tuple[int, str], float],
+    fetch_market_history,
+    days: int = 180,
+    interval: str = "DAY",
+    schemes: Iterable[str] = (DEFAULT_ALLOCATION_SCHEME,),
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
+) -> dict[str, list[VendorExposurePoint]]:
+    builder = build_historical_exposure_builder(markets, oracle_metadata, fetch_market_history, days, interval, schemes, repricing, gap_fill)
+    return builder.points_by_scheme(current_prices)
 
 
 def build_historical_exposure_series(
-    markets: list[MarketRef],
+    markets: Iterable[MarketRef],
     oracle_metadata: dict,
     current_prices: dict[tuple[int, str], float],
     fetch_market_history,
     days: int = 180,
+    interval: str = "DAY",
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
 ) -> list[VendorExposurePoint]:
-    exposure_map: dict[tuple[date, str, str], float] = defaultdict(float)
+    return build_historical_exposure_by_scheme(
+        markets,
+        oracle_metadata,
+        current_prices,
+        fetch_market_history,
+        days=days,
+        interval=interval,
+        repricing=repricing,
+        gap_fill=gap_fill,
+    )[DEFAULT_ALLOCATION_SCHEME]
 
-    for market in markets:
-        oracle_output = oracle_metadata.get((market.chain_id, market.oracle_address))
-        allocation = build_market_vendor_allocation(market, oracle_output)
-        if not allocation.vendors:
-            continue
 
-        current_price = current_prices.get((market.chain_id, market.loan_asset_address))
-        history = fetch_market_history(market.unique_key, market.chain_id, days=days)
-        for point in history:
-            point_date = datetime.fromtimestamp(int(point["timestamp"]), tz=timezone.utc).date()
-            supply_usd = float(point.get("supplyAssetsUsd") or 0)
-            borrow_usd = float(point.get("borrowAssetsUsd") or 0)
-
-            for vendor, value in allocate_evenly(supply_usd, allocation.vendors).items():
-                exposure_map[(point_date, vendor, "supply_usd")] += value
-            for vendor, value in allocate_evenly(borrow_usd, allocation.vendors).items():
-                exposure_map[(point_date, vendor, "borrow_usd")] += value
-
-            if current_price is not None:
-                repriced_supply = 0.0
-                repriced_borrow = 0.0
-                raw_supply = point.get("supplyAssets")
-                raw_borrow = point.get("borrowAssets")
-                if raw_supply is not None:
-                    repriced_supply = (int(raw_supply) / (10 ** market.loan_asset_decimals)) * current_price
-                if raw_borrow is not None:
-                    repriced_borrow = (int(raw_borrow) / (10 ** market.loan_asset_decimals)) * current_price
-                for vendor, value in allocate_evenly(repriced_supply, allocation.vendors).items():
-                    exposure_map[(point_date, vendor, "repriced_supply_usd")] += value
-                for vendor, value in allocate_evenly(repriced_borrow, allocation.vendors).items():
-                    exposure_map[(point_date, vendor, "repriced_borrow_usd")] += value
-
-    return [
-        VendorExposurePoint(as_of=as_of, vendor=vendor, metric=metric, exposure_usd=value)
-        for (as_of, vendor, metric), value in sorted(exposure_map.items())
-    ]
-
-
-def build_hardcoded_summary(current_rows: list[dict]) -> list[dict]:
-    summary: dict[str, float] = defaultdict(float)
-    for row in current_rows:
+class HardcodedSummary:
+    """Running totals over markets with hardcoded legs; `add` one current row at a time."""
+
+    def __init__(self) -> None:
+        self.summary: dict[str, float] = defaultdict(float)
+
+    def add(self, row: dict) -> None:
         if row["hardcoded_leg_count"] > 0:
-            summary["markets_with_hardcoded_legs"] += 1
-            summary["supply_assets_usd"] += float(row["supply_assets_usd"])
-            summary["borrow_assets_usd"] += float(row["borrow_assets_usd"])
-    return [{"metric": key, "value": value} for key, value in summary.items()]
+            self.summary["markets_with_hardcoded_legs"] += 1
+            self.summary["supply_assets_usd"] += float(row["supply_assets_usd"])
+            self.summary["borrow_assets_usd"] += float(row["borrow_assets_usd"])
+
+    def rows(self) -> list[dict]:
+        return [{"metric": key, "value": value} for key, value in self.summary.items()]
+
+
+def build_hardcoded_summary(current_rows: Iterable[dict]) -> list[dict]:
+    summary = HardcodedSummary()
+    for row in current_rows:
+        summary.add(row)
+    return summary.rows()
@@ -1,27 +1,78 @@
 from __future__ import annotations
 
 import argparse
-import csv
 import datetime as dt
 import json
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from itertools import chain
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
 import matplotlib.pyplot as plt
 
+from studies.market_data.store import MarketDataStore, set_default_store
+from studies.oracle_dominance_v1.analysis import CURRENT_EXPOSURE_FIELDS, history_bucket, vendor_signature
+from studies.oracle_dominance_v1.concentration import (
+    ConcentrationPoint,
+    as_of_seconds,
+    concentration_fields,
+    concentration_rows,
+    iter_concentration,
+)
+from studies.oracle_dominance_v1.config import HISTORY_DECODE_WORKERS
+from studies.oracle_dominance_v1.current_snapshot import totals_fields
+from studies.oracle_dominance_v1.downsample import CHART_POINT_BUDGET, downsample_series
+from studies.oracle_dominance_v1.exposure_accumulator import DAY_SECONDS, ExposureAccumulator
+from studies.oracle_dominance_v1.history_decode import HistoryDecoder
+from studies.oracle_dominance_v1.history_journal import (
+    HISTORY_ERROR_FIELDS,
+    HistoryJournal,
+    StaleJournalError,
+    history_error_row,
+    read_journal,
+)
+from studies.oracle_dominance_v1.history_pyramid import (
+    HistoryPyramid,
+    build_history_pyramid,
+    load_history_pyramid,
+    resolution_for_window,
+    save_history_pyramid,
+)
+from studies.oracle_dominance_v1.html_report import REPORT_FORMATS, ReportView, ReportWindow, encode_series_block, write_html_report
 from studies.oracle_dominance_v1.pipeline import (
     MarketRef,
-    allocate_evenly,
+    MarketTable,
+    VendorExposurePoint,
     build_current_exposure_table,
     build_market_vendor_allocation,
-    fetch_live_markets,
+    fetch_live_market_table,
     fetch_market_history,
     fetch_oracle_metadata,
     infer_current_loan_asset_prices,
 )
+from studies.oracle_dominance_v1.planner import RunPlan, plan_history, plan_market_universe
 from studies.oracle_dominance_v1.plot_style import MUTED, MONARCH_PRIMARY, PANEL, TEXT, apply_monarch_style, series_color
+from studies.oracle_dominance_v1.preview import (
+    PREVIEW_BOOTSTRAP_ROUNDS,
+    PREVIEW_CERTAIN_MARKETS,
+    PREVIEW_CONFIDENCE,
+    PREVIEW_SAMPLE_SIZE,
+    PreviewSample,
+    bootstrap_bands,
+    draw_preview_sample,
+    estimate_vendor_totals,
+    sample_key,
+)
+from studies.oracle_dominance_v1.price_index import (
+    REPRICING_MODES,
+    AssetExposureAccumulator,
+    HistoryRow,
+    unit_history_rows,
+)
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL, GAP_FILL_MODES
+from studies.oracle_dominance_v1.utils.csv_rows import write_csv_rows
 
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = BASE_DIR / "output"
@@ -29,6 +80,9 @@ TOP_HISTORY_MARKETS = 100
 HISTORY_DAYS = 90
 MAX_WORKERS = 12
 PRIMARY_METRIC = "repriced_supply_usd"
+HISTORY_CSV_FIELDS = ("timestamp", "vendor", "metric", "exposure_usd")
+GROWTH_FIELDS = ("vendor", "start_usd", "end_usd", "abs_gain_usd", "pct_gain")
+COVERAGE_FIELDS = ("vendor", "supply_usd", "covered_supply_usd", "coverage_pct")
 
 
 def parse_json_map(value: str) -> dict[str, float]:
@@ -65,90 +119,297 @@ def aggregate_current_assumption_totals(current_rows: list[dict]) -> list[dict]:
     return rows
 
 
-def select_top_history_markets(markets: list[MarketRef], metadata: dict, top_n: int) -> list[tuple[MarketRef, list[str]]]:
-    scored: list[tuple[MarketRef, list[str]]] = []
-    for market in markets:
-        oracle_output = metadata.get((market.chain_id, market.oracle_address))
-        allocation = build_market_vendor_allocation(market, oracle_output)
-        if not allocation.vendors:
-            continue
-        if (market.supply_assets_usd or 0) <= 0:
+# Per-vendor share of current supply (even split, as in the current totals) whose history was fetched.
+def aggregate_supply_coverage(current_rows: list[dict], covered_keys: set[tuple[int, str]]) -> list[dict]:
+    totals: dict[str, float] = defaultdict(float)
+    covered: dict[str, float] = defaultdict(float)
+    for row in current_rows:
+        is_covered = (int(row["chain_id"]), row["unique_key"]) in covered_keys
+        for vendor, value in parse_json_map(row["supply_split_json"]).items():
+            totals[vendor] += value
+            if is_covered:
+                covered[vendor] += value
+
+    return [
+        {
+            "vendor": vendor,
+            "supply_usd": round(total, 2),
+            "covered_supply_usd": round(covered[vendor], 2),
+            "coverage_pct": round(100 * covered[vendor] / total, 2) if total else 0.0,
+        }
+        for vendor, total in sorted(totals.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+
+def total_coverage_pct(coverage_rows: list[dict]) -> float:
+    total = sum(row["supply_usd"] for row in coverage_rows)
+    return round(100 * sum(row["covered_supply_usd"] for row in coverage_rows) / total, 2) if total else 0.0
+
+
+# Markets with positive supply and at least one recognized vendor, with their vendor lists.
+def history_candidates(markets: list[MarketRef] | MarketTable, metadata: dict) -> tuple[MarketTable, dict[int, list[str]]]:
+    table = markets if isinstance(markets, MarketTable) else MarketTable.from_markets(markets)
+    vendors_by_oracle: dict[tuple[int, int], list[str]] = {}
+    candidates: dict[int, list[str]] = {}
+    for index, (chain_id, oracle_id, supply_usd) in enumerate(zip(table.chain_id, table.oracle, table.supply_usd)):
+        if not supply_usd > 0:
             continue
-        scored.append((market, allocation.vendors))
+        vendors = vendors_by_oracle.get((chain_id, oracle_id))
+        if vendors is None:
+            market = table.market(index)
+            oracle_output = metadata.get((market.chain_id, market.oracle_address))
+            vendors = build_market_vendor_allocation(market, oracle_output).vendors
+            vendors_by_oracle[(chain_id, oracle_id)] = vendors
+        if vendors:
+            candidates[index] = vendors
+    return table, candidates
 
-    scored.sort(key=lambda item: item[0].supply_assets_usd or 0, reverse=True)
-    return scored[:top_n]
 
+def select_top_history_markets(markets: list[MarketRef] | MarketTable, metadata: dict, top_n: int) -> list[tuple[MarketRef, list[str]]]:
+    table, candidates = history_candidates(markets, metadata)
+    return [(table.market(index), candidates[index]) for index in table.top_n(top_n, "supply_usd", candidates)]
 
-def fetch_one_history(market: MarketRef, vendors: list[str], current_prices: dict[tuple[int, str], float], days: int) -> tuple[MarketRef, list[dict], list[str]]:
-    history = fetch_market_history(market.unique_key, market.chain_id, days=days)
-    current_price = current_prices.get((market.chain_id, market.loan_asset_address))
-    rows: list[dict] = []
-    for point in history:
-        supply_usd = float(point.get("supplyAssetsUsd") or 0)
-        borrow_usd = float(point.get("borrowAssetsUsd") or 0)
-        repriced_supply = None
-        repriced_borrow = None
-        if current_price is not None:
-            if point.get("supplyAssets") is not None:
-                repriced_supply = (int(point["supplyAssets"]) / (10 ** market.loan_asset_decimals)) * current_price
-            if point.get("borrowAssets") is not None:
-                repriced_borrow = (int(point["borrowAssets"]) / (10 ** market.loan_asset_decimals)) * current_price
-        rows.append(
-            {
-                "timestamp": int(point["timestamp"]),
-                "supply_usd": supply_usd,
-                "borrow_usd": borrow_usd,
-                "repriced_supply_usd": float(repriced_supply if repriced_supply is not None else supply_usd),
-                "repriced_borrow_usd": float(repriced_borrow if repriced_borrow is not None else borrow_usd),
-            }
-        )
-    return market, rows, vendors
+
+# Largest markets until `target_pct` of recognized supply is covered, then each vendor's
+# largest remaining markets until it reaches `vendor_floor_pct` of its own supply.
+# Coverage uses the same even vendor split as `supply_split_json`.
+def select_coverage_history_markets(
+    markets: list[MarketRef] | MarketTable,
+    metadata: dict,
+    target_pct: float,
+    vendor_floor_pct: float = 0.0,
+) -> list[tuple[MarketRef, list[str]]]:
+    table, candidates = history_candidates(markets, metadata)
+    ranked = table.top_n(len(candidates), "supply_usd", candidates)
+    vendor_sets = {index: sorted(set(candidates[index])) for index in ranked}
+    totals: dict[str, float] = defaultdict(float)
+    for index in ranked:
+        for vendor in vendor_sets[index]:
+            totals[vendor] += table.supply_usd[index] / len(vendor_sets[index])
+
+    covered: dict[str, float] = defaultdict(float)
+    chosen: set[int] = set()
+
+    def take(index: int) -> None:
+        chosen.add(index)
+        for vendor in vendor_sets[index]:
+            covered[vendor] += table.supply_usd[index] / len(vendor_sets[index])
+
+    target = sum(totals.values()) * target_pct / 100
+    for index in ranked:
+        if sum(covered.values()) >= target:
+            break
+        take(index)
+    for vendor in sorted(totals):
+        floor = totals[vendor] * vendor_floor_pct / 100
+        for index in ranked:
+            if covered[vendor] >= floor:
+                break
+            if index not in chosen and vendor in vendor_sets[index]:
+                take(index)
+    return [(table.market(index), candidates[index]) for index in ranked if index in chosen]
+
+
+# With a decoder the thread only fetches bytes; parsing and per-point conversion run in its processes.
+def fetch_one_history(
+    market: MarketRef,
+    vendors: list[str],
+    days: int,
+    interval: str = "DAY",
+    decoder: HistoryDecoder | None = None,
+) -> tuple[MarketRef, list[HistoryRow], list[str]]:
+    if decoder is not None:
+        return market, decoder.fetch(market, days, interval), vendors
+    history = fetch_market_history(market.unique_key, market.chain_id, days=days, interval=interval)
+    return market, list(unit_history_rows(history, market.loan_asset_decimals)), vendors
 
 
-def build_historical_vendor_series(selected: list[tuple[MarketRef, list[str]]], current_prices: dict[tuple[int, str], float], days: int) -> tuple[list[dict], list[str]]:
-    totals: dict[tuple[str, str, str], float] = defaultdict(float)
-    errors: list[str] = []
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+def build_historical_vendor_series(
+    selected: list[tuple[MarketRef, list[str]]],
+    current_prices: dict[tuple[int, str], float],
+    days: int,
+    interval: str = "DAY",
+    journal: HistoryJournal | None = None,
+    repricing: str = "current",
+    time_budget: float | None = None,
+    gap_fill: str = DEFAULT_GAP_FILL,
+    decode_workers: int = HISTORY_DECODE_WORKERS,
+    end: dt.datetime | None = None,
+) -> tuple[Iterator[dict], list[dict], list[tuple[MarketRef, list[str]]]]:
+    exposure = AssetExposureAccumulator(days, interval, end=end, gap_fill=gap_fill)
+    vendors_by_signature: dict[str, list[str]] = {}
+    errors: list[dict] = []
+    # Histories are clipped to the pinned window. A window pinned a day or more ago (a
+    # resumed journal) is fetched far enough back to reach its start.
+    window_start_ts = exposure.end_ts - days * DAY_SECONDS
+    lag_seconds = int(time.time()) - exposure.end_ts
+    fetch_days = days if lag_seconds < DAY_SECONDS else days + -(-lag_seconds // DAY_SECONDS)
+
+    def add_history(market: MarketRef, history_rows: list[HistoryRow], vendors: list[str]) -> None:
+        signature = vendor_signature(vendors)
+        vendors_by_signature[signature] = sorted(set(vendors))
+        exposure.add_history(signature, (market.chain_id, market.loan_asset_address), history_rows)
+
+    pending: list[tuple[MarketRef, list[str]]] = []
+    journaled: dict[tuple[int, str], tuple[MarketRef, list[str]]] = {}
+    for market, vendors in selected:
+        if journal is not None and journal.is_complete(market):
+            journaled[(market.chain_id, market.unique_key)] = (market, vendors)
+        else:
+            pending.append((market, vendors))
+    # Journaled rows are replayed from the file rather than kept in memory alongside the accumulator.
+    if journaled:
+        for key, history_rows in journal.iter_completed_rows(journaled):
+            market, vendors = journaled[key]
+            add_history(market, history_rows, vendors)
+
+    # Submit in priority (descending supply) order with at most MAX_WORKERS in flight, so a
+    # deadline leaves the largest markets fetched and nothing queued behind it. The time
+    # budget covers these fetches only; it starts once the journal has been replayed.
+    queue = deque(pending)
+    in_flight: dict = {}
+    with HistoryDecoder(decode_workers) as decoder:
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            while queue or in_flight:
+                while queue and len(in_flight) < MAX_WORKERS and (deadline is None or time.monotonic() < deadline):
+                    market, vendors = queue.popleft()
+                    in_flight[executor.submit(fetch_one_history, market, vendors, fetch_days, interval, decoder)] = (market, vendors)
+                if not in_flight:
+                    break
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    market, vendors = in_flight.pop(future)
+                    try:
+                        market_obj, history_rows, vendors = future.result()
+                    except Exception as exc:
+                        if journal is not None:
+                            errors.append(journal.record_failed(market, vendors, str(exc)))
+                        else:
+                            errors.append(history_error_row(market, vendors, str(exc)))
+                        continue
+                    history_rows = [row for row in history_rows if window_start_ts <= row[0] <= exposure.end_ts]
+                    if journal is not None:
+                        journal.record_done(market_obj, history_rows)
+                    add_history(market_obj, history_rows, vendors)
+        finally:
+            # Past the deadline, in-flight requests are abandoned rather than awaited. Their
+            # futures are never read again, and once the decoder below is closed their
+            # threads get CancelledError instead of submitting to its pool.
+            executor.shutdown(wait=deadline is None, cancel_futures=True)
+    unfetched = [*in_flight.values(), *queue]
+
+    # The report has always fallen back to USD where a point cannot be repriced.
+    accumulator = exposure.group_totals(current_prices, repricing, fallback_to_usd=True)
+    return accumulator_rows(accumulator.split_keys(vendors_by_signature)), errors, unfetched
+
+
+# Rows are produced lazily from the finished accumulator; the pyramid is their only copy.
+def accumulator_rows(accumulator: ExposureAccumulator) -> Iterator[dict]:
+    for offset, vendor, metric, value in accumulator.iter_cells():
+        yield {
+            "timestamp": accumulator.bucket_timestamp(offset),
+            "vendor": vendor,
+            "metric": metric,
+            "exposure_usd": round(value, 2),
+        }
+
+
+# Fetch only the preview sample and scale it up to the candidate universe. Bands for the
+# primary metric are stored as `<metric>_lower` / `<metric>_upper` rows.
+def build_preview_vendor_series(
+    sample: PreviewSample,
+    current_prices: dict[tuple[int, str], float],
+    days: int,
+    interval: str = "DAY",
+    repricing: str = "current",
+    rounds: int = PREVIEW_BOOTSTRAP_ROUNDS,
+    gap_fill: str = DEFAULT_GAP_FILL,
+    decode_workers: int = HISTORY_DECODE_WORKERS,
+) -> tuple[Iterator[dict], list[dict]]:
+    exposure = AssetExposureAccumulator(days, interval, gap_fill=gap_fill)
+    fetched = [False] * len(sample.markets)
+    errors: list[dict] = []
+    with HistoryDecoder(decode_workers) as decoder, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = {
-            executor.submit(fetch_one_history, market, vendors, current_prices, days): (market, vendors)
-            for market, vendors in selected
+            executor.submit(fetch_one_history, market, vendors, days, interval, decoder): index
+            for index, (market, vendors) in enumerate(sample.markets)
         }
         for future in as_completed(futures):
-            market, vendors = futures[future]
+            index = futures[future]
+            market, vendors = sample.markets[index]
             try:
-                market_obj, history_rows, vendors = future.result()
+                _, history_rows, _ = future.result()
             except Exception as exc:
-                errors.append(f"{market.chain_id}:{market.unique_key}: {exc}")
+                errors.append(history_error_row(market, vendors, str(exc)))
                 continue
-            for point in history_rows:
-                day = point["timestamp"]
-                for metric in ("supply_usd", "borrow_usd", "repriced_supply_usd", "repriced_borrow_usd"):
-                    split = allocate_evenly(float(point[metric]), vendors)
-                    for vendor, value in split.items():
-                        totals[(str(day), vendor, metric)] += value
+            fetched[index] = True
+            exposure.add_history(sample_key(index), (market.chain_id, market.loan_asset_address), history_rows)
 
-    rows = [
-        {
-            "timestamp": timestamp,
-            "vendor": vendor,
-            "metric": metric,
-            "exposure_usd": round(value, 2),
+    market_totals = exposure.group_totals(current_prices, repricing, fallback_to_usd=True)
+    estimate = accumulator_rows(estimate_vendor_totals(sample, fetched, market_totals))
+    bands = bootstrap_bands(sample, fetched, market_totals, PRIMARY_METRIC, rounds)
+    return chain(estimate, band_rows(market_totals, bands)), errors
+
+
+def band_rows(accumulator: ExposureAccumulator, bands: Iterable[tuple[int, str, float, float]]) -> Iterator[dict]:
+    for offset, vendor, lower, upper in bands:
+        for bound, value in (("lower", lower), ("upper", upper)):
+            yield {
+                "timestamp": accumulator.bucket_timestamp(offset),
+                "vendor": vendor,
+                "metric": f"{PRIMARY_METRIC}_{bound}",
+                "exposure_usd": round(value, 2),
+            }
+
+
+def write_csv(path: Path, rows: Iterable[dict], fields: Iterable[str]) -> int:
+    return write_csv_rows(path, rows, tuple(fields))
+
+
+def history_rows_to_points(rows: Iterable[dict], interval: str = "DAY") -> Iterator[VendorExposurePoint]:
+    for row in rows:
+        yield VendorExposurePoint(
+            as_of=history_bucket(int(row["timestamp"]), interval),
+            vendor=row["vendor"],
+            metric=row["metric"],
+            exposure_usd=float(row["exposure_usd"]),
+        )
+
+
+def as_of_timestamp(as_of: dt.date) -> int:
+    if isinstance(as_of, dt.datetime):
+        return int(as_of.timestamp())
+    return int(dt.datetime(as_of.year, as_of.month, as_of.day, tzinfo=dt.timezone.utc).timestamp())
+
+
+def points_to_history_rows(points: Iterable[VendorExposurePoint]) -> Iterator[dict]:
+    for point in points:
+        yield {
+            "timestamp": as_of_timestamp(point.as_of),
+            "vendor": point.vendor,
+            "metric": point.metric,
+            "exposure_usd": round(point.exposure_usd, 2),
         }
-        for (timestamp, vendor, metric), value in sorted(totals.items(), key=lambda item: (int(item[0][0]), item[0][1], item[0][2]))
-    ]
-    return rows, errors
 
 
-def write_csv(path: Path, rows: list[dict]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    if not rows:
-        path.write_text("", encoding="utf-8")
-        return
-    with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(rows)
+# Reuse a saved pyramid when it was built today with the same filters and covers the window.
+def load_cached_pyramid(path: Path, days: int, filters: dict, today: dt.date) -> HistoryPyramid | None:
+    if not path.exists():
+        return None
+    try:
+        pyramid = load_history_pyramid(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if pyramid.metadata.get("filters") != filters or not pyramid.covers(days, end=today):
+        return None
+    if pyramid.metadata.get("partial"):
+        return None
+    return pyramid
 
 
 def load_series(rows: list[dict], metric: str) -> dict[str, list[tuple[int, float]]]:
@@ -174,7 +435,15 @@ def filter_top_vendors(series: dict[str, list[tuple[int, float]]], top_n: int =
     return top
 
 
-def plot_line_chart(series: dict[str, list[tuple[int, float]]], title: str, output_png: Path, output_svg: Path) -> None:
+def plot_line_chart(
+    series: dict[str, list[tuple[int, float]]],
+    title: str,
+    output_png: Path,
+    output_svg: Path,
+    bands: dict[str, tuple[list[tuple[int, float]], list[tuple[int, float]]]] | None = None,
+    max_points: int = CHART_POINT_BUDGET,
+) -> None:
+    series = downsample_series(series, max_points)
     apply_monarch_style(plt)
     fig, ax = plt.subplots(figsize=(12, 7))
     fig.patch.set_facecolor(PANEL)
@@ -185,6 +454,16 @@ def plot_line_chart(series: dict[str, list[tuple[int, float]]], title: str, outp
         color = series_color(index)
         if vendor == "Other":
             color = MUTED
+        if bands and vendor in bands:
+            lower, upper = (dict(bound) for bound in bands[vendor])
+            ax.fill_between(
+                xs,
+                [lower.get(ts, value) / 1_000_000 for ts, value in values],
+                [upper.get(ts, value) / 1_000_000 for ts, value in values],
+                color=color,
+                alpha=0.18,
+                linewidth=0,
+            )
         ax.plot(xs, ys, label=vendor, color=color, linewidth=2.4)
     ax.set_title(title)
     ax.set_ylabel("USD exposure (millions)")
@@ -215,7 +494,15 @@ def normalize_share_series(series: dict[str, list[tuple[int, float]]]) -> dict[s
     return normalized
 
 
-def plot_share_chart(series: dict[str, list[tuple[int, float]]], title: str, output_png: Path, output_svg: Path) -> None:
+# Shares are normalized on the full series; only the plotted points are decimated.
+def plot_share_chart(
+    series: dict[str, list[tuple[int, float]]],
+    title: str,
+    output_png: Path,
+    output_svg: Path,
+    max_points: int = CHART_POINT_BUDGET,
+) -> None:
+    series = downsample_series(series, max_points)
     apply_monarch_style(plt)
     fig, ax = plt.subplots(figsize=(12, 7))
     fig.patch.set_facecolor(PANEL)
@@ -281,14 +568,76 @@ def plot_growth_chart(rows: list[dict], title: str, output_png: Path, output_svg
     plt.close(fig)
 
 
-def write_summary(current_totals: list[dict], assumption_totals: list[dict], growth_rows: list[dict], history_errors: list[str], selected_count: int, output_path: Path) -> None:
+# Top-1/top-3 share and HHI of one metric, decimated like the other charts.
+def plot_concentration_chart(
+    points: Iterable[ConcentrationPoint],
+    title: str,
+    output_png: Path,
+    output_svg: Path,
+    max_points: int = CHART_POINT_BUDGET,
+) -> None:
+    shares: dict[str, list[tuple[int, float]]] = {"Top-1 share": [], "Top-3 share": []}
+    hhi: dict[str, list[tuple[int, float]]] = {"HHI": []}
+    for point in points:
+        ts = as_of_seconds(point.as_of)
+        shares["Top-1 share"].append((ts, point.top1_share_pct))
+        shares["Top-3 share"].append((ts, point.top3_share_pct))
+        hhi["HHI"].append((ts, point.hhi))
+    apply_monarch_style(plt)
+    fig, (share_ax, hhi_ax) = plt.subplots(2, 1, figsize=(12, 8), sharex=True, height_ratios=(3, 2))
+    fig.patch.set_facecolor(PANEL)
+    for index, (name, values) in enumerate(downsample_series(shares, max_points).items()):
+        share_ax.plot([dt.datetime.utcfromtimestamp(ts) for ts, _ in values], [value for _, value in values], label=name, color=series_color(index), linewidth=2.4)
+    for values in downsample_series(hhi, max_points).values():
+        hhi_ax.plot([dt.datetime.utcfromtimestamp(ts) for ts, _ in values], [value for _, value in values], color=MUTED, linewidth=2.0)
+    share_ax.set_title(title)
+    share_ax.set_ylabel("Share of total exposure (%)")
+    share_ax.set_ylim(0, 100)
+    hhi_ax.set_ylabel("HHI (0-10000)")
+    hhi_ax.set_xlabel("date")
+    for ax in (share_ax, hhi_ax):
+        ax.set_facecolor(PANEL)
+        ax.grid(True, axis="y")
+    legend = share_ax.legend(frameon=True)
+    for text in legend.get_texts():
+        text.set_color(TEXT)
+    fig.tight_layout()
+    fig.savefig(output_png, dpi=180)
+    fig.savefig(output_svg)
+    plt.close(fig)
+
+
+def write_summary(
+    current_totals: list[dict],
+    assumption_totals: list[dict],
+    growth_rows: list[dict],
+    history_errors: list[dict],
+    selected_count: int,
+    output_path: Path,
+    coverage_rows: list[dict] | None = None,
+    unfetched_count: int = 0,
+    preview: dict | None = None,
+    selection: dict | None = None,
+) -> list[str]:
     supply = [row for row in current_totals if row["metric"] == "supply_usd"]
     total_supply = sum(row["exposure_usd"] for row in supply)
     top_three = supply[:3]
+    if preview:
+        series_line = (
+            f"- Historical series estimated for {preview['population']} markets from a stratified sample of {selected_count} "
+            f"(the {preview['certain']} largest always included); shaded bands are {preview['confidence']:.0%} bootstrap intervals."
+        )
+    elif selection:
+        series_line = (
+            f"- Historical series built from the {selected_count} markets needed to cover {selection['coverage_target_pct']:g}% of current "
+            f"recognized supply and at least {selection['vendor_floor_pct']:g}% of each vendor's, using immutable oracle composition."
+        )
+    else:
+        series_line = f"- Historical series built from the top {selected_count} current markets by supply using immutable oracle composition."
     lines = [
-        "# Oracle dominance v1 findings",
+        "# Oracle dominance v1 findings" + (" (partial)" if unfetched_count else " (preview)" if preview else ""),
         "",
-        f"- Historical series built from the top {selected_count} current markets by supply using immutable oracle composition.",
+        series_line,
         f"- Current recognized supply exposure in this cut: ${total_supply:,.0f}.",
         f"- Top 3 current supply vendors: " + ", ".join(f"{row['vendor']} (${row['exposure_usd']:,.0f})" for row in top_three) + ".",
         "- Assumption totals are still heuristic in this version and are excluded from the headline summary until the shared assumption engine is locked.",
@@ -298,83 +647,412 @@ def write_summary(current_totals: list[dict], assumption_totals: list[dict], gro
         lines.append(f"- Fastest grower by percentage over the window: {best['vendor']} ({best['pct_gain']}%, ${best['abs_gain_usd']:,.0f} absolute gain).")
     if history_errors:
         lines.append(f"- Historical fetch failures skipped: {len(history_errors)} markets.")
+    if unfetched_count:
+        lines.append(
+            f"- Partial run: the time budget expired before {unfetched_count} selected markets were fetched; "
+            "historical series understate exposure for those markets."
+        )
+    if coverage_rows:
+        lines.append(f"- Historical series cover {total_coverage_pct(coverage_rows):.1f}% of current recognized supply (per vendor in `history_coverage_*.csv`).")
+        if selection:
+            lowest = min(coverage_rows, key=lambda row: (row["coverage_pct"], row["vendor"]))
+            lines.append(f"- Lowest vendor coverage: {lowest['vendor']} at {lowest['coverage_pct']:.1f}% of its current supply.")
     output_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return lines
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description='Build oracle dominance report from live research fetches')
-    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='Historical lookback window in days')
-    parser.add_argument('--top-markets', type=int, default=TOP_HISTORY_MARKETS, help='Number of markets to include in history build')
-    parser.add_argument('--min-borrow-usd', type=float, default=500_000, help='Minimum current market borrow USD for inclusion')
-    parser.add_argument('--require-listed', action='store_true', help='Only include markets present in the Monarch indexer universe')
-    parser.add_argument('--recognized-tokens-only', action='store_true', help='Exclude markets whose token symbols are unknown')
-    args = parser.parse_args()
+def write_window_report(
+    pyramid: HistoryPyramid,
+    days: int,
+    top_markets: int,
+    interval_suffix: str = "",
+    label: str = "",
+    max_points: int = CHART_POINT_BUDGET,
+    concentration: list[ConcentrationPoint] | None = None,
+    chart_format: str = "png",
+) -> tuple[str, list[dict]]:
+    suffix = f"{days}d_top{top_markets}{interval_suffix}"
+    resolution = resolution_for_window(days, pyramid.finest)
+    if concentration is None:
+        concentration = list(iter_concentration(pyramid.window(pyramid.days, pyramid.finest)))
+    window_start = pyramid.window_start(days, pyramid.finest)
+    concentration = [point for point in concentration if point.as_of >= window_start]
+    level_rows = list(points_to_history_rows(pyramid.window(days, resolution)))
+    growth_rows = build_growth_rows(load_series(level_rows, PRIMARY_METRIC))
 
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    markets = fetch_live_markets(
-        min_borrow_usd=args.min_borrow_usd,
-        require_listed=args.require_listed,
-        recognized_tokens_only=args.recognized_tokens_only,
-    )
-    metadata = fetch_oracle_metadata(markets)
-    current_prices = infer_current_loan_asset_prices(markets)
-    current_rows = build_current_exposure_table(markets, metadata)
-    current_totals = aggregate_current_vendor_totals(current_rows)
-    assumption_totals = aggregate_current_assumption_totals(current_rows)
-    selected = select_top_history_markets(markets, metadata, args.top_markets)
-    historical_rows, history_errors = build_historical_vendor_series(selected, current_prices, days=args.days)
-    growth_rows = build_growth_rows(load_series(historical_rows, PRIMARY_METRIC))
-
-    suffix = f"{args.days}d_top{args.top_markets}"
-    write_csv(OUTPUT_DIR / 'vendor_current_totals.csv', current_totals)
-    write_csv(OUTPUT_DIR / 'assumption_current_totals.csv', assumption_totals)
-    write_csv(
-        OUTPUT_DIR / 'markets_with_assumptions.csv',
-        [
-            row
-            for row in current_rows
-            if int(row.get('assumption_count', 0) or 0) > 0
-        ],
-    )
-    write_csv(OUTPUT_DIR / f'vendor_dominance_{suffix}.csv', historical_rows)
-    write_csv(OUTPUT_DIR / f'vendor_growth_{suffix}.csv', growth_rows)
-    write_csv(OUTPUT_DIR / f'history_errors_{suffix}.csv', [{"error": error} for error in history_errors])
+    # The finest-level rows are only written out, so they stream straight from the pyramid.
+    write_csv(OUTPUT_DIR / f'vendor_dominance_{suffix}.csv', points_to_history_rows(pyramid.window(days, pyramid.finest)), HISTORY_CSV_FIELDS)
+    write_csv(OUTPUT_DIR / f'vendor_growth_{suffix}.csv', growth_rows, GROWTH_FIELDS)
+    write_csv(OUTPUT_DIR / f'vendor_concentration_{suffix}.csv', concentration_rows(concentration), concentration_fields())
+    if chart_format == 'html':
+        return suffix, growth_rows
 
-    top_line_series = filter_top_vendors(load_series(historical_rows, PRIMARY_METRIC), top_n=8)
+    top_line_series = filter_top_vendors(load_series(level_rows, PRIMARY_METRIC), top_n=8)
+    lower = load_series(level_rows, f'{PRIMARY_METRIC}_lower')
+    upper = load_series(level_rows, f'{PRIMARY_METRIC}_upper')
+    bands = {vendor: (lower[vendor], upper.get(vendor, [])) for vendor in lower}
     plot_line_chart(
         top_line_series,
-        f'Oracle dominance over time (repriced supply, top {args.top_markets} markets)',
+        f'Oracle dominance over time (repriced supply, top {top_markets} markets{label})',
         OUTPUT_DIR / f'oracle_dominance_{suffix}.png',
         OUTPUT_DIR / f'oracle_dominance_{suffix}.svg',
+        bands,
+        max_points,
     )
     non_chainlink = {k: v for k, v in top_line_series.items() if k != 'Chainlink'}
     if non_chainlink:
         plot_line_chart(
             non_chainlink,
-            f'Non-Chainlink oracle dominance over time (repriced supply, top {args.top_markets} markets)',
+            f'Non-Chainlink oracle dominance over time (repriced supply, top {top_markets} markets{label})',
             OUTPUT_DIR / f'oracle_dominance_non_chainlink_{suffix}.png',
             OUTPUT_DIR / f'oracle_dominance_non_chainlink_{suffix}.svg',
+            bands,
+            max_points,
         )
         plot_share_chart(
             normalize_share_series(non_chainlink),
-            f'Non-Chainlink oracle share over time (normalized to 100%)',
+            f'Non-Chainlink oracle share over time (normalized to 100%{label})',
             OUTPUT_DIR / f'oracle_share_non_chainlink_{suffix}.png',
             OUTPUT_DIR / f'oracle_share_non_chainlink_{suffix}.svg',
+            max_points,
         )
+    plot_concentration_chart(
+        [point for point in concentration if point.metric == PRIMARY_METRIC],
+        f'Oracle vendor concentration (repriced supply, top {top_markets} markets{label})',
+        OUTPUT_DIR / f'oracle_concentration_{suffix}.png',
+        OUTPUT_DIR / f'oracle_concentration_{suffix}.svg',
+        max_points,
+    )
     plot_growth_chart(
         growth_rows,
-        'Top oracle growers over the window',
+        f'Top oracle growers over the window{label}',
         OUTPUT_DIR / f'oracle_growth_{suffix}.png',
         OUTPUT_DIR / f'oracle_growth_{suffix}.svg',
     )
-    write_summary(current_totals, assumption_totals, growth_rows, history_errors, len(selected), OUTPUT_DIR / 'RESEARCH_SUMMARY.md')
+    return suffix, growth_rows
+
+
+def html_report_window(pyramid: HistoryPyramid, days: int, suffix: str, top_markets: int, label: str = "") -> ReportWindow:
+    level = resolution_for_window(days, pyramid.finest)
+    return ReportWindow(
+        name=suffix,
+        days=days,
+        level=level,
+        start=as_of_timestamp(pyramid.window_start(days, level)),
+        concentration_start=as_of_timestamp(pyramid.window_start(days, pyramid.finest)),
+        views=[
+            ReportView('line', f'Oracle dominance over time (repriced supply, top {top_markets} markets{label})'),
+            ReportView('line', f'Non-Chainlink oracle dominance over time (repriced supply, top {top_markets} markets{label})', ['Chainlink']),
+            ReportView('share', f'Non-Chainlink oracle share over time (normalized to 100%{label})', ['Chainlink']),
+            ReportView('concentration', f'Oracle vendor concentration (repriced supply, top {top_markets} markets{label})'),
+            ReportView('growth', f'Top oracle growers over the window{label}'),
+        ],
+    )
+
+
+# One HTML file for every window: each pyramid level a window charts from is embedded
+# once, over the longest window that uses it, and the page slices it per window.
+def write_html_dominance_report(
+    path: Path,
+    pyramid: HistoryPyramid,
+    windows: list[ReportWindow],
+    summary_lines: list[str],
+    concentration: list[ConcentrationPoint],
+) -> Path:
+    spans: dict[str, int] = {}
+    for window in windows:
+        spans[window.level] = max(spans.get(window.level, 0), window.days)
+    metrics = (PRIMARY_METRIC, f'{PRIMARY_METRIC}_lower', f'{PRIMARY_METRIC}_upper')
+    levels = {}
+    for level, days in spans.items():
+        rows = list(points_to_history_rows(pyramid.window(days, level)))
+        levels[level] = encode_series_block({metric: series for metric in metrics if (series := load_series(rows, metric))})
+    shares: dict[str, list[tuple[int, float]]] = {'Top-1 share': [], 'Top-3 share': []}
+    hhi: dict[str, list[tuple[int, float]]] = {'HHI': []}
+    for point in concentration:
+        if point.metric != PRIMARY_METRIC:
+            continue
+        ts = as_of_seconds(point.as_of)
+        shares['Top-1 share'].append((ts, point.top1_share_pct))
+        shares['Top-3 share'].append((ts, point.top3_share_pct))
+        hhi['HHI'].append((ts, point.hhi))
+    title = summary_lines[0].lstrip('# ') if summary_lines else 'Oracle dominance report'
+    return write_html_report(
+        path,
+        title,
+        levels,
+        windows,
+        PRIMARY_METRIC,
+        summary_lines[1:],
+        encode_series_block({'share': shares, 'hhi': hhi}, digits={'share': 4, 'hhi': 2}),
+    )
+
+
+# Estimate the run from the same selection, pyramid reuse and journal the real run would use.
+def plan_report(
+    args: argparse.Namespace,
+    fetch_days: int,
+    filters: dict,
+    today: dt.date,
+    pyramid_path: Path,
+    journal_path: Path,
+    journal_config: dict,
+) -> dict:
+    plan = RunPlan(concurrency=MAX_WORKERS)
+    markets, metadata = plan_market_universe(
+        plan,
+        min_borrow_usd=args.min_borrow_usd,
+        require_listed=args.require_listed,
+        recognized_tokens_only=args.recognized_tokens_only,
+    )
+    completed: set[tuple[int, str]] = set()
+    pyramid_reused = False
+    if args.preview:
+        candidates = select_top_history_markets(markets, metadata, len(markets))
+        selected = draw_preview_sample(candidates, args.preview_sample).markets
+    elif not (args.refresh_history or args.resume) and load_cached_pyramid(pyramid_path, fetch_days, filters, today) is not None:
+        selected = []
+        pyramid_reused = True
+    else:
+        if args.coverage_target is None:
+            selected = select_top_history_markets(markets, metadata, args.top_markets)
+        else:
+            selected = select_coverage_history_markets(markets, metadata, args.coverage_target, args.vendor_coverage_floor)
+        if args.resume and journal_path.exists():
+            completed = set(read_journal(journal_path, journal_config).completed)
+    plan_history(plan, [market for market, _ in selected], fetch_days, args.interval, completed)
+    return {
+        **plan.as_dict(),
+        'days': fetch_days,
+        'interval': args.interval,
+        'pyramid_reused': pyramid_reused,
+        'time_budget_seconds': args.time_budget,
+        'filters': filters,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build oracle dominance report from live research fetches')
+    parser.add_argument('--days', type=int, default=HISTORY_DAYS, help='Historical lookback window in days')
+    parser.add_argument('--windows', type=int, nargs='*', default=[], help='Extra report windows in days, served from one fetch of the longest window')
+    parser.add_argument('--interval', choices=['HOUR', 'DAY', 'WEEK'], default='DAY', help='Historical point interval; long windows are fetched in concurrent time chunks')
+    parser.add_argument('--top-markets', type=int, default=TOP_HISTORY_MARKETS, help='Number of markets to include in history build')
+    parser.add_argument('--coverage-target', type=float, default=None, help='Select history markets by cumulative share of recognized supply (percent, e.g. 98) instead of --top-markets')
+    parser.add_argument('--vendor-coverage-floor', type=float, default=0.0, help='With --coverage-target, keep adding markets until every vendor has at least this percent of its supply covered')
+    parser.add_argument('--repricing', choices=REPRICING_MODES, default='current', help="Loan-asset price for repriced series: today's price, or the per-day price observed across markets")
+    parser.add_argument('--gap-fill', choices=GAP_FILL_MODES, default=DEFAULT_GAP_FILL, help="Fill buckets a market's history skipped (up to 7 days) by carrying the last value forward or interpolating, before aggregation")
+    parser.add_argument('--min-borrow-usd', type=float, default=500_000, help='Minimum current market borrow USD for inclusion')
+    parser.add_argument('--require-listed', action='store_true', help='Only include markets present in the Monarch indexer universe')
+    parser.add_argument('--recognized-tokens-only', action='store_true', help='Exclude markets whose token symbols are unknown')
+    parser.add_argument('--refresh-history', action='store_true', help="Refetch history even if today's saved pyramid covers the windows")
+    parser.add_argument('--resume', action='store_true', help='Resume from the history journal: skip completed markets, retry failed and pending ones')
+    parser.add_argument('--time-budget', type=float, default=None, help='Seconds for the history fetches; histories are fetched largest-supply first and the report is written as partial when time runs out')
+    parser.add_argument('--decode-workers', type=int, default=HISTORY_DECODE_WORKERS, help='Processes that parse and convert fetched history payloads so fetch threads stay I/O-bound (0 decodes on the fetch threads; capped at the CPU count)')
+    parser.add_argument('--preview', action='store_true', help='Estimate history from a stratified market sample with bootstrap bands instead of fetching every selected market')
+    parser.add_argument('--preview-sample', type=int, default=PREVIEW_SAMPLE_SIZE, help='Markets fetched in --preview mode, including the largest ones')
+    parser.add_argument('--format', choices=REPORT_FORMATS, default='png', help='Charts as one self-contained HTML report rendered client-side, matplotlib PNG/SVG files per window, or both')
+    parser.add_argument('--chart-points', type=int, default=CHART_POINT_BUDGET, help='Maximum plotted points per series (LTTB decimation; CSVs keep every point)')
+    parser.add_argument('--preview-rounds', type=int, default=PREVIEW_BOOTSTRAP_ROUNDS, help='Bootstrap rounds for --preview uncertainty bands')
+    parser.add_argument('--plan', action='store_true', help='Resolve filters and selection, then print expected requests, payload bytes, cache hits and wall time without fetching history')
+    parser.add_argument('--cache-dir', default=None, help='Shared market data cache directory reused across studies and runs (default $MARKET_DATA_CACHE_DIR, memory only if unset)')
+    args = parser.parse_args()
+    if args.cache_dir:
+        set_default_store(MarketDataStore(args.cache_dir))
+
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    report_windows = sorted({args.days, *args.windows})
+    fetch_days = report_windows[-1]
+    filters = {
+        'top_markets': args.top_markets if args.coverage_target is None else None,
+        'coverage_target_pct': args.coverage_target,
+        'vendor_floor_pct': args.vendor_coverage_floor if args.coverage_target is not None else None,
+        'min_borrow_usd': args.min_borrow_usd,
+        'require_listed': args.require_listed,
+        'recognized_tokens_only': args.recognized_tokens_only,
+        'interval': args.interval,
+        'repricing': args.repricing,
+        'gap_fill': args.gap_fill,
+    }
+    interval_suffix = '' if args.interval == 'DAY' else f'_{args.interval.lower()}'
+    selection = None
+    selection_tag = f'top{args.top_markets}'
+    if args.coverage_target is not None:
+        selection = {'coverage_target_pct': args.coverage_target, 'vendor_floor_pct': args.vendor_coverage_floor}
+        selection_tag = f'cov{args.coverage_target:g}' + (f'_floor{args.vendor_coverage_floor:g}' if args.vendor_coverage_floor else '')
+    today = dt.datetime.now(dt.timezone.utc).date()
+    pyramid_path = OUTPUT_DIR / f'vendor_history_pyramid_{selection_tag}{interval_suffix}.json'
+    journal_path = OUTPUT_DIR / f'history_journal_{fetch_days}d_{selection_tag}{interval_suffix}.jsonl'
+    # Journal rows are raw and unpriced, so one journal serves every repricing and gap fill mode.
+    # The journal pins its own window end, so a resume may start on a later day.
+    journal_config = {**filters, 'days': fetch_days}
+    journal_config.pop('repricing')
+    journal_config.pop('gap_fill')
+    if args.plan:
+        try:
+            plan = plan_report(args, fetch_days, filters, today, pyramid_path, journal_path, journal_config)
+        except StaleJournalError as exc:
+            parser.error(str(exc))
+        print(json.dumps(plan, indent=2, sort_keys=True))
+        return
+
+    markets = fetch_live_market_table(
+        min_borrow_usd=args.min_borrow_usd,
+        require_listed=args.require_listed,
+        recognized_tokens_only=args.recognized_tokens_only,
+    )
+    metadata = fetch_oracle_metadata(markets)
+    current_prices = infer_current_loan_asset_prices(markets)
+    current_rows = build_current_exposure_table(markets, metadata)
+    current_totals = aggregate_current_vendor_totals(current_rows)
+    assumption_totals = aggregate_current_assumption_totals(current_rows)
+
+    if args.preview:
+        report_suffix = f'{interval_suffix}_preview'
+        candidates = select_top_history_markets(markets, metadata, len(markets))
+        sample = draw_preview_sample(candidates, args.preview_sample)
+        historical_rows, history_errors = build_preview_vendor_series(
+            sample,
+            current_prices,
+            days=fetch_days,
+            interval=args.interval,
+            repricing=args.repricing,
+            rounds=args.preview_rounds,
+            gap_fill=args.gap_fill,
+            decode_workers=args.decode_workers,
+        )
+        failed_keys = {(int(error['chain_id']), error['unique_key']) for error in history_errors}
+        sampled_keys = {(market.chain_id, market.unique_key) for market, _ in sample.markets} - failed_keys
+        pyramid = build_history_pyramid(
+            history_rows_to_points(historical_rows, args.interval),
+            days=fetch_days,
+            end=today,
+            metadata={
+                'filters': filters,
+                'selected_markets': len(sample.markets),
+                'history_errors': history_errors,
+                'preview': {
+                    'population': sample.population,
+                    'certain': min(PREVIEW_CERTAIN_MARKETS, len(sample.markets)),
+                    'strata': len(sample.stratum_sizes),
+                    'rounds': args.preview_rounds,
+                    'confidence': PREVIEW_CONFIDENCE,
+                },
+                'supply_coverage': aggregate_supply_coverage(current_rows, sampled_keys),
+            },
+        )
+        save_history_pyramid(OUTPUT_DIR / f'vendor_history_pyramid_preview{interval_suffix}.json', pyramid)
+    else:
+        report_suffix = interval_suffix if selection is None else f'_{selection_tag}{interval_suffix}'
+        pyramid = None if args.refresh_history or args.resume else load_cached_pyramid(pyramid_path, fetch_days, filters, today)
+        if pyramid is None:
+            if selection is None:
+                selected = select_top_history_markets(markets, metadata, args.top_markets)
+            else:
+                selected = select_coverage_history_markets(markets, metadata, args.coverage_target, args.vendor_coverage_floor)
+            try:
+                journal = HistoryJournal(journal_path, journal_config, resume=args.resume)
+            except StaleJournalError as exc:
+                parser.error(str(exc))
+            with journal:
+                historical_rows, history_errors, unfetched = build_historical_vendor_series(
+                    selected,
+                    current_prices,
+                    days=fetch_days,
+                    interval=args.interval,
+                    journal=journal,
+                    repricing=args.repricing,
+                    time_budget=args.time_budget,
+                    gap_fill=args.gap_fill,
+                    decode_workers=args.decode_workers,
+                    end=journal.window_end,
+                )
+            missing_keys = {(market.chain_id, market.unique_key) for market, _ in unfetched}
+            missing_keys.update((int(error['chain_id']), error['unique_key']) for error in history_errors)
+            covered_keys = {(market.chain_id, market.unique_key) for market, _ in selected} - missing_keys
+            pyramid = build_history_pyramid(
+                history_rows_to_points(historical_rows, args.interval),
+                days=fetch_days,
+                end=journal.window_end.date(),
+                metadata={
+                    'filters': filters,
+                    'selected_markets': len(selected),
+                    'history_errors': history_errors,
+                    'partial': bool(unfetched),
+                    'unfetched_markets': len(unfetched),
+                    'time_budget_seconds': args.time_budget,
+                    'supply_coverage': aggregate_supply_coverage(current_rows, covered_keys),
+                    'selection': selection,
+                },
+            )
+            save_history_pyramid(pyramid_path, pyramid)
+    history_errors = list(pyramid.metadata.get('history_errors') or [])
+    selected_count = int(pyramid.metadata.get('selected_markets') or 0)
+    unfetched_count = int(pyramid.metadata.get('unfetched_markets') or 0)
+    coverage_rows = list(pyramid.metadata.get('supply_coverage') or [])
+    preview = pyramid.metadata.get('preview')
+    report_top = args.top_markets if selection is None else selected_count
+    label = f', partial: {total_coverage_pct(coverage_rows):.1f}% of supply' if unfetched_count else ''
+    if preview:
+        report_top = preview['population']
+        label = f", preview: {selected_count}-market sample, {preview['confidence']:.0%} bands"
+
+    write_csv(OUTPUT_DIR / 'vendor_current_totals.csv', current_totals, totals_fields('vendor'))
+    write_csv(OUTPUT_DIR / 'assumption_current_totals.csv', assumption_totals, totals_fields('assumption'))
+    assumption_market_count = write_csv(
+        OUTPUT_DIR / 'markets_with_assumptions.csv',
+        (row for row in current_rows if int(row.get('assumption_count', 0) or 0) > 0),
+        CURRENT_EXPOSURE_FIELDS,
+    )
+
+    # Errors and coverage describe the fetch, not a window: one file each, named for the requested window.
+    main_suffix = f"{args.days}d_top{report_top}{report_suffix}"
+    write_csv(OUTPUT_DIR / f'history_errors_{main_suffix}.csv', history_errors, HISTORY_ERROR_FIELDS)
+    write_csv(OUTPUT_DIR / f'history_coverage_{main_suffix}.csv', coverage_rows, COVERAGE_FIELDS)
+
+    # One streaming pass over the full fetch; each window slices it.
+    concentration = list(iter_concentration(pyramid.window(pyramid.days, pyramid.finest)))
+    suffixes: list[str] = []
+    html_windows: list[ReportWindow] = []
+    summary_lines: list[str] = []
+    for window in report_windows:
+        suffix, growth_rows = write_window_report(pyramid, window, report_top, report_suffix, label, args.chart_points, concentration, args.format)
+        suffixes.append(suffix)
+        # The requested window opens first.
+        html_windows.insert(0 if window == args.days else len(html_windows), html_report_window(pyramid, window, suffix, report_top, label))
+        if window == args.days:
+            summary_lines = write_summary(
+                current_totals,
+                assumption_totals,
+                growth_rows,
+                history_errors,
+                selected_count,
+                OUTPUT_DIR / ('RESEARCH_SUMMARY_preview.md' if preview else 'RESEARCH_SUMMARY.md'),
+                coverage_rows=coverage_rows,
+                unfetched_count=unfetched_count,
+                preview=preview,
+                selection=None if preview else selection,
+            )
+    html_path = None
+    if args.format != 'png':
+        html_path = write_html_dominance_report(
+            OUTPUT_DIR / f'oracle_dominance_{main_suffix}.html', pyramid, html_windows, summary_lines, concentration
+        )
 
     print(json.dumps({
         'market_count': len(markets),
-        'selected_history_markets': len(selected),
+        'selected_history_markets': selected_count,
         'history_error_count': len(history_errors),
+        'markets_with_assumptions': assumption_market_count,
+        'partial': bool(unfetched_count),
+        'unfetched_history_markets': unfetched_count,
+        'supply_coverage_pct': total_coverage_pct(coverage_rows),
+        'min_vendor_coverage_pct': min((row['coverage_pct'] for row in coverage_rows), default=0.0),
+        'history_days_fetched': pyramid.days,
         'output_dir': str(OUTPUT_DIR),
-        'suffix': suffix,
+        'preview': bool(preview),
+        'suffix': main_suffix,
+        'window_suffixes': suffixes,
+        'html_report': str(html_path) if html_path else None,
     }, indent=2))
 
 
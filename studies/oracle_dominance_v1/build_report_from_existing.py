@@ -6,16 +6,23 @@ import datetime as dt
 import json
 from collections import defaultdict
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import matplotlib.pyplot as plt
 
+from studies.oracle_dominance_v1.current_snapshot import totals_fields
+from studies.oracle_dominance_v1.downsample import CHART_POINT_BUDGET, downsample_series
+from studies.oracle_dominance_v1.history_pyramid import load_history_pyramid, resolution_for_window
+from studies.oracle_dominance_v1.html_report import REPORT_FORMATS, ReportView, ReportWindow, encode_series_block, write_html_report
 from studies.oracle_dominance_v1.plot_style import MUTED, MONARCH_PRIMARY, PANEL, TEXT, apply_monarch_style, series_color
+from studies.oracle_dominance_v1.utils.csv_rows import write_csv_rows
 
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = BASE_DIR / "output"
 CURRENT_CSV = OUTPUT_DIR / "vendor_dominance_current.csv"
 HARDCODED_CSV = OUTPUT_DIR / "hardcoded_exposure_summary.csv"
 PRIMARY_METRIC = "repriced_supply_usd"
+GROWTH_FIELDS = ("vendor", "start_usd", "end_usd", "abs_gain_usd", "pct_gain")
 
 
 def resolve_historical_csv(explicit_path: str | None) -> Path:
@@ -35,8 +42,28 @@ def resolve_historical_csv(explicit_path: str | None) -> Path:
 
 
 def load_csv(path: Path) -> list[dict[str, str]]:
+    return list(iter_csv(path))
+
+
+# One row at a time, for inputs that are only aggregated.
+def iter_csv(path: Path) -> Iterator[dict[str, str]]:
     with path.open(encoding="utf-8") as handle:
-        return list(csv.DictReader(handle))
+        yield from csv.DictReader(handle)
+
+
+# Read the pyramid level that suits the window, in the same row shape as the historical CSV.
+def load_pyramid_rows(path: Path, days: int | None) -> list[dict[str, str]]:
+    pyramid = load_history_pyramid(path)
+    window = days or pyramid.days
+    return [
+        {
+            "as_of": point.as_of.isoformat(),
+            "vendor": point.vendor,
+            "metric": point.metric,
+            "exposure_usd": str(point.exposure_usd),
+        }
+        for point in pyramid.window(window, resolution_for_window(window))
+    ]
 
 
 def parse_json_map(value: str) -> dict[str, float]:
@@ -45,7 +72,7 @@ def parse_json_map(value: str) -> dict[str, float]:
     return {k: float(v) for k, v in json.loads(value).items()}
 
 
-def aggregate_current_vendor_totals(rows: list[dict[str, str]]) -> list[dict[str, object]]:
+def aggregate_current_vendor_totals(rows: Iterable[dict[str, str]]) -> list[dict[str, object]]:
     totals: dict[tuple[str, str], float] = defaultdict(float)
     for row in rows:
         for key, metric in (("supply_split_json", "supply_usd"), ("borrow_split_json", "borrow_usd")):
@@ -108,17 +135,18 @@ def build_growth_rows(series: dict[str, list[tuple[int, float]]]) -> list[dict[s
     return rows
 
 
-def write_csv(path: Path, rows: list[dict[str, object]]) -> None:
-    if not rows:
-        path.write_text("", encoding="utf-8")
-        return
-    with path.open("w", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(rows)
+def write_csv(path: Path, rows: Iterable[dict[str, object]], fields: Iterable[str]) -> int:
+    return write_csv_rows(path, rows, tuple(fields))
 
 
-def plot_line_chart(series: dict[str, list[tuple[int, float]]], title: str, output_png: Path, output_svg: Path) -> None:
+def plot_line_chart(
+    series: dict[str, list[tuple[int, float]]],
+    title: str,
+    output_png: Path,
+    output_svg: Path,
+    max_points: int = CHART_POINT_BUDGET,
+) -> None:
+    series = downsample_series(series, max_points)
     apply_monarch_style(plt)
     fig, ax = plt.subplots(figsize=(12, 7))
     fig.patch.set_facecolor(PANEL)
@@ -157,7 +185,14 @@ def normalize_share_series(series: dict[str, list[tuple[int, float]]]) -> dict[s
     return normalized
 
 
-def plot_share_chart(series: dict[str, list[tuple[int, float]]], title: str, output_png: Path, output_svg: Path) -> None:
+def plot_share_chart(
+    series: dict[str, list[tuple[int, float]]],
+    title: str,
+    output_png: Path,
+    output_svg: Path,
+    max_points: int = CHART_POINT_BUDGET,
+) -> None:
+    series = downsample_series(series, max_points)
     apply_monarch_style(plt)
     fig, ax = plt.subplots(figsize=(12, 7))
     fig.patch.set_facecolor(PANEL)
@@ -204,6 +239,25 @@ def plot_growth_chart(rows: list[dict[str, object]], title: str, output_png: Pat
     plt.close(fig)
 
 
+# The same three views as the PNG charts, from the series embedded once.
+def write_existing_html_report(path: Path, series: dict[str, list[tuple[int, float]]], summary_lines: list[str]) -> Path:
+    timestamps = [ts for values in series.values() for ts, _ in values]
+    start = min(timestamps, default=0)
+    window = ReportWindow(
+        name="from_existing",
+        days=(max(timestamps, default=0) - start) // 86_400 + 1,
+        level="day",
+        start=start,
+        views=[
+            ReportView("line", "Oracle dominance over time (repriced supply)"),
+            ReportView("share", "Oracle share over time (repriced supply, normalized to 100%)"),
+            ReportView("growth", "Top oracle growers over the observed window"),
+        ],
+    )
+    title = summary_lines[0].lstrip("# ") if summary_lines else "Oracle dominance report"
+    return write_html_report(path, title, {"day": encode_series_block({PRIMARY_METRIC: series})}, [window], PRIMARY_METRIC, summary_lines[1:])
+
+
 def build_summary(
     current_totals: list[dict[str, object]],
     growth_rows: list[dict[str, object]],
@@ -252,33 +306,48 @@ def main() -> None:
     parser.add_argument("--current-csv", default=str(CURRENT_CSV), help="Path to vendor_dominance_current.csv")
     parser.add_argument("--historical-csv", default=None, help="Path to a historical vendor dominance CSV")
     parser.add_argument("--hardcoded-csv", default=str(HARDCODED_CSV), help="Path to hardcoded_exposure_summary.csv")
+    parser.add_argument("--pyramid", default=None, help="Path to a saved vendor history pyramid JSON (used instead of the historical CSV)")
+    parser.add_argument("--days", type=int, default=None, help="Window in days to read from --pyramid (defaults to its full window)")
+    parser.add_argument("--format", choices=REPORT_FORMATS, default="png", help="Charts as one self-contained HTML report rendered client-side, matplotlib PNG/SVG files, or both")
+    parser.add_argument("--chart-points", type=int, default=CHART_POINT_BUDGET, help="Maximum plotted points per series (LTTB decimation; CSVs keep every point)")
     args = parser.parse_args()
 
-    current_rows = load_csv(Path(args.current_csv))
-    historical_csv = resolve_historical_csv(args.historical_csv)
-    historical_rows = load_csv(historical_csv)
+    if args.pyramid:
+        historical_rows = load_pyramid_rows(Path(args.pyramid), args.days)
+    else:
+        historical_rows = load_csv(resolve_historical_csv(args.historical_csv))
     hardcoded_rows = load_csv(Path(args.hardcoded_csv))
 
-    current_totals = aggregate_current_vendor_totals(current_rows)
+    current_totals = aggregate_current_vendor_totals(iter_csv(Path(args.current_csv)))
     repriced_series = load_series(historical_rows, PRIMARY_METRIC)
     top_line_series = filter_top_vendors(repriced_series, top_n=8)
     top_share_series = normalize_share_series(top_line_series)
     growth_rows = build_growth_rows(repriced_series)
 
-    write_csv(OUTPUT_DIR / "vendor_current_totals.csv", current_totals)
-    write_csv(OUTPUT_DIR / "vendor_growth_from_existing.csv", growth_rows)
+    write_csv(OUTPUT_DIR / "vendor_current_totals.csv", current_totals, totals_fields("vendor"))
+    write_csv(OUTPUT_DIR / "vendor_growth_from_existing.csv", growth_rows, GROWTH_FIELDS)
+
+    summary = build_summary(current_totals, growth_rows, hardcoded_rows, historical_rows)
+    (OUTPUT_DIR / "RESEARCH_SUMMARY.md").write_text(summary, encoding="utf-8")
+    print(summary)
+    if args.format != "png":
+        write_existing_html_report(OUTPUT_DIR / "oracle_dominance_from_existing.html", repriced_series, summary.splitlines())
+    if args.format == "html":
+        return
 
     plot_line_chart(
         top_line_series,
         "Oracle dominance over time (repriced supply)",
         OUTPUT_DIR / "oracle_dominance_from_existing.png",
         OUTPUT_DIR / "oracle_dominance_from_existing.svg",
+        args.chart_points,
     )
     plot_share_chart(
         top_share_series,
         "Oracle share over time (repriced supply, normalized to 100%)",
         OUTPUT_DIR / "oracle_share_from_existing.png",
         OUTPUT_DIR / "oracle_share_from_existing.svg",
+        args.chart_points,
     )
     plot_growth_chart(
         growth_rows,
@@ -287,10 +356,6 @@ def main() -> None:
         OUTPUT_DIR / "oracle_growth_from_existing.svg",
     )
 
-    summary = build_summary(current_totals, growth_rows, hardcoded_rows, historical_rows)
-    (OUTPUT_DIR / "RESEARCH_SUMMARY.md").write_text(summary, encoding="utf-8")
-    print(summary)
-
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Sequence
+
+from studies.market_data.http import json_post
+from studies.oracle_dominance_v1.config import (
+    MULTICALL3_ADDRESS,
+    RPC_BATCH_SIZE,
+    RPC_MULTICALL_SIZE,
+    RPC_WORKERS,
+)
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.utils.env import morpho_blue_address, rpc_url
+
+
+# aggregate3((address,bool,bytes)[]), Morpho Blue market(bytes32) / idToMarketParams(bytes32), ERC-20 decimals() / symbol().
+AGGREGATE3_SELECTOR = bytes.fromhex("82ad56cb")
+MARKET_SELECTOR = bytes.fromhex("5c60e39a")
+MARKET_PARAMS_SELECTOR = bytes.fromhex("2c3c9157")
+DECIMALS_SELECTOR = bytes.fromhex("313ce567")
+SYMBOL_SELECTOR = bytes.fromhex("95d89b41")
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Sends one JSON-RPC batch (a list of request objects) and returns its response objects.
+Transport = Callable[[list[dict]], list[dict]]
+Call = tuple[str, bytes]
+
+
+def http_transport(url: str) -> Transport:
+    def send(batch: list[dict]) -> list[dict]:
+        responses = json_post(url, batch)
+        # Some nodes answer a one-request batch with a bare object.
+        return responses if isinstance(responses, list) else [responses]
+
+    return send
+
+
+def chain_transport(chain_id: int) -> Transport:
+    url = rpc_url(chain_id)
+    if not url:
+        raise RuntimeError(f"RPC endpoint not configured for chain {chain_id}. Set RPC_URL_{chain_id} locally.")
+    return http_transport(url)
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _address_word(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def _words(data: bytes) -> list[int]:
+    return [int.from_bytes(data[offset:offset + 32], "big") for offset in range(0, len(data) - len(data) % 32, 32)]
+
+
+def _address(word: int) -> str:
+    return "0x" + word.to_bytes(32, "big")[12:].hex()
+
+
+def market_id_word(unique_key: str) -> bytes:
+    return bytes.fromhex(unique_key[2:] if unique_key.startswith("0x") else unique_key).rjust(32, b"\0")
+
+
+# ABI encoding of aggregate3 with allowFailure set on every call.
+def encode_aggregate3(calls: Sequence[Call]) -> bytes:
+    heads: list[bytes] = []
+    tails: list[bytes] = []
+    offset = 32 * len(calls)
+    for target, data in calls:
+        padded = data + bytes(-len(data) % 32)
+        tail = _address_word(target) + _word(1) + _word(96) + _word(len(data)) + padded
+        heads.append(_word(offset))
+        tails.append(tail)
+        offset += len(tail)
+    return AGGREGATE3_SELECTOR + _word(32) + _word(len(calls)) + b"".join(heads) + b"".join(tails)
+
+
+# Per-call return data, or None where the call reverted.
+def decode_aggregate3(data: bytes) -> list[bytes | None]:
+    start = int.from_bytes(data[0:32], "big")
+    count = int.from_bytes(data[start:start + 32], "big")
+    base = start + 32
+    results: list[bytes | None] = []
+    for index in range(count):
+        item = base + int.from_bytes(data[base + 32 * index:base + 32 * index + 32], "big")
+        success = int.from_bytes(data[item:item + 32], "big")
+        returned = item + int.from_bytes(data[item + 32:item + 64], "big")
+        length = int.from_bytes(data[returned:returned + 32], "big")
+        results.append(data[returned + 32:returned + 32 + length] if success else None)
+    return results
+
+
+# ABI string, or the bytes32 symbol some older tokens return.
+def decode_symbol(data: bytes | None) -> str | None:
+    if not data:
+        return None
+    if len(data) == 32:
+        raw = data.rstrip(b"\0")
+    else:
+        offset = int.from_bytes(data[0:32], "big")
+        length = int.from_bytes(data[offset:offset + 32], "big")
+        raw = data[offset + 32:offset + 32 + length]
+    return raw.decode("utf-8", errors="ignore") or None
+
+
+class MulticallReader:
+    """Runs many eth_calls as Multicall3 aggregate3 calls, several per JSON-RPC batch, pinned to one block."""
+
+    def __init__(
+        self,
+        transport: Transport,
+        block: int | str | None = None,
+        multicall_size: int = RPC_MULTICALL_SIZE,
+        batch_size: int = RPC_BATCH_SIZE,
+        max_workers: int = RPC_WORKERS,
+        multicall_address: str = MULTICALL3_ADDRESS,
+    ) -> None:
+        self.transport = transport
+        self.block = block
+        self.multicall_size = multicall_size
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.multicall_address = multicall_address
+
+    def _send(self, batch: list[dict]) -> list[dict]:
+        by_id = {response.get("id"): response for response in self.transport(batch)}
+        results = []
+        for request in batch:
+            response = by_id.get(request["id"])
+            if response is None:
+                raise RuntimeError(f"RPC batch response is missing request {request['id']}")
+            if "error" in response:
+                raise RuntimeError(f"RPC error for {request['method']}: {response['error']}")
+            results.append(response["result"])
+        return results
+
+    # Every read of one reader sees the same block, so market state and token data agree.
+    def block_tag(self) -> str:
+        if self.block is None:
+            self.block = int(self._send([{"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []}])[0], 16)
+        return self.block if isinstance(self.block, str) else hex(self.block)
+
+    def call(self, calls: Sequence[Call]) -> list[bytes | None]:
+        if not calls:
+            return []
+        tag = self.block_tag()
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": index,
+                "method": "eth_call",
+                "params": [
+                    {"to": self.multicall_address, "data": "0x" + encode_aggregate3(calls[start:start + self.multicall_size]).hex()},
+                    tag,
+                ],
+            }
+            for index, start in enumerate(range(0, len(calls), self.multicall_size))
+        ]
+        batches = [requests[start:start + self.batch_size] for start in range(0, len(requests), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(batches)))) as executor:
+            responses = [result for results in executor.map(self._send, batches) for result in results]
+        # A reply with the wrong result count (e.g. "0x" from a node without Multicall3)
+        # would shift every later result onto the wrong call.
+        results: list[bytes | None] = []
+        for request, response in zip(requests, responses):
+            start = request["id"] * self.multicall_size
+            expected = min(self.multicall_size, len(calls) - start)
+            decoded = decode_aggregate3(bytes.fromhex(response[2:]))
+            if len(decoded) != expected:
+                raise RuntimeError(
+                    f"Multicall returned {len(decoded)} results for {expected} calls at {self.multicall_address}"
+                )
+            results.extend(decoded)
+        return results
+
+
+# market(id): totalSupplyAssets, totalSupplyShares, totalBorrowAssets, totalBorrowShares, lastUpdate, fee.
+def read_market_states(reader: MulticallReader, morpho: str, unique_keys: Sequence[str]) -> list[tuple[int, int] | None]:
+    states: list[tuple[int, int] | None] = []
+    for returned in reader.call([(morpho, MARKET_SELECTOR + market_id_word(key)) for key in unique_keys]):
+        words = _words(returned or b"")
+        states.append((words[0], words[2]) if len(words) >= 6 else None)
+    return states
+
+
+def read_token_info(reader: MulticallReader, tokens: Iterable[str]) -> dict[str, tuple[str | None, int | None]]:
+    tokens = sorted(set(tokens))
+    returned = reader.call([(token, selector) for token in tokens for selector in (SYMBOL_SELECTOR, DECIMALS_SELECTOR)])
+    info: dict[str, tuple[str | None, int | None]] = {}
+    for index, token in enumerate(tokens):
+        decimals = _words(returned[2 * index + 1] or b"")
+        info[token] = (decode_symbol(returned[2 * index]), decimals[0] if decimals and decimals[0] <= 255 else None)
+    return info
+
+
+def _usd(assets: int, decimals: int, price: float | None) -> float | None:
+    return None if price is None else assets / 10**decimals * price
+
+
+# Markets by ID from chain state: params, token symbols/decimals and totals, read at one block.
+# Chain state has no USD values; pass per-unit loan-asset prices (as from
+# infer_current_loan_asset_prices) to fill them. Unknown IDs and idle markets are skipped.
+def fetch_rpc_markets_for_chain(
+    chain_id: int,
+    unique_keys: Iterable[str],
+    prices: dict[tuple[int, str], float] | None = None,
+    transport: Transport | None = None,
+    block: int | str | None = None,
+) -> list[MarketRef]:
+    keys = [key.lower() for key in unique_keys]
+    reader = MulticallReader(transport or chain_transport(chain_id), block)
+    morpho = morpho_blue_address(chain_id)
+    params = [_words(returned or b"") for returned in reader.call([(morpho, MARKET_PARAMS_SELECTOR + market_id_word(key)) for key in keys])]
+    states = read_market_states(reader, morpho, keys)
+
+    listed = [
+        (key, _address(words[0]), _address(words[1]), _address(words[2]), state)
+        for key, words, state in zip(keys, params, states)
+        if len(words) >= 5 and state is not None and _address(words[0]) != ZERO_ADDRESS and _address(words[1]) != ZERO_ADDRESS
+    ]
+    tokens = read_token_info(reader, [token for _, loan, collateral, _, _ in listed for token in (loan, collateral)])
+    markets: list[MarketRef] = []
+    for key, loan, collateral, oracle, (supply, borrow) in listed:
+        loan_symbol, loan_decimals = tokens[loan]
+        decimals = 18 if loan_decimals is None else loan_decimals
+        price = (prices or {}).get((chain_id, loan))
+        markets.append(
+            MarketRef(
+                unique_key=key,
+                chain_id=chain_id,
+                oracle_address="" if oracle == ZERO_ADDRESS else oracle,
+                loan_asset_address=loan,
+                loan_asset_symbol=loan_symbol or "UNKNOWN",
+                loan_asset_decimals=decimals,
+                collateral_asset_address=collateral,
+                collateral_asset_symbol=tokens[collateral][0] or "UNKNOWN",
+                supply_assets=str(supply),
+                borrow_assets=str(borrow),
+                supply_assets_usd=_usd(supply, decimals, price),
+                borrow_assets_usd=_usd(borrow, decimals, price),
+            )
+        )
+    return markets
+
+
+# Rebuild the markets of every chain with a transport from chain state, keeping the IDs
+# (and order) of `markets` from another source; chains without a transport keep those markets.
+def fetch_rpc_markets(
+    markets: Iterable[MarketRef],
+    prices: dict[tuple[int, str], float],
+    transports: dict[int, Transport] | None = None,
+) -> list[MarketRef]:
+    by_chain: dict[int, list[MarketRef]] = {}
+    for market in markets:
+        by_chain.setdefault(market.chain_id, []).append(market)
+    rebuilt: list[MarketRef] = []
+    for chain_id, chain_markets in by_chain.items():
+        if transports is not None:
+            transport = transports.get(chain_id)
+        else:
+            transport = chain_transport(chain_id) if rpc_url(chain_id) else None
+        if transport is None:
+            rebuilt.extend(chain_markets)
+            continue
+        rebuilt.extend(fetch_rpc_markets_for_chain(chain_id, [market.unique_key for market in chain_markets], prices, transport))
+    return rebuilt
@@ -0,0 +1,186 @@
+"""Rolling vendor concentration metrics over day-ordered exposure history.
+
+One pass over time-sorted vendor points: each time step's vendor totals yield the
+Herfindahl-Hirschman index (0-10000), top-1 and top-3 share, Shannon entropy and
+the effective vendor count, in O(vendors) work. Trailing 7/30-day deltas compare
+against the latest step at or before `as_of - lag`, found through one deque per lag
+that only ever drops from the left, so no window is recomputed.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Collection, Iterable, Iterator
+
+from studies.oracle_dominance_v1.exposure_accumulator import HISTORY_METRICS
+from studies.oracle_dominance_v1.models import VendorExposurePoint
+
+
+CONCENTRATION_LAG_DAYS = (7, 30)
+CONCENTRATION_FIELDS = ("hhi", "top1_share_pct", "top3_share_pct", "entropy_bits")
+DAY_SECONDS = 86_400
+
+
+def as_of_seconds(as_of: date) -> int:
+    if isinstance(as_of, datetime):
+        return int(as_of.timestamp())
+    return int(datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc).timestamp())
+
+
+@dataclass(slots=True)
+class ConcentrationPoint:
+    as_of: date
+    metric: str
+    total_usd: float
+    vendor_count: int
+    top_vendor: str
+    hhi: float
+    top1_share_pct: float
+    top3_share_pct: float
+    entropy_bits: float
+    # "{field}_change_{lag}d" -> change since the step `lag` days earlier, None before the history reaches back that far.
+    changes: dict[str, float | None] = field(default_factory=dict)
+
+    @property
+    def effective_vendors(self) -> float:
+        return 10_000 / self.hhi if self.hhi > 0 else 0.0
+
+
+def concentration_of(as_of: date, metric: str, totals: dict[str, float]) -> ConcentrationPoint | None:
+    positive = {vendor: value for vendor, value in totals.items() if value > 0}
+    total = sum(positive.values())
+    if total <= 0:
+        return None
+    hhi = entropy = 0.0
+    for value in positive.values():
+        share = value / total
+        hhi += (share * 100) ** 2
+        entropy -= share * math.log2(share)
+    top = heapq.nlargest(3, positive.items(), key=lambda item: (item[1], item[0]))
+    return ConcentrationPoint(
+        as_of=as_of,
+        metric=metric,
+        total_usd=total,
+        vendor_count=len(positive),
+        top_vendor=top[0][0],
+        hhi=hhi,
+        top1_share_pct=top[0][1] / total * 100,
+        top3_share_pct=sum(value for _, value in top) / total * 100,
+        entropy_bits=entropy,
+    )
+
+
+class ConcentrationTracker:
+    """Running concentration state for one metric; feed steps in as_of order."""
+
+    def __init__(self, metric: str, lag_days: Iterable[int] = CONCENTRATION_LAG_DAYS) -> None:
+        self.metric = metric
+        self.lags = sorted(set(lag_days))
+        # Per lag: (seconds, values) of recent steps; the head is the newest step at or
+        # before the current step's lag target once older ones are dropped.
+        self._history: dict[int, deque[tuple[int, tuple[float, ...]]]] = {lag: deque() for lag in self.lags}
+        self._last_seconds: int | None = None
+
+    def update(self, as_of: date, totals: dict[str, float]) -> ConcentrationPoint | None:
+        seconds = as_of_seconds(as_of)
+        if self._last_seconds is not None and seconds <= self._last_seconds:
+            raise ValueError(f"Concentration steps must be in increasing as_of order, got {as_of} after {self._last_seconds}")
+        self._last_seconds = seconds
+        point = concentration_of(as_of, self.metric, totals)
+        if point is None:
+            return None
+        values = tuple(getattr(point, name) for name in CONCENTRATION_FIELDS)
+        for lag, history in self._history.items():
+            target = seconds - lag * DAY_SECONDS
+            while len(history) > 1 and history[1][0] <= target:
+                history.popleft()
+            base = history[0][1] if history and history[0][0] <= target else None
+            for name, value, previous in zip(CONCENTRATION_FIELDS, values, base or [None] * len(values)):
+                point.changes[f"{name}_change_{lag}d"] = None if previous is None else value - previous
+            history.append((seconds, values))
+        return point
+
+
+# Points must be sorted by as_of (HistoryPyramid levels are); vendors within a step may come in any order.
+def iter_concentration(
+    points: Iterable[VendorExposurePoint],
+    metrics: Collection[str] = HISTORY_METRICS,
+    lag_days: Iterable[int] = CONCENTRATION_LAG_DAYS,
+) -> Iterator[ConcentrationPoint]:
+    lag_days = tuple(lag_days)
+    trackers: dict[str, ConcentrationTracker] = {}
+    step: date | None = None
+    totals: dict[str, dict[str, float]] = {}
+
+    def flush() -> Iterator[ConcentrationPoint]:
+        for metric in sorted(totals):
+            tracker = trackers.get(metric)
+            if tracker is None:
+                tracker = trackers[metric] = ConcentrationTracker(metric, lag_days)
+            point = tracker.update(step, totals[metric])
+            if point is not None:
+                yield point
+
+    for point in points:
+        if point.metric not in metrics:
+            continue
+        if point.as_of != step:
+            if step is not None:
+                yield from flush()
+            step, totals = point.as_of, {}
+        vendors = totals.setdefault(point.metric, {})
+        vendors[point.vendor] = vendors.get(point.vendor, 0.0) + point.exposure_usd
+    if step is not None:
+        yield from flush()
+
+
+def _rounded(value: float | None, digits: int) -> float | str:
+    return "" if value is None else round(value, digits)
+
+
+# CSV header for concentration_rows of points tracked with `lag_days`.
+def concentration_fields(lag_days: Iterable[int] = CONCENTRATION_LAG_DAYS) -> tuple[str, ...]:
+    return (
+        "as_of",
+        "metric",
+        "total_usd",
+        "vendor_count",
+        "top_vendor",
+        *CONCENTRATION_FIELDS,
+        "effective_vendors",
+        *(f"{name}_change_{lag}d" for lag in sorted(set(lag_days)) for name in CONCENTRATION_FIELDS),
+    )
+
+
+def concentration_rows(points: Iterable[ConcentrationPoint]) -> Iterator[dict]:
+    digits = {"hhi": 2, "top1_share_pct": 4, "top3_share_pct": 4, "entropy_bits": 4}
+    for point in points:
+        row = {
+            "as_of": point.as_of.isoformat(),
+            "metric": point.metric,
+            "total_usd": round(point.total_usd, 2),
+            "vendor_count": point.vendor_count,
+            "top_vendor": point.top_vendor,
+            **{name: round(getattr(point, name), digits[name]) for name in CONCENTRATION_FIELDS},
+            "effective_vendors": round(point.effective_vendors, 3),
+        }
+        for name, change in point.changes.items():
+            row[name] = _rounded(change, digits[name.split("_change_")[0]])
+        yield row
+
+
+__all__ = [
+    "CONCENTRATION_FIELDS",
+    "CONCENTRATION_LAG_DAYS",
+    "ConcentrationPoint",
+    "ConcentrationTracker",
+    "as_of_seconds",
+    "concentration_fields",
+    "concentration_of",
+    "concentration_rows",
+    "iter_concentration",
+]
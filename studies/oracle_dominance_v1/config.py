@@ -3,10 +3,30 @@ from __future__ import annotations
 from pathlib import Path
 
 
-MORPHO_API_URL = "https://blue-api.morpho.org/graphql"
-DEFAULT_ORACLE_GIST_BASE_URL = "https://gist.githubusercontent.com/starksama/087ce4682243a059d77b1361fcccf221/raw"
-MONARCH_MARKETS_PAGE_SIZE = 1_000
-MORPHO_MARKETS_PAGE_SIZE = 500
+# Gaps in a market's history up to this long are filled before aggregation (resample.py).
+GAP_FILL_MAX_SECONDS = 7 * 86_400
+# Processes decoding history payloads for the report's fetch threads (0 decodes on the threads).
+HISTORY_DECODE_WORKERS = 4
+STREAMING_HISTORY_CONCURRENCY = 12
+STREAMING_QUEUE_SIZE = 32
+# Rough per-item payload sizes and per-request latency used by --plan estimates.
+PLAN_REQUEST_SECONDS = 0.6
+PLAN_BYTES_PER_SECOND = 2_000_000
+PLAN_MARKET_ROW_BYTES = 650
+PLAN_MONARCH_ROW_BYTES = 200
+PLAN_ORACLE_ENTRY_BYTES = 1_500
+PLAN_HISTORY_POINT_BYTES = 190
+# On-chain state source: Multicall3 is deployed at the same address on every supported
+# chain; Morpho Blue is only at the canonical address on Ethereum and Base, other chains
+# need MORPHO_BLUE_ADDRESS_<chain_id>.
+MULTICALL3_ADDRESS = "0xca11bde05977b3631167028862be2a173976ca11"
+MORPHO_BLUE_ADDRESSES = {
+    1: "0xbbbbbbbbbb9cc5e90e3b3af64bdaf62c37eeffcb",
+    8453: "0xbbbbbbbbbb9cc5e90e3b3af64bdaf62c37eeffcb",
+}
+RPC_MULTICALL_SIZE = 500
+RPC_BATCH_SIZE = 10
+RPC_WORKERS = 4
 SUPPORTED_CHAINS = [1, 10, 8453, 42161, 137, 130, 999, 143, 42793]
 
 BLACKLISTED_TOKEN_ADDRESSES = {
@@ -0,0 +1,182 @@
+"""Incremental refresh of the current exposure table.
+
+A snapshot keeps the previous current-table rows keyed by (chain_id, unique_key)
+with a fingerprint of each market's state and oracle metadata, plus running vendor
+and assumption totals. A refresh diffs newly fetched markets against it, rebuilds
+rows only for new or changed markets, and patches the totals by subtracting each
+touched market's old split and adding its new one. Totals are kept as exact
+fractions of the float splits, so repeated patches never drift from a full rebuild.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from fractions import Fraction
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from studies.oracle_dominance_v1.analysis import build_current_exposure_row
+from studies.oracle_dominance_v1.models import MarketRef
+
+SNAPSHOT_FILENAME = "current_snapshot.json"
+SNAPSHOT_FORMAT = "oracle_dominance_v1.current_snapshot"
+SNAPSHOT_VERSION = 1
+MARKET_FIELDS = tuple(field.name for field in fields(MarketRef))
+SPLIT_COLUMNS = (
+    ("vendor", "supply_split_json", "supply_usd"),
+    ("vendor", "borrow_split_json", "borrow_usd"),
+    ("assumption", "assumption_supply_split_json", "supply_usd"),
+    ("assumption", "assumption_borrow_split_json", "borrow_usd"),
+)
+
+MarketKey = tuple[int, str]
+# (MarketRef field values, digest of the market's oracle metadata entry)
+Fingerprint = tuple[tuple, str]
+
+
+# CSV header for totals_rows(dimension).
+def totals_fields(dimension: str) -> tuple[str, str, str]:
+    return (dimension, "metric", "exposure_usd")
+
+
+def metadata_digest(entry: dict | None) -> str:
+    if entry is None:
+        return ""
+    return hashlib.blake2b(json.dumps(entry, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True)
+class SnapshotDelta:
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+
+    @property
+    def touched(self) -> int:
+        return self.added + self.changed + self.removed
+
+
+class CurrentSnapshot:
+    def __init__(self, filters: dict[str, object] | None = None) -> None:
+        self.filters = filters or {}
+        self.order: list[MarketKey] = []
+        self.rows: dict[MarketKey, dict] = {}
+        self.fingerprints: dict[MarketKey, Fingerprint] = {}
+        # (dimension, name, metric) -> [exact total, contributing markets]
+        self.totals: dict[tuple[str, str, str], list] = {}
+
+    def _apply(self, row: dict, sign: int) -> None:
+        for dimension, column, metric in SPLIT_COLUMNS:
+            for name, value in json.loads(row[column] or "{}").items():
+                cell = self.totals.setdefault((dimension, name, metric), [Fraction(0), 0])
+                cell[0] += sign * Fraction(value)
+                cell[1] += sign
+                if cell[1] == 0:
+                    del self.totals[(dimension, name, metric)]
+
+    # Diff `markets` against the snapshot and patch rows and totals in place.
+    def refresh(self, markets: Iterable[MarketRef], oracle_metadata: dict[tuple[int, str], dict]) -> SnapshotDelta:
+        delta = SnapshotDelta()
+        digests: dict[tuple[int, str], str] = {}
+        order: list[MarketKey] = []
+        for market in markets:
+            key = (market.chain_id, market.unique_key)
+            oracle_key = (market.chain_id, market.oracle_address)
+            digest = digests.get(oracle_key)
+            if digest is None:
+                digest = digests[oracle_key] = metadata_digest(oracle_metadata.get(oracle_key))
+            fingerprint = (tuple(getattr(market, name) for name in MARKET_FIELDS), digest)
+            order.append(key)
+            previous = self.fingerprints.get(key)
+            if previous == fingerprint:
+                delta.unchanged += 1
+                continue
+            if previous is None:
+                delta.added += 1
+            else:
+                delta.changed += 1
+                self._apply(self.rows[key], -1)
+            row = build_current_exposure_row(market, oracle_metadata.get(oracle_key))
+            self._apply(row, 1)
+            self.rows[key] = row
+            self.fingerprints[key] = fingerprint
+
+        seen = set(order)
+        for key in [key for key in self.rows if key not in seen]:
+            self._apply(self.rows.pop(key), -1)
+            del self.fingerprints[key]
+            delta.removed += 1
+        self.order = order
+        return delta
+
+    def current_rows(self) -> Iterator[dict]:
+        return (self.rows[key] for key in self.order)
+
+    # Same rows and ordering as the report's aggregate_current_{vendor,assumption}_totals.
+    def totals_rows(self, dimension: str = "vendor") -> list[dict]:
+        totals = [
+            (name, metric, float(total))
+            for (cell_dimension, name, metric), (total, _) in self.totals.items()
+            if cell_dimension == dimension
+        ]
+        return [
+            {dimension: name, "metric": metric, "exposure_usd": round(value, 2)}
+            for name, metric, value in sorted(totals, key=lambda item: (item[1], -item[2], item[0]))
+        ]
+
+    def save(self, path: str | Path) -> Path:
+        payload = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "filters": self.filters,
+            "fields": list(MARKET_FIELDS),
+            "markets": [
+                [list(key), list(self.fingerprints[key][0]), self.fingerprints[key][1], self.rows[key]]
+                for key in self.order
+            ],
+            "totals": [[*cell, str(total), count] for cell, (total, count) in self.totals.items()],
+        }
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = target.with_name(target.name + ".tmp")
+        staging.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        staging.replace(target)
+        return target
+
+    # A missing snapshot, or one written for other filters or fields, starts empty.
+    @classmethod
+    def load(cls, path: str | Path, filters: dict[str, object] | None = None) -> CurrentSnapshot:
+        snapshot = cls(filters)
+        source = Path(path)
+        if not source.exists():
+            return snapshot
+        payload = json.loads(source.read_text(encoding="utf-8"))
+        if (
+            payload.get("format") != SNAPSHOT_FORMAT
+            or payload.get("version") != SNAPSHOT_VERSION
+            or payload.get("fields") != list(MARKET_FIELDS)
+            or payload.get("filters") != snapshot.filters
+        ):
+            return snapshot
+        for (chain_id, unique_key), state, digest, row in payload["markets"]:
+            key = (chain_id, unique_key)
+            snapshot.order.append(key)
+            snapshot.rows[key] = row
+            snapshot.fingerprints[key] = (tuple(state), digest)
+        snapshot.totals = {
+            (dimension, name, metric): [Fraction(total), count]
+            for dimension, name, metric, total, count in payload["totals"]
+        }
+        return snapshot
+
+
+__all__ = [
+    "SNAPSHOT_FILENAME",
+    "CurrentSnapshot",
+    "SnapshotDelta",
+    "metadata_digest",
+    "totals_fields",
+]
@@ -0,0 +1,56 @@
+"""Largest-Triangle-Three-Buckets decimation of chart series.
+
+Charts only need about one point per couple of output pixels; LTTB keeps the first
+and last points and, per bucket, the point spanning the largest triangle with its
+neighbours, so peaks and turns survive. CSV outputs keep full resolution.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+CHART_WIDTH_INCHES = 12
+CHART_DPI = 180
+PIXELS_PER_POINT = 2
+
+
+def chart_point_budget(width_inches: float = CHART_WIDTH_INCHES, dpi: int = CHART_DPI, pixels_per_point: float = PIXELS_PER_POINT) -> int:
+    return max(3, int(width_inches * dpi / pixels_per_point))
+
+
+CHART_POINT_BUDGET = chart_point_budget()
+
+
+def lttb(points: Sequence[tuple[int, float]], threshold: int) -> list[tuple[int, float]]:
+    size = len(points)
+    if threshold >= size or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (size - 2) / (threshold - 2)
+    anchor = 0
+    for bucket in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex.
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, size)
+        next_points = points[next_start:next_end]
+        avg_x = sum(ts for ts, _ in next_points) / len(next_points)
+        avg_y = sum(value for _, value in next_points) / len(next_points)
+
+        anchor_x, anchor_y = points[anchor]
+        best_area = -1.0
+        best = anchor + 1
+        for index in range(int(bucket * every) + 1, int((bucket + 1) * every) + 1):
+            ts, value = points[index]
+            area = abs((anchor_x - avg_x) * (value - anchor_y) - (anchor_x - ts) * (avg_y - anchor_y))
+            if area > best_area:
+                best_area = area
+                best = index
+        sampled.append(points[best])
+        anchor = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def downsample_series(series: dict[str, list[tuple[int, float]]], max_points: int = CHART_POINT_BUDGET) -> dict[str, list[tuple[int, float]]]:
+    return {vendor: lttb(values, max_points) for vendor, values in series.items()}
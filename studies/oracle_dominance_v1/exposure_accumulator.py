@@ -0,0 +1,162 @@
+"""Dense exposure accumulator for historical vendor series.
+
+Vendors and metrics are interned to small integer IDs and timestamps are mapped
+to bucket offsets from the window start, so accumulation is an index computation
+and a float add into one preallocated array instead of tuple/string dict keys.
+Rows are only materialized when iterated.
+"""
+
+from __future__ import annotations
+
+from array import array
+from datetime import date, datetime, timezone
+from fractions import Fraction
+from typing import Iterator, Mapping, Sequence
+
+from studies.market_data.config import HISTORY_INTERVAL_SECONDS
+from studies.oracle_dominance_v1.models import VendorExposurePoint
+
+
+HISTORY_METRICS = ("supply_usd", "borrow_usd", "repriced_supply_usd", "repriced_borrow_usd")
+DAY_SECONDS = HISTORY_INTERVAL_SECONDS["DAY"]
+
+
+# One bucket per history point: weekly histories are not spread over a daily grid.
+def bucket_seconds_for_interval(interval: str) -> int:
+    return HISTORY_INTERVAL_SECONDS[interval]
+
+
+class ExposureAccumulator:
+    """Buckets x vendors x metrics float array, laid out vendor-major so new vendors append."""
+
+    def __init__(self, start_ts: int, bucket_seconds: int, buckets: int, metrics: Sequence[str] = HISTORY_METRICS) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.start_ts = start_ts - start_ts % bucket_seconds
+        self.buckets = max(int(buckets), 1)
+        self.metrics = tuple(metrics)
+        self.vendors: list[str] = []
+        self._metric_ids = {metric: index for index, metric in enumerate(self.metrics)}
+        self._vendor_ids: dict[str, int] = {}
+        self._values = array("d")
+        self._touched = bytearray()
+
+    @classmethod
+    def for_window(
+        cls,
+        days: int,
+        interval: str = "DAY",
+        metrics: Sequence[str] = HISTORY_METRICS,
+        end: datetime | None = None,
+    ) -> ExposureAccumulator:
+        bucket_seconds = bucket_seconds_for_interval(interval)
+        end_ts = int((end or datetime.now(timezone.utc)).timestamp())
+        start_ts = end_ts - days * DAY_SECONDS
+        return cls(start_ts, bucket_seconds, days * DAY_SECONDS // bucket_seconds + 2, metrics)
+
+    def vendor_id(self, vendor: str) -> int:
+        vendor_id = self._vendor_ids.get(vendor)
+        if vendor_id is None:
+            vendor_id = len(self.vendors)
+            self._vendor_ids[vendor] = vendor_id
+            self.vendors.append(vendor)
+            block = len(self.metrics) * self.buckets
+            self._values.extend(array("d", bytes(8 * block)))
+            self._touched.extend(bytes(block))
+        return vendor_id
+
+    def metric_id(self, metric: str) -> int:
+        return self._metric_ids[metric]
+
+    def offset(self, timestamp: int) -> int:
+        offset = (int(timestamp) - self.start_ts) // self.bucket_seconds
+        if offset < 0 or offset >= self.buckets:
+            offset = self._grow(offset)
+        return offset
+
+    # Rare path: re-lay the array so an out-of-window point still lands in a bucket.
+    def _grow(self, offset: int) -> int:
+        shift = -offset if offset < 0 else 0
+        buckets = max(self.buckets, offset + 1) + shift
+        values = array("d", bytes(8 * len(self.vendors) * len(self.metrics) * buckets))
+        touched = bytearray(len(self.vendors) * len(self.metrics) * buckets)
+        for series in range(len(self.vendors) * len(self.metrics)):
+            old = series * self.buckets
+            new = series * buckets + shift
+            values[new:new + self.buckets] = self._values[old:old + self.buckets]
+            touched[new:new + self.buckets] = self._touched[old:old + self.buckets]
+        self._values = values
+        self._touched = touched
+        self.buckets = buckets
+        self.start_ts -= shift * self.bucket_seconds
+        return offset + shift
+
+    def add(self, offset: int, vendor_id: int, metric_id: int, value: float) -> None:
+        index = (vendor_id * len(self.metrics) + metric_id) * self.buckets + offset
+        self._values[index] += value
+        self._touched[index] = 1
+
+    # Copies of one series' values and touched flags, indexed by bucket offset.
+    def series(self, vendor_id: int, metric_id: int) -> tuple[array, bytearray]:
+        base = (vendor_id * len(self.metrics) + metric_id) * self.buckets
+        return self._values[base:base + self.buckets], self._touched[base:base + self.buckets]
+
+    def add_split(self, offset: int, vendor_ids: Sequence[int], metric_id: int, total: float) -> None:
+        share = total / len(vendor_ids)
+        for vendor_id in vendor_ids:
+            self.add(offset, vendor_id, metric_id, share)
+
+    # Spread each key's series evenly over its vendors (e.g. vendor-set signatures
+    # summed across markets), touching each vendor once per key instead of once per market.
+    def split_keys(self, vendors_by_key: Mapping[str, Sequence[str]]) -> ExposureAccumulator:
+        target = ExposureAccumulator(self.start_ts, self.bucket_seconds, self.buckets, self.metrics)
+        for key_id, key in enumerate(self.vendors):
+            vendor_ids = [target.vendor_id(vendor) for vendor in vendors_by_key[key]]
+            if not vendor_ids:
+                continue
+            for metric_id in range(len(self.metrics)):
+                base = (key_id * len(self.metrics) + metric_id) * self.buckets
+                for offset in range(self.buckets):
+                    if self._touched[base + offset]:
+                        target.add_split(offset, vendor_ids, metric_id, self._values[base + offset])
+        return target
+
+    # Weighted variant of split_keys; weights are exact fractions so value * n / d
+    # reproduces an even split bit for bit.
+    def weigh_keys(self, weights_by_key: Mapping[str, Sequence[tuple[str, Fraction]]]) -> ExposureAccumulator:
+        target = ExposureAccumulator(self.start_ts, self.bucket_seconds, self.buckets, self.metrics)
+        for key_id, key in enumerate(self.vendors):
+            weights = [(target.vendor_id(vendor), weight.numerator, weight.denominator) for vendor, weight in weights_by_key[key]]
+            for metric_id in range(len(self.metrics)):
+                base = (key_id * len(self.metrics) + metric_id) * self.buckets
+                for offset in range(self.buckets):
+                    if not self._touched[base + offset]:
+                        continue
+                    value = self._values[base + offset]
+                    for vendor_id, numerator, denominator in weights:
+                        target.add(offset, vendor_id, metric_id, value * numerator / denominator)
+        return target
+
+    def bucket_timestamp(self, offset: int) -> int:
+        return self.start_ts + offset * self.bucket_seconds
+
+    def bucket_as_of(self, offset: int) -> date:
+        moment = datetime.fromtimestamp(self.bucket_timestamp(offset), tz=timezone.utc)
+        return moment if self.bucket_seconds < DAY_SECONDS else moment.date()
+
+    # Yields (offset, vendor, metric, value) for touched cells ordered by bucket, vendor, metric.
+    def iter_cells(self) -> Iterator[tuple[int, str, str, float]]:
+        vendor_order = sorted(range(len(self.vendors)), key=lambda vendor_id: self.vendors[vendor_id])
+        metric_order = sorted(range(len(self.metrics)), key=lambda metric_id: self.metrics[metric_id])
+        series = [
+            (self.vendors[vendor_id], self.metrics[metric_id], (vendor_id * len(self.metrics) + metric_id) * self.buckets)
+            for vendor_id in vendor_order
+            for metric_id in metric_order
+        ]
+        for offset in range(self.buckets):
+            for vendor, metric, base in series:
+                if self._touched[base + offset]:
+                    yield offset, vendor, metric, self._values[base + offset]
+
+    def iter_points(self) -> Iterator[VendorExposurePoint]:
+        for offset, vendor, metric, value in self.iter_cells():
+            yield VendorExposurePoint(as_of=self.bucket_as_of(offset), vendor=vendor, exposure_usd=value, metric=metric)
@@ -0,0 +1,207 @@
+"""Pre-aggregated exposure cube: chain x vendor x assumption label x metric x day.
+
+Each run materializes one SQLite file from the current table (`current_supply_usd`,
+`current_borrow_usd` on the run date) and the historical builder (HISTORY_METRICS per
+bucket). A market's value is split evenly over its vendors and then over its
+assumption labels; an empty string stands for "no recognized vendor" or "no
+assumption", so any marginal adds up to the flat CSV totals. The fact table is keyed
+by metric first and has covering indexes, so slices read only index pages.
+
+    python3 -m studies.oracle_dominance_v1.exposure_cube query --metric current_supply_usd --vendor Redstone --chain 8453
+    python3 -m studies.oracle_dominance_v1.exposure_cube query --metric repriced_supply_usd --assumption '*peg' --by chain_id day
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Sequence
+
+CUBE_FILENAME = "exposure_cube.sqlite"
+CUBE_DIMENSIONS = ("day", "chain_id", "vendor", "assumption", "metric")
+CURRENT_METRICS = (("supply_assets_usd", "current_supply_usd"), ("borrow_assets_usd", "current_borrow_usd"))
+DEFAULT_CUBE_PATH = Path(__file__).resolve().parent / "output" / CUBE_FILENAME
+
+# (day, chain_id, vendor, assumption, metric, value)
+CubeCell = tuple[str, int, str, str, str, float]
+
+SCHEMA = """
+CREATE TABLE exposure (
+    metric TEXT NOT NULL,
+    vendor TEXT NOT NULL,
+    chain_id INTEGER NOT NULL,
+    assumption TEXT NOT NULL,
+    day TEXT NOT NULL,
+    exposure_usd REAL NOT NULL,
+    PRIMARY KEY (metric, vendor, chain_id, assumption, day)
+) WITHOUT ROWID;
+CREATE INDEX exposure_by_assumption ON exposure (metric, assumption, chain_id, day, vendor, exposure_usd);
+CREATE INDEX exposure_by_chain ON exposure (metric, chain_id, day, vendor, assumption, exposure_usd);
+CREATE TABLE cube_metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+def current_cube_cells(current_rows: Iterable[dict], as_of: str) -> Iterable[CubeCell]:
+    for row in current_rows:
+        vendors = [vendor for vendor in row["vendors"].split("|") if vendor] or [""]
+        assumptions = [label for label in row["assumption_labels"].split("|") if label] or [""]
+        for column, metric in CURRENT_METRICS:
+            share = float(row[column]) / len(vendors) / len(assumptions)
+            for vendor in vendors:
+                for assumption in assumptions:
+                    yield as_of, int(row["chain_id"]), vendor, assumption, metric, share
+
+
+class CurrentCubeTotals:
+    """Current cube cells summed per coordinate while the current rows stream past.
+
+    Memory follows the number of coordinates rather than markets; `cells` sums to the
+    same cube as current_cube_cells over the same rows.
+    """
+
+    def __init__(self, as_of: str) -> None:
+        self.as_of = as_of
+        self.totals: dict[tuple[int, str, str, str], float] = defaultdict(float)
+
+    def add(self, row: dict) -> None:
+        for _, chain_id, vendor, assumption, metric, share in current_cube_cells((row,), self.as_of):
+            self.totals[(chain_id, vendor, assumption, metric)] += share
+
+    def cells(self) -> Iterable[CubeCell]:
+        for (chain_id, vendor, assumption, metric), value in self.totals.items():
+            yield self.as_of, chain_id, vendor, assumption, metric, value
+
+
+# Sum cells per coordinate and replace the cube at `path` in one transaction.
+def write_exposure_cube(path: str | Path, cells: Iterable[CubeCell], metadata: dict[str, object] | None = None) -> Path:
+    totals: dict[tuple[str, str, int, str, str], float] = defaultdict(float)
+    for day, chain_id, vendor, assumption, metric, value in cells:
+        totals[(metric, vendor, chain_id, assumption, day)] += value
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = target.with_name(target.name + ".tmp")
+    staging.unlink(missing_ok=True)
+    connection = sqlite3.connect(staging)
+    try:
+        connection.executescript(SCHEMA)
+        connection.executemany(
+            "INSERT INTO exposure VALUES (?, ?, ?, ?, ?, ?)",
+            (key + (value,) for key, value in sorted(totals.items())),
+        )
+        connection.executemany(
+            "INSERT INTO cube_metadata VALUES (?, ?)",
+            ((key, json.dumps(value, sort_keys=True)) for key, value in (metadata or {}).items()),
+        )
+        connection.commit()
+        connection.execute("ANALYZE")
+    finally:
+        connection.close()
+    staging.replace(target)
+    return target
+
+
+class ExposureCube:
+    """Read-only slicing over a materialized cube; filters accept SQLite GLOB patterns for text dimensions."""
+
+    def __init__(self, path: str | Path = DEFAULT_CUBE_PATH) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"No exposure cube at {self.path}; run the v1 pipeline first")
+        self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def metadata(self) -> dict[str, object]:
+        return {key: json.loads(value) for key, value in self._connection.execute("SELECT key, value FROM cube_metadata")}
+
+    def values(self, dimension: str, metric: str | None = None) -> list:
+        if dimension not in CUBE_DIMENSIONS:
+            raise ValueError(f"Unknown cube dimension: {dimension}")
+        where, params = ("WHERE metric = ?", [metric]) if metric else ("", [])
+        query = f"SELECT DISTINCT {dimension} FROM exposure {where} ORDER BY {dimension}"
+        return [value for (value,) in self._connection.execute(query, params)]
+
+    def slice(
+        self,
+        metric: str,
+        chain_ids: Sequence[int] = (),
+        vendor: str | None = None,
+        assumption: str | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        by: Sequence[str] = ("day",),
+    ) -> list[dict]:
+        unknown = [dimension for dimension in by if dimension not in CUBE_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimension(s): {', '.join(unknown)}")
+        clauses = ["metric = ?"]
+        params: list[object] = [metric]
+        if chain_ids:
+            clauses.append(f"chain_id IN ({', '.join('?' for _ in chain_ids)})")
+            params.extend(int(chain_id) for chain_id in chain_ids)
+        for column, pattern in (("vendor", vendor), ("assumption", assumption)):
+            if pattern is not None:
+                clauses.append(f"{column} GLOB ?")
+                params.append(pattern)
+        if start:
+            clauses.append("day >= ?")
+            params.append(start)
+        if end:
+            clauses.append("day <= ?")
+            params.append(end)
+        columns = ", ".join(by)
+        select = f"{columns}, " if by else ""
+        group = f" GROUP BY {columns} ORDER BY {columns}" if by else ""
+        query = f"SELECT {select}SUM(exposure_usd) FROM exposure WHERE {' AND '.join(clauses)}{group}"
+        return [
+            {**dict(zip(by, row[:-1])), "exposure_usd": round(row[-1] or 0.0, 2)}
+            for row in self._connection.execute(query, params)
+        ]
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> ExposureCube:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Slice the pre-aggregated oracle exposure cube")
+    parser.add_argument("--cube", default=str(DEFAULT_CUBE_PATH), help="Path to exposure_cube.sqlite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    query = commands.add_parser("query", help="Sum exposure over a slice, grouped by the given dimensions (CSV to stdout)")
+    query.add_argument("--metric", required=True, help="e.g. current_supply_usd, supply_usd, repriced_supply_usd")
+    query.add_argument("--chain", type=int, nargs="*", default=[], help="Chain IDs to include (default all)")
+    query.add_argument("--vendor", default=None, help="Vendor name or GLOB pattern; '' selects markets without a recognized vendor")
+    query.add_argument("--assumption", default=None, help="Assumption label or GLOB pattern (e.g. '*peg'); '' selects no-assumption exposure")
+    query.add_argument("--start", default=None, help="First day (ISO date) to include")
+    query.add_argument("--end", default=None, help="Last day (ISO date) to include")
+    query.add_argument("--by", nargs="*", default=["day"], choices=CUBE_DIMENSIONS, help="Dimensions to group by (none for a grand total)")
+    values = commands.add_parser("values", help="List the distinct values of one dimension")
+    values.add_argument("dimension", choices=CUBE_DIMENSIONS)
+    values.add_argument("--metric", default=None, help="Only values present for this metric")
+    commands.add_parser("info", help="Print the run metadata stored with the cube")
+    args = parser.parse_args()
+
+    with ExposureCube(args.cube) as cube:
+        if args.command == "info":
+            print(json.dumps(cube.metadata(), indent=2, sort_keys=True))
+        elif args.command == "values":
+            for value in cube.values(args.dimension, args.metric):
+                print(value)
+        else:
+            rows = cube.slice(args.metric, args.chain, args.vendor, args.assumption, args.start, args.end, args.by)
+            writer = csv.DictWriter(sys.stdout, fieldnames=[*args.by, "exposure_usd"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Market history decoding in worker processes.
+
+History fetch threads only move bytes: the chunk response bodies (or the cached
+JSON text) are handed to a process pool, which parses them, merges the chunks and
+converts every point to a HistoryRow with the per-point int/float work. Decoding
+therefore never holds the GIL the network threads share. Freshly fetched
+histories come back with their merged JSON text, so the shared market data cache
+is filled without parsing anything on the fetch threads either.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from studies.market_data.clients.morpho import merge_history_chunks, parse_market_history_window
+from studies.market_data.sources import fetch_market_history_raw, put_market_history_text
+from studies.oracle_dominance_v1.config import HISTORY_DECODE_WORKERS
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.price_index import HistoryRow, unit_history_rows
+
+
+def decode_history_bodies(bodies: list[bytes], decimals: int) -> tuple[list[HistoryRow], str]:
+    history = list(merge_history_chunks(parse_market_history_window(body) for body in bodies))
+    return list(unit_history_rows(history, decimals)), json.dumps(history, separators=(",", ":"))
+
+
+def decode_history_text(text: str, decimals: int) -> list[HistoryRow]:
+    return list(unit_history_rows(json.loads(text), decimals))
+
+
+class HistoryDecoder:
+    """Fetches market histories as raw payloads and decodes them in a process pool.
+
+    Call `fetch` from any number of threads. With `workers=0` payloads are decoded on
+    the calling thread, the same work without the pool. Once the decoder is closed,
+    `fetch` calls still running (threads abandoned at a deadline) raise CancelledError
+    instead of submitting to the closed pool.
+    """
+
+    def __init__(self, workers: int = HISTORY_DECODE_WORKERS) -> None:
+        self.workers = max(0, min(workers, os.cpu_count() or 1))
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> HistoryDecoder:
+        if self.workers:
+            # Forked workers would inherit the fetch threads' locks; forkserver starts them
+            # clean, from a server that imports only this module rather than __main__.
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        # Decodes already queued are cancelled; their callers get CancelledError.
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # The lock only covers check-and-submit, so a submit can never race the shutdown.
+    def _decode(self, function, *args):
+        with self._lock:
+            if self._closed:
+                raise CancelledError("history decoder is closed")
+            if self._executor is None:
+                future = None
+            else:
+                future = self._executor.submit(function, *args)
+        if future is None:
+            return function(*args)
+        return future.result()
+
+    def fetch(self, market: MarketRef, days: int, interval: str = "DAY") -> list[HistoryRow]:
+        text, bodies = fetch_market_history_raw(market.unique_key, market.chain_id, days=days, interval=interval)
+        if text is not None:
+            return self._decode(decode_history_text, text, market.loan_asset_decimals)
+        rows, text = self._decode(decode_history_bodies, bodies, market.loan_asset_decimals)
+        put_market_history_text(market.unique_key, market.chain_id, days, interval, text)
+        return rows
+
+
+__all__ = [
+    "HistoryDecoder",
+    "decode_history_bodies",
+    "decode_history_text",
+]
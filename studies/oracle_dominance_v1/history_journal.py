@@ -0,0 +1,184 @@
+"""Append-only checkpoint journal for long per-market history builds.
+
+Each completed market history is written as one JSON line of USD and loan-asset
+unit rows (repricing happens at aggregation, so they can be re-aggregated without
+refetching under any prices) and each failure as a retryable entry. Lines are
+flushed and fsynced as they are written; a torn final line from a crash is ignored
+on load. Only the keys of completed markets are held in memory; their rows are
+replayed from the file when a resumed run re-aggregates them. The header pins the history window end, so a resumed run fetches the
+remaining markets for the same window however much later it starts.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.price_index import HISTORY_ROW_FIELDS, HistoryRow
+
+
+HISTORY_ERROR_FIELDS = ("chain_id", "unique_key", "vendors", "attempts", "error")
+
+
+def history_error_row(market: MarketRef, vendors: list[str], error: str, attempts: int = 1) -> dict:
+    return {
+        "chain_id": market.chain_id,
+        "unique_key": market.unique_key,
+        "vendors": "|".join(vendors),
+        "attempts": attempts,
+        "error": error,
+    }
+
+
+class StaleJournalError(ValueError):
+    """The journal on disk was written for another run config or row layout."""
+
+    def __init__(self, path: str | Path, written: dict[str, object], expected: dict[str, object]) -> None:
+        changed = sorted(key for key in {*written, *expected} if written.get(key) != expected.get(key))
+        details = ", ".join(f"{key}: journal {written.get(key)!r}, this run {expected.get(key)!r}" for key in changed)
+        super().__init__(f"History journal {path} is stale ({details}); rerun without --resume to start a new journal")
+
+
+@dataclass(slots=True)
+class JournalState:
+    completed: set[tuple[int, str]] = field(default_factory=set)
+    attempts: dict[tuple[int, str], int] = field(default_factory=dict)
+    window_end: datetime | None = None
+
+
+def _iter_entries(path: str | Path) -> Iterator[dict]:
+    with Path(path).open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+# Completed keys, failure counts and the pinned window end, without opening the journal for writing.
+def read_journal(path: str | Path, config: dict[str, object]) -> JournalState:
+    state = JournalState()
+    for entry in _iter_entries(path):
+        kind = entry.get("kind")
+        if kind == "header":
+            written = {**(entry.get("config") or {}), "fields": entry.get("fields")}
+            expected = {**config, "fields": list(HISTORY_ROW_FIELDS)}
+            if written != expected:
+                raise StaleJournalError(path, written, expected)
+            if entry.get("window_end"):
+                state.window_end = datetime.fromisoformat(entry["window_end"])
+            continue
+        key = (int(entry["chain_id"]), entry["unique_key"])
+        if kind == "done":
+            state.completed.add(key)
+        elif kind == "failed":
+            state.attempts[key] = state.attempts.get(key, 0) + 1
+    return state
+
+
+# Rows of the completed markets among `keys`, read back one journal line at a time.
+def iter_completed_rows(
+    path: str | Path, keys: Iterable[tuple[int, str]]
+) -> Iterator[tuple[tuple[int, str], list[HistoryRow]]]:
+    wanted = set(keys)
+    for entry in _iter_entries(path):
+        if entry.get("kind") != "done":
+            continue
+        key = (int(entry["chain_id"]), entry["unique_key"])
+        if key in wanted:
+            wanted.discard(key)
+            yield key, [tuple(values) for values in entry["rows"]]
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as handle:
+        if handle.seek(0, os.SEEK_END) == 0:
+            return True
+        handle.seek(-1, os.SEEK_END)
+        return handle.read(1) == b"\n"
+
+
+class HistoryJournal:
+    """Journal for one history build; `window_end` is the pinned end to fetch and aggregate to.
+
+    A new journal pins `window_end` (default now); a resumed one keeps the end it was
+    started with.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        config: dict[str, object],
+        resume: bool = False,
+        window_end: datetime | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.config = config
+        self.completed: set[tuple[int, str]] = set()
+        self.attempts: dict[tuple[int, str], int] = {}
+        self.window_end = window_end or datetime.now(timezone.utc)
+        if resume and self.path.exists():
+            self._load()
+            self._handle = self.path.open("a", encoding="utf-8")
+            # Close off a torn final line so the next entry starts on its own line.
+            if not _ends_with_newline(self.path):
+                self._handle.write("\n")
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("w", encoding="utf-8")
+            self._append(
+                {
+                    "kind": "header",
+                    "config": config,
+                    "fields": list(HISTORY_ROW_FIELDS),
+                    "window_end": self.window_end.isoformat(),
+                }
+            )
+
+    def _load(self) -> None:
+        state = read_journal(self.path, self.config)
+        self.completed, self.attempts = state.completed, state.attempts
+        self.window_end = state.window_end or self.window_end
+
+    def _append(self, entry: dict) -> None:
+        self._handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def is_complete(self, market: MarketRef) -> bool:
+        return (market.chain_id, market.unique_key) in self.completed
+
+    def iter_completed_rows(self, keys: Iterable[tuple[int, str]]) -> Iterator[tuple[tuple[int, str], list[HistoryRow]]]:
+        return iter_completed_rows(self.path, keys)
+
+    def record_done(self, market: MarketRef, rows: list[HistoryRow]) -> None:
+        self.completed.add((market.chain_id, market.unique_key))
+        self._append(
+            {
+                "kind": "done",
+                "chain_id": market.chain_id,
+                "unique_key": market.unique_key,
+                "rows": [list(row) for row in rows],
+            }
+        )
+
+    def record_failed(self, market: MarketRef, vendors: list[str], error: str) -> dict:
+        key = (market.chain_id, market.unique_key)
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        entry = history_error_row(market, vendors, error, attempts=self.attempts[key])
+        self._append({"kind": "failed", **entry})
+        return entry
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def __enter__(self) -> HistoryJournal:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
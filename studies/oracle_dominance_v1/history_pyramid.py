@@ -0,0 +1,140 @@
+"""Multi-resolution rollups of per-vendor exposure history.
+
+One longest-window history fetch is rolled up into daily, weekly and monthly
+levels (plus an hourly level for hourly fetches). Shorter windows and coarser
+resolutions are sliced from those levels instead of re-fetching or
+re-aggregating raw market points.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable
+
+from studies.oracle_dominance_v1.models import VendorExposurePoint
+
+
+RESOLUTIONS = ("hour", "day", "week", "month")
+HOURLY_MAX_WINDOW_DAYS = 14
+DAILY_MAX_WINDOW_DAYS = 180
+WEEKLY_MAX_WINDOW_DAYS = 730
+
+
+def bucket_start(as_of: date, resolution: str) -> date:
+    if resolution == "hour":
+        if isinstance(as_of, datetime):
+            return as_of.replace(minute=0, second=0, microsecond=0)
+        return datetime(as_of.year, as_of.month, as_of.day, tzinfo=timezone.utc)
+    day = date(as_of.year, as_of.month, as_of.day)
+    if resolution == "day":
+        return day
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unsupported resolution: {resolution}")
+
+
+def resolution_for_window(days: int, finest: str = "day") -> str:
+    if finest == "hour" and days <= HOURLY_MAX_WINDOW_DAYS:
+        return "hour"
+    if days <= DAILY_MAX_WINDOW_DAYS:
+        return "day"
+    if days <= WEEKLY_MAX_WINDOW_DAYS:
+        return "week"
+    return "month"
+
+
+# Exposure is a stock, so a coarser bucket keeps the last observation (the bucket close).
+def rollup_points(points: Iterable[VendorExposurePoint], resolution: str) -> list[VendorExposurePoint]:
+    closes: dict[tuple[date, str, str], tuple[date, float]] = {}
+    for point in points:
+        key = (bucket_start(point.as_of, resolution), point.vendor, point.metric)
+        previous = closes.get(key)
+        if previous is None or point.as_of >= previous[0]:
+            closes[key] = (point.as_of, point.exposure_usd)
+    return [
+        VendorExposurePoint(as_of=as_of, vendor=vendor, metric=metric, exposure_usd=value)
+        for (as_of, vendor, metric), (_, value) in sorted(closes.items())
+    ]
+
+
+@dataclass(slots=True)
+class HistoryPyramid:
+    end: date
+    days: int
+    levels: dict[str, list[VendorExposurePoint]] = field(default_factory=dict)
+    metadata: dict[str, object] = field(default_factory=dict)
+
+    @property
+    def finest(self) -> str:
+        return "hour" if "hour" in self.levels else "day"
+
+    def covers(self, days: int, end: date | None = None) -> bool:
+        return days <= self.days and (end is None or end == self.end)
+
+    # A window spans the fetch window `days` back from `end`, so it opens with the
+    # partial first day the history fetch covered.
+    def window_start(self, days: int, resolution: str | None = None) -> date:
+        if not self.covers(days):
+            raise ValueError(f"Pyramid covers {self.days}d; cannot serve a {days}d window")
+        return bucket_start(self.end - timedelta(days=days), resolution or resolution_for_window(days, self.finest))
+
+    def window(self, days: int, resolution: str | None = None) -> list[VendorExposurePoint]:
+        level = resolution or resolution_for_window(days, self.finest)
+        first_bucket = self.window_start(days, level)
+        return [point for point in self.levels[level] if point.as_of >= first_bucket]
+
+
+def build_history_pyramid(
+    points: Iterable[VendorExposurePoint],
+    days: int,
+    end: date | None = None,
+    metadata: dict[str, object] | None = None,
+) -> HistoryPyramid:
+    points = list(points)
+    levels: dict[str, list[VendorExposurePoint]] = {}
+    if any(isinstance(point.as_of, datetime) for point in points):
+        levels["hour"] = rollup_points(points, "hour")
+    daily = rollup_points(points, "day")
+    pyramid_end = end or (daily[-1].as_of if daily else date.today())
+    levels["day"] = daily
+    for resolution in RESOLUTIONS[2:]:
+        levels[resolution] = rollup_points(daily, resolution)
+    return HistoryPyramid(end=pyramid_end, days=days, levels=levels, metadata=dict(metadata or {}))
+
+
+def save_history_pyramid(path: str | Path, pyramid: HistoryPyramid) -> Path:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "end": pyramid.end.isoformat(),
+        "days": pyramid.days,
+        "metadata": pyramid.metadata,
+        "levels": {
+            resolution: [[p.as_of.isoformat(), p.vendor, p.metric, p.exposure_usd] for p in points]
+            for resolution, points in pyramid.levels.items()
+        },
+    }
+    target.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    return target
+
+
+def load_history_pyramid(path: str | Path) -> HistoryPyramid:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    parsers = {"hour": datetime.fromisoformat}
+    return HistoryPyramid(
+        end=date.fromisoformat(payload["end"]),
+        days=int(payload["days"]),
+        levels={
+            resolution: [
+                VendorExposurePoint(as_of=parsers.get(resolution, date.fromisoformat)(as_of), vendor=vendor, metric=metric, exposure_usd=float(value))
+                for as_of, vendor, metric, value in points
+            ]
+            for resolution, points in payload["levels"].items()
+        },
+        metadata=payload.get("metadata") or {},
+    )
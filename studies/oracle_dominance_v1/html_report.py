@@ -0,0 +1,432 @@
+"""Self-contained HTML report with client-side charts.
+
+The aggregated vendor series are embedded once per pyramid level, and every report
+window slices them in the browser, so one file replaces the per-window PNG/SVG
+chart set. Series share one time axis per level and are stored as base64
+little-endian Int32 delta arrays: bucket timestamps relative to the first bucket,
+each series' positions on that axis, and its values quantized to a power of ten
+(whole dollars unless a series' steps would overflow Int32). The page decodes them
+with prefix sums and draws the line, share, concentration and growth views as SVG.
+"""
+
+from __future__ import annotations
+
+import base64
+import html
+import json
+import sys
+from array import array
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from studies.oracle_dominance_v1.plot_style import BACKGROUND, GRID, MONARCH_PRIMARY, MUTED, PANEL, SERIES, TEXT
+
+
+INT32_MAX = 2**31 - 1
+REPORT_FORMATS = ("html", "png", "both")
+
+Series = dict[str, list[tuple[int, float]]]
+
+
+def encode_int32(values: Iterable[int]) -> str:
+    packed = array("i", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def deltas(values: Iterable[int]) -> list[int]:
+    previous = 0
+    steps = []
+    for value in values:
+        steps.append(value - previous)
+        previous = value
+    return steps
+
+
+# Smallest power of ten, from 10**-digits up, at which the quantized steps fit in Int32.
+def quantize(values: Sequence[float], digits: int = 0) -> tuple[int, list[int]]:
+    exponent = -digits
+    while True:
+        scale = 10.0**exponent
+        steps = deltas(round(value / scale) for value in values)
+        if all(-INT32_MAX <= step <= INT32_MAX for step in steps):
+            return exponent, steps
+        exponent += 1
+
+
+# Vendor series of several metrics on one shared axis; `digits` maps metric -> decimals kept.
+def encode_series_block(series: dict[str, Series], digits: dict[str, int] | None = None) -> dict:
+    axis = sorted({ts for by_name in series.values() for values in by_name.values() for ts, _ in values})
+    position = {ts: index for index, ts in enumerate(axis)}
+    t0 = axis[0] if axis else 0
+    encoded = []
+    for metric, by_name in series.items():
+        for name, values in by_name.items():
+            exponent, steps = quantize([value for _, value in values], (digits or {}).get(metric, 0))
+            encoded.append(
+                {
+                    "metric": metric,
+                    "name": name,
+                    "index": encode_int32(deltas(position[ts] for ts, _ in values)),
+                    "exponent": exponent,
+                    "values": encode_int32(steps),
+                }
+            )
+    return {"t0": t0, "axis": encode_int32(deltas(ts - t0 for ts in axis)), "series": encoded}
+
+
+@dataclass(slots=True)
+class ReportView:
+    # "line" (top vendors plus Other), "share" (the same, normalized to 100%), "concentration" or "growth".
+    kind: str
+    title: str
+    exclude: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ReportWindow:
+    name: str
+    days: int
+    # Pyramid level the charts read, and the first bucket (epoch seconds) of this window on it.
+    level: str
+    start: int
+    views: list[ReportView]
+    concentration_start: int | None = None
+
+
+def render_html_report(
+    title: str,
+    levels: dict[str, dict],
+    windows: list[ReportWindow],
+    metric: str,
+    summary_lines: Sequence[str] = (),
+    concentration: dict | None = None,
+) -> str:
+    data = {
+        "metric": metric,
+        "levels": levels,
+        "concentration": concentration,
+        "windows": [asdict(window) for window in windows],
+        "style": {
+            "background": BACKGROUND,
+            "panel": PANEL,
+            "grid": GRID,
+            "text": TEXT,
+            "muted": MUTED,
+            "primary": MONARCH_PRIMARY,
+            "series": SERIES,
+        },
+    }
+    summary = "\n".join(_summary_html(line) for line in summary_lines)
+    return (
+        HTML_TEMPLATE.replace("__TITLE__", html.escape(title))
+        .replace("__SUMMARY__", summary)
+        .replace("__STYLE_BACKGROUND__", BACKGROUND)
+        .replace("__STYLE_PANEL__", PANEL)
+        .replace("__STYLE_GRID__", GRID)
+        .replace("__STYLE_TEXT__", TEXT)
+        .replace("__STYLE_MUTED__", MUTED)
+        .replace("__STYLE_PRIMARY__", MONARCH_PRIMARY)
+        .replace("__REPORT_DATA__", json.dumps(data, separators=(",", ":")).replace("</", "<\\/"))
+    )
+
+
+def write_html_report(
+    path: Path,
+    title: str,
+    levels: dict[str, dict],
+    windows: list[ReportWindow],
+    metric: str,
+    summary_lines: Sequence[str] = (),
+    concentration: dict | None = None,
+) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(render_html_report(title, levels, windows, metric, summary_lines, concentration), encoding="utf-8")
+    return path
+
+
+# Markdown summary lines (headings, bullets, `code`) as HTML.
+def _summary_html(line: str) -> str:
+    text = html.escape(line)
+    parts = text.split("`")
+    text = "".join(f"<code>{part}</code>" if index % 2 else part for index, part in enumerate(parts))
+    if line.startswith("# "):
+        return f"<h2>{text[2:]}</h2>"
+    if line.startswith("## "):
+        return f"<h3>{text[3:]}</h3>"
+    if line.startswith("- "):
+        return f"<li>{text[2:]}</li>"
+    return f"<p>{text}</p>" if line.strip() else ""
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>__TITLE__</title>
+<style>
+body { margin: 0; padding: 24px 32px; background: __STYLE_BACKGROUND__; color: __STYLE_TEXT__; font: 14px/1.5 system-ui, sans-serif; }
+h1 { font-size: 22px; margin: 0 0 12px; }
+h2 { font-size: 18px; } h3 { font-size: 15px; }
+code { color: __STYLE_MUTED__; }
+.summary { max-width: 960px; }
+.summary li { margin-left: 20px; }
+.tabs { margin: 20px 0; }
+.tabs button { background: __STYLE_PANEL__; color: __STYLE_TEXT__; border: 1px solid __STYLE_GRID__; padding: 6px 14px; margin-right: 6px; cursor: pointer; border-radius: 4px; }
+.tabs button.active { border-color: __STYLE_PRIMARY__; color: __STYLE_PRIMARY__; }
+.chart { background: __STYLE_PANEL__; border: 1px solid __STYLE_GRID__; border-radius: 6px; padding: 12px 16px; margin-bottom: 20px; max-width: 960px; position: relative; }
+.chart h4 { margin: 0 0 8px; font-size: 15px; font-weight: 600; }
+.chart svg { width: 100%; height: auto; display: block; }
+.legend span { display: inline-block; margin-right: 14px; color: __STYLE_TEXT__; }
+.legend i { display: inline-block; width: 12px; height: 3px; margin-right: 6px; vertical-align: middle; }
+.tip { position: absolute; pointer-events: none; background: __STYLE_BACKGROUND__; border: 1px solid __STYLE_GRID__; padding: 6px 8px; font-size: 12px; display: none; white-space: nowrap; }
+</style>
+</head>
+<body>
+<h1>__TITLE__</h1>
+<div class="summary">
+__SUMMARY__
+</div>
+<div class="tabs" id="tabs"></div>
+<div id="views"></div>
+<script>
+const DATA = __REPORT_DATA__;
+const STYLE = DATA.style;
+const W = 960, H = 440, M = {left: 72, right: 20, top: 12, bottom: 36};
+
+// Base64 little-endian Int32 deltas -> prefix sums.
+function decode(b64) {
+  const raw = atob(b64), view = new DataView(new ArrayBuffer(raw.length));
+  for (let i = 0; i < raw.length; i++) view.setUint8(i, raw.charCodeAt(i));
+  const out = new Float64Array(raw.length / 4);
+  let acc = 0;
+  for (let i = 0; i < out.length; i++) { acc += view.getInt32(4 * i, true); out[i] = acc; }
+  return out;
+}
+
+// {metric: {name: [[ts, value], ...]}} in embedding order.
+function decodeBlock(block) {
+  const out = {};
+  if (!block) return out;
+  const axis = decode(block.axis);
+  for (const s of block.series) {
+    const index = decode(s.index), values = decode(s.values), scale = Math.pow(10, s.exponent);
+    const points = new Array(index.length);
+    for (let i = 0; i < index.length; i++) points[i] = [block.t0 + axis[index[i]], values[i] * scale];
+    (out[s.metric] = out[s.metric] || {})[s.name] = points;
+  }
+  return out;
+}
+
+const LEVELS = {};
+for (const name in DATA.levels) LEVELS[name] = decodeBlock(DATA.levels[name]);
+const CONCENTRATION = decodeBlock(DATA.concentration);
+
+function slice(series, start) {
+  const out = {};
+  for (const name in series || {}) {
+    const points = series[name].filter(p => p[0] >= start);
+    if (points.length) out[name] = points;
+  }
+  return out;
+}
+
+// Top vendors by latest value, the rest summed into Other.
+function topVendors(series, topN) {
+  const ranked = Object.entries(series).sort((a, b) => b[1][b[1].length - 1][1] - a[1][a[1].length - 1][1]);
+  const out = {};
+  for (const [name, points] of ranked.slice(0, topN)) out[name] = points;
+  if (ranked.length > topN) {
+    const other = new Map();
+    for (const [, points] of ranked.slice(topN)) for (const [ts, v] of points) other.set(ts, (other.get(ts) || 0) + v);
+    out.Other = [...other.entries()].sort((a, b) => a[0] - b[0]);
+  }
+  return out;
+}
+
+function normalize(series) {
+  const totals = new Map();
+  for (const name in series) for (const [ts, v] of series[name]) totals.set(ts, (totals.get(ts) || 0) + v);
+  const out = {};
+  for (const name in series) out[name] = series[name].map(([ts, v]) => [ts, totals.get(ts) > 0 ? v / totals.get(ts) * 100 : 0]);
+  return out;
+}
+
+function growthRows(series) {
+  const rows = [];
+  for (const name in series) {
+    const points = series[name];
+    if (points.length < 2 || name === "Other") continue;
+    const first = points[0][1], last = points[points.length - 1][1];
+    rows.push({vendor: name, abs: last - first, pct: first > 0 ? Math.round((last - first) / first * 10000) / 100 : null});
+  }
+  return rows.filter(r => r.pct !== null).sort((a, b) => b.pct - a.pct);
+}
+
+function color(name, index) {
+  return name === "Other" ? STYLE.muted : STYLE.series[index % STYLE.series.length];
+}
+
+function usd(v) {
+  const a = Math.abs(v);
+  if (a >= 1e9) return "$" + (v / 1e9).toFixed(2) + "B";
+  if (a >= 1e6) return "$" + (v / 1e6).toFixed(1) + "M";
+  if (a >= 1e3) return "$" + (v / 1e3).toFixed(0) + "K";
+  return "$" + v.toFixed(0);
+}
+
+function day(ts) { return new Date(ts * 1000).toISOString().slice(0, 10); }
+
+function niceTicks(max, count) {
+  if (max <= 0) return [0];
+  const raw = max / count, mag = Math.pow(10, Math.floor(Math.log10(raw)));
+  const step = [1, 2, 2.5, 5, 10].map(f => f * mag).find(s => s >= raw);
+  const ticks = [];
+  for (let v = 0; v <= max + step * 1e-9; v += step) ticks.push(v);
+  return ticks;
+}
+
+function svg(width, height, body) {
+  return `<svg viewBox="0 0 ${width} ${height}" xmlns="http://www.w3.org/2000/svg">${body}</svg>`;
+}
+
+function esc(text) { return String(text).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c])); }
+
+function panel(title, body, legend) {
+  const el = document.createElement("div");
+  el.className = "chart";
+  el.innerHTML = `<h4>${esc(title)}</h4>${body}` + (legend ? `<div class="legend">${legend}</div>` : "") + `<div class="tip"></div>`;
+  return el;
+}
+
+// Line chart with optional shaded bands and a hover readout; format(v) labels the y axis.
+function lineChart(title, series, opts) {
+  const names = Object.keys(series);
+  let x0 = Infinity, x1 = -Infinity, ymax = opts.yMax || 0;
+  for (const name of names) for (const [ts, v] of series[name]) { x0 = Math.min(x0, ts); x1 = Math.max(x1, ts); if (!opts.yMax) ymax = Math.max(ymax, v); }
+  for (const name in opts.bands || {}) for (const [, v] of opts.bands[name][1]) if (!opts.yMax) ymax = Math.max(ymax, v);
+  if (!names.length) return panel(title, "<p>No data in this window.</p>");
+  const ticks = niceTicks(opts.yMax || ymax * 1.05, 5), top = ticks[ticks.length - 1] || 1;
+  const sx = ts => M.left + (x1 > x0 ? (ts - x0) / (x1 - x0) : 0.5) * (W - M.left - M.right);
+  const sy = v => H - M.bottom - v / top * (H - M.top - M.bottom);
+  let body = "";
+  for (const t of ticks) body += `<line x1="${M.left}" x2="${W - M.right}" y1="${sy(t)}" y2="${sy(t)}" stroke="${STYLE.grid}" stroke-opacity="0.6"/><text x="${M.left - 8}" y="${sy(t) + 4}" fill="${STYLE.muted}" font-size="11" text-anchor="end">${opts.format(t)}</text>`;
+  for (let i = 0; i <= 5; i++) {
+    const ts = x0 + (x1 - x0) * i / 5;
+    body += `<text x="${sx(ts)}" y="${H - 12}" fill="${STYLE.muted}" font-size="11" text-anchor="middle">${day(ts)}</text>`;
+  }
+  let legend = "";
+  names.forEach((name, index) => {
+    const c = opts.colors ? opts.colors[index] : color(name, index), band = (opts.bands || {})[name];
+    if (band) {
+      const upper = band[1].filter(p => p[0] >= x0).map(([ts, v]) => `${sx(ts)},${sy(v)}`);
+      const lower = band[0].filter(p => p[0] >= x0).reverse().map(([ts, v]) => `${sx(ts)},${sy(v)}`);
+      body += `<polygon points="${upper.concat(lower).join(" ")}" fill="${c}" fill-opacity="0.18"/>`;
+    }
+    body += `<polyline points="${series[name].map(([ts, v]) => `${sx(ts)},${sy(v)}`).join(" ")}" fill="none" stroke="${c}" stroke-width="2"><title>${esc(name)}</title></polyline>`;
+    legend += `<span><i style="background:${c}"></i>${esc(name)}</span>`;
+  });
+  body += `<line class="cursor" y1="${M.top}" y2="${H - M.bottom}" stroke="${STYLE.muted}" stroke-dasharray="3 3" visibility="hidden"/>`;
+  const el = panel(title, svg(W, H, body), legend);
+  const chart = el.querySelector("svg"), cursor = chart.querySelector(".cursor"), tip = el.querySelector(".tip");
+  chart.addEventListener("mousemove", event => {
+    const box = chart.getBoundingClientRect(), x = (event.clientX - box.left) / box.width * W;
+    const ts = x0 + (x - M.left) / (W - M.left - M.right) * (x1 - x0);
+    let rows = "", at = null;
+    names.forEach((name, index) => {
+      const points = series[name];
+      let best = points[0];
+      for (const p of points) if (Math.abs(p[0] - ts) < Math.abs(best[0] - ts)) best = p;
+      at = at === null || Math.abs(best[0] - ts) < Math.abs(at - ts) ? best[0] : at;
+      rows += `<div style="color:${opts.colors ? opts.colors[index] : color(name, index)}">${esc(name)}: ${opts.format(best[1], true)}</div>`;
+    });
+    cursor.setAttribute("x1", sx(at)); cursor.setAttribute("x2", sx(at)); cursor.setAttribute("visibility", "visible");
+    tip.innerHTML = `<div>${day(at)}${at % 86400 ? " " + new Date(at * 1000).toISOString().slice(11, 16) : ""}</div>${rows}`;
+    tip.style.display = "block";
+    tip.style.left = Math.min(event.clientX - el.getBoundingClientRect().left + 16, el.clientWidth - tip.offsetWidth - 8) + "px";
+    tip.style.top = (event.clientY - el.getBoundingClientRect().top + 16) + "px";
+  });
+  chart.addEventListener("mouseleave", () => { cursor.setAttribute("visibility", "hidden"); tip.style.display = "none"; });
+  return el;
+}
+
+function growthChart(title, rows) {
+  rows = rows.slice(0, 8);
+  if (!rows.length) return panel(title, "<p>No vendor has a positive starting value in this window.</p>");
+  const rowHeight = 40, height = rows.length * rowHeight + M.top + M.bottom, left = 180;
+  const lo = Math.min(0, ...rows.map(r => r.pct)), hi = Math.max(0, ...rows.map(r => r.pct)) * 1.15 || 1;
+  const sx = v => left + (v - lo) / (hi - lo) * (W - left - M.right - 60);
+  let body = "";
+  rows.forEach((row, index) => {
+    const y = M.top + index * rowHeight, c = index === 0 ? STYLE.primary : STYLE.series[(rows.length - 1 - index) % STYLE.series.length];
+    const x = Math.min(sx(0), sx(row.pct)), w = Math.abs(sx(row.pct) - sx(0));
+    body += `<text x="${left - 10}" y="${y + rowHeight / 2 + 4}" fill="${STYLE.text}" font-size="12" text-anchor="end">${esc(row.vendor)}</text>`;
+    body += `<rect x="${x}" y="${y + 6}" width="${w}" height="${rowHeight - 12}" fill="${c}"><title>${row.pct.toFixed(2)}%</title></rect>`;
+    body += `<text x="${Math.max(sx(0), sx(row.pct)) + 6}" y="${y + rowHeight / 2 + 4}" fill="${STYLE.text}" font-size="11">${row.pct.toFixed(1)}% (${usd(row.abs)})</text>`;
+  });
+  body += `<line x1="${sx(0)}" x2="${sx(0)}" y1="${M.top}" y2="${height - M.bottom}" stroke="${STYLE.grid}"/>`;
+  body += `<text x="${(left + W) / 2}" y="${height - 10}" fill="${STYLE.muted}" font-size="11" text-anchor="middle">Growth %</text>`;
+  return panel(title, svg(W, height, body));
+}
+
+function renderWindow(win) {
+  const level = LEVELS[win.level] || {};
+  const repriced = slice(level[DATA.metric], win.start);
+  const lower = slice(level[DATA.metric + "_lower"], win.start), upper = slice(level[DATA.metric + "_upper"], win.start);
+  const bands = {};
+  for (const name in lower) bands[name] = [lower[name], upper[name] || []];
+  const top = topVendors(repriced, 8);
+  const container = document.getElementById("views");
+  container.innerHTML = "";
+  for (const view of win.views) {
+    const series = {};
+    for (const name in top) if (!view.exclude.includes(name)) series[name] = top[name];
+    if (!Object.keys(series).length && view.kind !== "concentration") continue;
+    if (view.kind === "line") {
+      container.appendChild(lineChart(view.title, series, {format: usd, bands}));
+    } else if (view.kind === "share") {
+      container.appendChild(lineChart(view.title, normalize(series), {yMax: 100, format: (v, exact) => v.toFixed(exact ? 2 : 0) + "%"}));
+    } else if (view.kind === "growth") {
+      container.appendChild(growthChart(view.title, growthRows(repriced)));
+    } else if (view.kind === "concentration" && win.concentration_start !== null) {
+      const shares = slice(CONCENTRATION.share, win.concentration_start), hhi = slice(CONCENTRATION.hhi, win.concentration_start);
+      if (!Object.keys(shares).length) continue;
+      container.appendChild(lineChart(view.title, shares, {yMax: 100, format: (v, exact) => v.toFixed(exact ? 2 : 0) + "%"}));
+      container.appendChild(lineChart("HHI (0-10000)", hhi, {format: v => v.toFixed(0), colors: [STYLE.muted]}));
+    }
+  }
+}
+
+const tabs = document.getElementById("tabs");
+DATA.windows.forEach((win, index) => {
+  const button = document.createElement("button");
+  button.textContent = win.days + "d";
+  button.title = win.name;
+  button.addEventListener("click", () => {
+    tabs.querySelectorAll("button").forEach(b => b.classList.remove("active"));
+    button.classList.add("active");
+    renderWindow(win);
+  });
+  tabs.appendChild(button);
+  if (index === 0) button.click();
+});
+</script>
+</body>
+</html>
+"""
+
+
+__all__ = [
+    "REPORT_FORMATS",
+    "ReportView",
+    "ReportWindow",
+    "deltas",
+    "encode_int32",
+    "encode_series_block",
+    "quantize",
+    "render_html_report",
+    "write_html_report",
+]
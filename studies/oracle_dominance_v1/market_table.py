@@ -0,0 +1,200 @@
+"""Columnar (struct-of-arrays) market universe.
+
+Numeric state lives in typed arrays, addresses and symbols are dictionary-encoded
+into a shared string pool, and methodology filters are evaluated as byte masks.
+`MarketRef` views are built on demand for code that still expects objects.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import operator
+from array import array
+from itertools import compress
+from typing import Callable, Iterable, Iterator
+
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+class StringPool:
+    def __init__(self) -> None:
+        self.values: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self._ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def get(self, value: str) -> int | None:
+        return self._ids.get(value)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.values[string_id]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    # One predicate call per distinct string instead of one per row.
+    def flags(self, predicate: Callable[[str], bool]) -> bytes:
+        return bytes(1 if predicate(value) else 0 for value in self.values)
+
+
+def _parse_raw(value: str | None) -> int | None:
+    return int(value) if value else None
+
+
+class MarketTable:
+    def __init__(self, pool: StringPool | None = None) -> None:
+        self.pool = pool or StringPool()
+        self.unique_key = array("i")
+        self.chain_id = array("i")
+        self.oracle = array("i")
+        self.loan_asset = array("i")
+        self.loan_symbol = array("i")
+        self.loan_decimals = array("h")
+        self.collateral_asset = array("i")
+        self.collateral_symbol = array("i")
+        self.supply_units = array("d")
+        self.borrow_units = array("d")
+        self.supply_usd = array("d")
+        self.borrow_usd = array("d")
+        self.supply_raw: list[int | None] = []
+        self.borrow_raw: list[int | None] = []
+
+    @classmethod
+    def from_markets(cls, markets: Iterable[MarketRef]) -> MarketTable:
+        table = cls()
+        for market in markets:
+            table.append(market)
+        return table
+
+    def append(self, market: MarketRef) -> None:
+        intern = self.pool.intern
+        decimals = int(market.loan_asset_decimals)
+        scale = 10 ** decimals if decimals >= 0 else 1
+        supply_raw = _parse_raw(market.supply_assets)
+        borrow_raw = _parse_raw(market.borrow_assets)
+        self.unique_key.append(intern(market.unique_key))
+        self.chain_id.append(int(market.chain_id))
+        self.oracle.append(intern(market.oracle_address))
+        self.loan_asset.append(intern(market.loan_asset_address))
+        self.loan_symbol.append(intern(market.loan_asset_symbol))
+        self.loan_decimals.append(decimals)
+        self.collateral_asset.append(intern(market.collateral_asset_address))
+        self.collateral_symbol.append(intern(market.collateral_asset_symbol))
+        self.supply_units.append(supply_raw / scale if supply_raw is not None else math.nan)
+        self.borrow_units.append(borrow_raw / scale if borrow_raw is not None else math.nan)
+        self.supply_usd.append(math.nan if market.supply_assets_usd is None else float(market.supply_assets_usd))
+        self.borrow_usd.append(math.nan if market.borrow_assets_usd is None else float(market.borrow_assets_usd))
+        self.supply_raw.append(supply_raw)
+        self.borrow_raw.append(borrow_raw)
+
+    def __len__(self) -> int:
+        return len(self.unique_key)
+
+    # Views are snapshots; write back through the column setters (e.g. set_oracle).
+    def market(self, index: int) -> MarketRef:
+        pool = self.pool
+        supply_raw = self.supply_raw[index]
+        borrow_raw = self.borrow_raw[index]
+        supply_usd = self.supply_usd[index]
+        borrow_usd = self.borrow_usd[index]
+        return MarketRef(
+            unique_key=pool[self.unique_key[index]],
+            chain_id=self.chain_id[index],
+            oracle_address=pool[self.oracle[index]],
+            loan_asset_address=pool[self.loan_asset[index]],
+            loan_asset_symbol=pool[self.loan_symbol[index]],
+            loan_asset_decimals=self.loan_decimals[index],
+            collateral_asset_address=pool[self.collateral_asset[index]],
+            collateral_asset_symbol=pool[self.collateral_symbol[index]],
+            supply_assets=None if supply_raw is None else str(supply_raw),
+            borrow_assets=None if borrow_raw is None else str(borrow_raw),
+            supply_assets_usd=None if math.isnan(supply_usd) else supply_usd,
+            borrow_assets_usd=None if math.isnan(borrow_usd) else borrow_usd,
+        )
+
+    def __iter__(self) -> Iterator[MarketRef]:
+        return (self.market(index) for index in range(len(self)))
+
+    def to_markets(self) -> list[MarketRef]:
+        return list(self)
+
+    def key(self, index: int) -> tuple[int, str]:
+        return self.chain_id[index], self.pool[self.unique_key[index]]
+
+    def set_oracle(self, index: int, oracle_address: str) -> None:
+        self.oracle[index] = self.pool.intern(oracle_address)
+
+    def take(self, indices: Iterable[int]) -> MarketTable:
+        indices = list(indices)
+        table = MarketTable(self.pool)
+        for name in (
+            "unique_key",
+            "chain_id",
+            "oracle",
+            "loan_asset",
+            "loan_symbol",
+            "loan_decimals",
+            "collateral_asset",
+            "collateral_symbol",
+            "supply_units",
+            "borrow_units",
+            "supply_usd",
+            "borrow_usd",
+        ):
+            source = getattr(self, name)
+            getattr(table, name).extend(map(source.__getitem__, indices))
+        table.supply_raw = list(map(self.supply_raw.__getitem__, indices))
+        table.borrow_raw = list(map(self.borrow_raw.__getitem__, indices))
+        return table
+
+    def filter(self, mask: bytes | bytearray) -> MarketTable:
+        return self.take(compress(range(len(self)), mask))
+
+    # Masks map over whole columns, so the per-row work stays in C; Python-level loops
+    # run once per distinct string or excluded value. Missing values count as zero,
+    # like `float(value or 0)` on MarketRef.
+    def mask_min(self, column: str, minimum: float) -> bytearray:
+        values = getattr(self, column)
+        threshold = float(minimum)
+        mask = bytearray(map(threshold.__le__, values))
+        if threshold <= 0:
+            mask = bytearray(map(operator.or_, mask, map(math.isnan, values)))
+        return mask
+
+    def mask_string_flags(self, column: str, flags: bytes | bytearray) -> bytearray:
+        return bytearray(map(flags.__getitem__, getattr(self, column)))
+
+    def mask_not_in(self, column: str, excluded: Iterable[str]) -> bytearray:
+        flags = bytearray(b"\x01") * len(self.pool)
+        for value in excluded:
+            string_id = self.pool.get(value)
+            if string_id is not None:
+                flags[string_id] = 0
+        return self.mask_string_flags(column, flags)
+
+    def mask_keys_in(self, keys: set[tuple[int, str]]) -> bytearray:
+        key_ids = {(chain_id, self.pool.get(unique_key)) for chain_id, unique_key in keys}
+        return bytearray(map(key_ids.__contains__, zip(self.chain_id, self.unique_key)))
+
+    # heapq.nlargest is the stdlib partial selection (O(n log k)) and, like a stable
+    # descending sort, keeps the original order among ties.
+    def top_n(self, n: int, column: str = "supply_usd", candidates: Iterable[int] | None = None) -> list[int]:
+        values = getattr(self, column)
+        indices = range(len(self)) if candidates is None else candidates
+        return heapq.nlargest(n, indices, key=lambda index: 0.0 if math.isnan(values[index]) else values[index])
+
+
+# Masks hold 0/1 bytes, so a big-integer AND combines them bytewise in one C-level pass.
+def mask_and(*masks: bytes | bytearray) -> bytearray:
+    size = len(masks[0])
+    combined = int.from_bytes(masks[0], "big")
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, "big")
+    return bytearray(combined.to_bytes(size, "big"))
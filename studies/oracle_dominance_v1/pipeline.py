@@ -2,31 +2,66 @@
 
 from __future__ import annotations
 
-import csv
+import logging
+from datetime import date, datetime, timezone
+from itertools import chain
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Sequence
 
+from studies.market_data.sources import (
+    fetch_market_history,
+    fetch_monarch_market_oracles,
+    fetch_monarch_market_universe,
+    fetch_morpho_markets_for_chain,
+    iter_market_history,
+)
+from studies.market_data.sources import fetch_oracle_metadata as fetch_oracle_metadata_for_chains
+from studies.market_data.store import MarketDataStore
+from studies.oracle_dominance_v1.allocation import (
+    ALLOCATION_SCHEMES,
+    DEFAULT_ALLOCATION_SCHEME,
+    build_weight_matrices,
+    resolve_allocation_schemes,
+)
 from studies.oracle_dominance_v1.analysis import (
+    CURRENT_EXPOSURE_FIELDS,
+    HARDCODED_SUMMARY_FIELDS,
+    HardcodedSummary,
     allocate_evenly,
     build_current_exposure_table,
     build_hardcoded_summary,
+    build_historical_exposure_builder,
+    build_historical_exposure_by_scheme,
     build_historical_exposure_series,
     build_market_vendor_allocation,
     flatten_vendor_legs,
     infer_current_loan_asset_prices,
+    iter_current_exposure_rows,
 )
-from studies.oracle_dominance_v1.clients.monarch import fetch_monarch_market_universe
-from studies.oracle_dominance_v1.clients.morpho import fetch_market_history, fetch_morpho_markets_for_chain
-from studies.oracle_dominance_v1.clients.oracle_gist import fetch_oracle_metadata as fetch_oracle_metadata_for_chains
+from studies.oracle_dominance_v1.clients.rpc import fetch_rpc_markets
 from studies.oracle_dominance_v1.config import (
     BLACKLISTED_MARKET_IDS,
     BLACKLISTED_TOKEN_ADDRESSES,
     SUPPORTED_CHAINS,
 )
+from studies.oracle_dominance_v1.concentration import concentration_fields, concentration_rows, iter_concentration
+from studies.oracle_dominance_v1.current_snapshot import SNAPSHOT_FILENAME, CurrentSnapshot, totals_fields
+from studies.oracle_dominance_v1.exposure_cube import CUBE_FILENAME, CubeCell, CurrentCubeTotals, write_exposure_cube
+from studies.oracle_dominance_v1.history_pyramid import HistoryPyramid, build_history_pyramid, save_history_pyramid
+from studies.oracle_dominance_v1.market_table import MarketTable, mask_and
 from studies.oracle_dominance_v1.models import MarketRef, MarketVendorAllocation, VendorExposurePoint, VendorLeg
+from studies.oracle_dominance_v1.price_index import REPRICING_MODES
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL, GAP_FILL_MODES, validate_gap_fill
+from studies.oracle_dominance_v1.utils.csv_rows import ColumnTotals, write_csv_rows
 from studies.oracle_dominance_v1.utils.env import load_local_env
 
 
 load_local_env()
+logger = logging.getLogger(__name__)
+
+# How a Monarch request fails: unconfigured endpoint, HTTP or GraphQL errors (RuntimeError),
+# network errors (OSError) and malformed responses (ValueError, KeyError).
+MONARCH_LOOKUP_ERRORS = (RuntimeError, OSError, ValueError, KeyError)
 
 
 def _is_known_symbol(symbol: str) -> bool:
@@ -34,87 +69,196 @@ def _is_known_symbol(symbol: str) -> bool:
     return value not in {"", "UNKNOWN", "N/A", "NULL"}
 
 
+STATE_SOURCES = ("api", "rpc")
+
+
 # Fetch markets with methodology filters (borrow cutoff, listed-only, recognized tokens only).
-def fetch_live_markets(
+# With state_source="rpc", markets on chains with an RPC_URL_<chain_id> are built from chain
+# state (params, tokens and totals) before filtering; the API universe only supplies the
+# market IDs and the per-unit loan-asset prices used for USD values.
+def fetch_live_market_table(
     min_borrow_usd: float = 0.0,
     require_listed: bool = False,
     recognized_tokens_only: bool = False,
-) -> list[MarketRef]:
-    merged: list[MarketRef] = []
-    for chain_id in SUPPORTED_CHAINS:
-        merged.extend(fetch_morpho_markets_for_chain(chain_id))
+    chains: Iterable[int] = SUPPORTED_CHAINS,
+    state_source: str = "api",
+) -> MarketTable:
+    if state_source not in STATE_SOURCES:
+        raise ValueError(f"Unsupported state source: {state_source}")
+    table = MarketTable()
+    for chain_id in chains:
+        for market in fetch_morpho_markets_for_chain(chain_id):
+            table.append(market)
+    if state_source == "rpc":
+        table = MarketTable.from_markets(fetch_rpc_markets(table, infer_current_loan_asset_prices(table)))
 
-    monarch_universe: dict[tuple[int, str], str] = {}
+    return filter_market_table(
+        table,
+        load_monarch_oracles(table, require_listed),
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+    )
+
+
+def load_monarch_universe(store: MarketDataStore | None = None) -> dict[tuple[int, str], str]:
     try:
-        monarch_universe = fetch_monarch_market_universe()
+        return fetch_monarch_market_universe(store=store)
     except Exception:
-        monarch_universe = {}
+        return {}
 
-    listed_keys: set[tuple[int, str]] | None = set(monarch_universe.keys()) if require_listed else None
 
-    filtered: list[MarketRef] = []
-    for market in merged:
-        monarch_oracle = monarch_universe.get((market.chain_id, market.unique_key))
-        if monarch_oracle and not market.oracle_address:
-            market.oracle_address = monarch_oracle
-        if market.unique_key in BLACKLISTED_MARKET_IDS:
-            continue
-        if market.loan_asset_address in BLACKLISTED_TOKEN_ADDRESSES:
-            continue
-        if market.collateral_asset_address in BLACKLISTED_TOKEN_ADDRESSES:
-            continue
-        if float(market.borrow_assets_usd or 0) < float(min_borrow_usd):
-            continue
-        if listed_keys is not None and (market.chain_id, market.unique_key) not in listed_keys:
-            continue
-        if recognized_tokens_only and (
-            not _is_known_symbol(market.loan_asset_symbol)
-            or not _is_known_symbol(market.collateral_asset_symbol)
-        ):
-            continue
-        filtered.append(market)
+# The full universe is only needed for --require-listed; otherwise look up just the
+# markets with an empty oracle, falling back to the full universe if the lookup fails.
+def load_monarch_oracles(
+    table: MarketTable,
+    require_listed: bool = False,
+    store: MarketDataStore | None = None,
+) -> dict[tuple[int, str], str]:
+    if require_listed:
+        return load_monarch_universe(store)
+    try:
+        return lookup_missing_oracles(table, store)
+    except MONARCH_LOOKUP_ERRORS as exc:
+        logger.warning("Monarch oracle lookup failed (%s); falling back to the full Monarch universe", exc)
+        return load_monarch_universe(store)
 
-    return filtered
 
+def lookup_missing_oracles(table: MarketTable, store: MarketDataStore | None = None) -> dict[tuple[int, str], str]:
+    missing_oracle_id = table.pool.get("")
+    if missing_oracle_id is None:
+        return {}
+    return fetch_monarch_market_oracles(
+        (table.key(index) for index, oracle_id in enumerate(table.oracle) if oracle_id == missing_oracle_id),
+        store=store,
+    )
 
-def fetch_oracle_metadata(markets: list[MarketRef] | None = None) -> dict[tuple[int, str], dict]:
-    market_list = markets if markets is not None else fetch_live_markets()
-    return fetch_oracle_metadata_for_chains([m.chain_id for m in market_list])
 
+# Backfill missing oracles from the Monarch universe, then apply the methodology masks.
+def filter_market_table(
+    table: MarketTable,
+    monarch_universe: dict[tuple[int, str], str],
+    min_borrow_usd: float = 0.0,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+) -> MarketTable:
+    missing_oracle_id = table.pool.get("")
+    if monarch_universe and missing_oracle_id is not None:
+        for index, oracle_id in enumerate(table.oracle):
+            if oracle_id != missing_oracle_id:
+                continue
+            monarch_oracle = monarch_universe.get(table.key(index))
+            if monarch_oracle:
+                table.set_oracle(index, monarch_oracle)
 
-def export_csv(path: str | Path, rows: list[dict]) -> None:
-    target = Path(path)
-    target.parent.mkdir(parents=True, exist_ok=True)
-    if not rows:
-        target.write_text("", encoding="utf-8")
-        return
-    with target.open("w", encoding="utf-8", newline="") as handle:
-        writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(rows)
+    masks = [
+        table.mask_not_in("unique_key", BLACKLISTED_MARKET_IDS),
+        table.mask_not_in("loan_asset", BLACKLISTED_TOKEN_ADDRESSES),
+        table.mask_not_in("collateral_asset", BLACKLISTED_TOKEN_ADDRESSES),
+        table.mask_min("borrow_usd", min_borrow_usd),
+    ]
+    if require_listed:
+        masks.append(table.mask_keys_in(set(monarch_universe.keys())))
+    if recognized_tokens_only:
+        known_symbols = table.pool.flags(_is_known_symbol)
+        masks.append(table.mask_string_flags("loan_symbol", known_symbols))
+        masks.append(table.mask_string_flags("collateral_symbol", known_symbols))
+    return table.filter(mask_and(*masks))
 
 
-def export_csvs(output_dir: str | Path, current_rows: list[dict], historical_points: list[VendorExposurePoint], days: int) -> tuple[Path, Path]:
+def fetch_live_markets(
+    min_borrow_usd: float = 0.0,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+) -> list[MarketRef]:
+    return fetch_live_market_table(
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+    ).to_markets()
+
+
+def fetch_oracle_metadata(
+    markets: list[MarketRef] | MarketTable | None = None,
+    store: MarketDataStore | None = None,
+) -> dict[tuple[int, str], dict]:
+    market_list = markets if markets is not None else fetch_live_market_table()
+    if isinstance(market_list, MarketTable):
+        return fetch_oracle_metadata_for_chains(list(market_list.chain_id), store=store)
+    return fetch_oracle_metadata_for_chains([m.chain_id for m in market_list], store=store)
+
+
+HISTORY_POINT_FIELDS = ("as_of", "vendor", "metric", "exposure_usd")
+
+
+# Rows are streamed under the given header and handed to `observers` as they are
+# written; returns the row count.
+# Without `fields`, the header is the first row's keys; only that row is held back to read it.
+def export_csv(
+    path: str | Path,
+    rows: Iterable[dict],
+    fields: Sequence[str] | None = None,
+    observers: Iterable[Callable[[dict], None]] = (),
+) -> int:
+    if fields is None:
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return write_csv_rows(path, (), (), observers)
+        fields = tuple(first)
+        rows = chain((first,), rows)
+    return write_csv_rows(path, rows, fields, observers)
+
+
+def export_csvs(
+    output_dir: str | Path,
+    current_rows: Iterable[dict],
+    historical_points: Iterable[VendorExposurePoint],
+    days: int,
+    observers: Iterable[Callable[[dict], None]] = (),
+) -> tuple[Path, Path]:
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     current_csv = output_path / "vendor_dominance_current.csv"
     historical_csv = output_path / f"vendor_dominance_{days}d.csv"
-    export_csv(current_csv, current_rows)
-    export_csv(
-        historical_csv,
-        [
-            {
-                "as_of": point.as_of.isoformat(),
-                "vendor": point.vendor,
-                "metric": point.metric,
-                "exposure_usd": round(point.exposure_usd, 2),
-            }
-            for point in historical_points
-        ],
-    )
+    export_csv(current_csv, current_rows, CURRENT_EXPOSURE_FIELDS, observers)
+    export_csv(historical_csv, historical_point_rows(historical_points), HISTORY_POINT_FIELDS)
     return current_csv, historical_csv
 
 
+def historical_point_rows(points: Iterable[VendorExposurePoint]) -> Iterator[dict]:
+    for point in points:
+        yield {
+            "as_of": point.as_of.isoformat(),
+            "vendor": point.vendor,
+            "metric": point.metric,
+            "exposure_usd": round(point.exposure_usd, 2),
+        }
+
+
+# Export a shorter window from the finest pyramid level without refetching history.
+def export_window_csv(output_dir: str | Path, pyramid: HistoryPyramid, days: int) -> Path:
+    historical_csv = Path(output_dir) / f"vendor_dominance_{days}d.csv"
+    export_csv(historical_csv, historical_point_rows(pyramid.window(days, pyramid.finest)), HISTORY_POINT_FIELDS)
+    return historical_csv
+
+
+# Concentration is computed once over the full fetch; each window keeps its rows, whose
+# trailing deltas still reach back before the window start.
+def export_concentration_csvs(output_dir: str | Path, pyramid: HistoryPyramid, windows: Iterable[int]) -> dict[int, Path]:
+    points = list(iter_concentration(pyramid.window(pyramid.days, pyramid.finest)))
+    outputs: dict[int, Path] = {}
+    for window in windows:
+        start = pyramid.window_start(window, pyramid.finest)
+        outputs[window] = Path(output_dir) / f"vendor_concentration_{window}d.csv"
+        export_csv(
+            outputs[window],
+            concentration_rows(point for point in points if point.as_of >= start),
+            concentration_fields(),
+        )
+    return outputs
+
+
 # Build vendor and assumption attribution outputs plus historical time series.
 def run_v1(
     output_dir: str | Path,
@@ -122,56 +266,212 @@ def run_v1(
     min_borrow_usd: float = 500_000,
     require_listed: bool = False,
     recognized_tokens_only: bool = False,
+    windows: Iterable[int] = (),
+    interval: str = "DAY",
+    allocation_schemes: Iterable[str] = (),
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
 ) -> dict[str, object]:
-    markets = fetch_live_markets(
+    report_windows = sorted({days, *windows})
+    fetch_days = report_windows[-1]
+    schemes = resolve_allocation_schemes([DEFAULT_ALLOCATION_SCHEME, *allocation_schemes])
+    filters = {
+        "min_borrow_usd": min_borrow_usd,
+        "require_listed": require_listed,
+        "recognized_tokens_only": recognized_tokens_only,
+        "interval": interval,
+        "repricing": repricing,
+        "gap_fill": validate_gap_fill(gap_fill),
+    }
+    markets = fetch_live_market_table(
         min_borrow_usd=min_borrow_usd,
         require_listed=require_listed,
         recognized_tokens_only=recognized_tokens_only,
     )
     metadata = fetch_oracle_metadata(markets)
     current_prices = infer_current_loan_asset_prices(markets)
-    current_rows = build_current_exposure_table(markets, metadata)
-    historical_points = build_historical_exposure_series(
+    builder = build_historical_exposure_builder(
+        markets,
+        metadata,
+        fetch_market_history=iter_market_history,
+        days=fetch_days,
+        interval=interval,
+        schemes=schemes,
+        repricing=repricing,
+        gap_fill=gap_fill,
+        end=datetime.now(timezone.utc),
+    )
+    return write_v1_outputs(
+        output_dir,
         markets,
         metadata,
         current_prices,
-        fetch_market_history=fetch_market_history,
+        iter_current_exposure_rows(markets, metadata),
+        builder.points_by_scheme(current_prices),
         days=days,
+        windows=report_windows,
+        filters=filters,
+        cube_cells=builder.cube_cells(current_prices),
+        end=builder.end.date(),
     )
 
-    current_csv, historical_csv = export_csvs(output_dir, current_rows, historical_points, days=days)
-    export_csv(Path(output_dir) / "hardcoded_exposure_summary.csv", build_hardcoded_summary(current_rows))
+
+# Refresh only the current outputs, rebuilding rows just for markets whose state,
+# oracle or metadata changed since the snapshot left in `output_dir` by the last refresh.
+def refresh_current_outputs(
+    output_dir: str | Path,
+    min_borrow_usd: float = 500_000,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+    state_source: str = "api",
+) -> dict[str, object]:
+    output_path = Path(output_dir)
+    filters = {
+        "min_borrow_usd": min_borrow_usd,
+        "require_listed": require_listed,
+        "recognized_tokens_only": recognized_tokens_only,
+    }
+    markets = fetch_live_market_table(
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+        state_source=state_source,
+    )
+    metadata = fetch_oracle_metadata(markets)
+    snapshot = CurrentSnapshot.load(output_path / SNAPSHOT_FILENAME, filters)
+    delta = snapshot.refresh(markets, metadata)
+
+    current_csv = output_path / "vendor_dominance_current.csv"
+    hardcoded = HardcodedSummary()
+    current_totals = ColumnTotals(("supply_assets_usd", "borrow_assets_usd"))
+    export_csv(current_csv, snapshot.current_rows(), CURRENT_EXPOSURE_FIELDS, (hardcoded.add, current_totals.add))
+    export_csv(output_path / "hardcoded_exposure_summary.csv", hardcoded.rows(), HARDCODED_SUMMARY_FIELDS)
+    export_csv(output_path / "vendor_current_totals.csv", snapshot.totals_rows("vendor"), totals_fields("vendor"))
+    export_csv(output_path / "assumption_current_totals.csv", snapshot.totals_rows("assumption"), totals_fields("assumption"))
+    snapshot_path = snapshot.save(output_path / SNAPSHOT_FILENAME)
+    return {
+        "market_count": len(markets),
+        "metadata_count": len(metadata),
+        "added": delta.added,
+        "changed": delta.changed,
+        "removed": delta.removed,
+        "unchanged": delta.unchanged,
+        "current_row_count": current_totals.rows,
+        "current_totals_usd": {column: round(total, 2) for column, total in current_totals.sums.items()},
+        "current_output": str(current_csv),
+        "snapshot_output": str(snapshot_path),
+        "state_source": state_source,
+        "filters": filters,
+    }
+
+
+# Write current, window, scheme and pyramid outputs for an already aggregated run.
+# `current_rows` is consumed once: the hardcoded summary, current cube cells and run
+# totals are gathered while the current CSV is written. `end` is the history builder's
+# pinned window end; without it windows end at the last history point.
+def write_v1_outputs(
+    output_dir: str | Path,
+    markets: MarketTable,
+    metadata: dict[tuple[int, str], dict],
+    current_prices: dict[tuple[int, str], float],
+    current_rows: Iterable[dict],
+    points_by_scheme: dict[str, list[VendorExposurePoint]],
+    days: int,
+    windows: list[int],
+    filters: dict[str, object],
+    cube_cells: Iterable[CubeCell] = (),
+    end: date | None = None,
+) -> dict[str, object]:
+    fetch_days = windows[-1]
+    pyramid = build_history_pyramid(
+        points_by_scheme[DEFAULT_ALLOCATION_SCHEME], days=fetch_days, end=end, metadata={"filters": filters}
+    )
+    pyramid_path = save_history_pyramid(Path(output_dir) / "vendor_history_pyramid.json", pyramid)
+
+    as_of = datetime.now(timezone.utc).date().isoformat()
+    hardcoded = HardcodedSummary()
+    current_cells = CurrentCubeTotals(as_of)
+    current_totals = ColumnTotals(("supply_assets_usd", "borrow_assets_usd"))
+    current_csv, historical_csv = export_csvs(
+        output_dir,
+        current_rows,
+        pyramid.window(days, pyramid.finest),
+        days=days,
+        observers=(hardcoded.add, current_cells.add, current_totals.add),
+    )
+    window_outputs = {days: str(historical_csv)}
+    for window in windows:
+        if window != days:
+            window_outputs[window] = str(export_window_csv(output_dir, pyramid, window))
+    concentration_outputs = export_concentration_csvs(output_dir, pyramid, window_outputs)
+    scheme_outputs: dict[str, str] = {}
+    for scheme in points_by_scheme:
+        if scheme == DEFAULT_ALLOCATION_SCHEME:
+            continue
+        scheme_pyramid = build_history_pyramid(points_by_scheme[scheme], days=fetch_days, end=pyramid.end)
+        scheme_csv = Path(output_dir) / f"vendor_dominance_{days}d_{scheme}.csv"
+        export_csv(scheme_csv, historical_point_rows(scheme_pyramid.window(days, scheme_pyramid.finest)), HISTORY_POINT_FIELDS)
+        scheme_outputs[scheme] = str(scheme_csv)
+    export_csv(Path(output_dir) / "hardcoded_exposure_summary.csv", hardcoded.rows(), HARDCODED_SUMMARY_FIELDS)
+    cube_path = write_exposure_cube(
+        Path(output_dir) / CUBE_FILENAME,
+        chain(current_cells.cells(), cube_cells),
+        metadata={"as_of": as_of, "days": fetch_days, "filters": filters},
+    )
     return {
         "market_count": len(markets),
         "metadata_count": len(metadata),
         "price_count": len(current_prices),
+        "current_row_count": current_totals.rows,
+        "current_totals_usd": {column: round(total, 2) for column, total in current_totals.sums.items()},
         "current_output": str(current_csv),
         "historical_output": str(historical_csv),
-        "filters": {
-            "min_borrow_usd": min_borrow_usd,
-            "require_listed": require_listed,
-            "recognized_tokens_only": recognized_tokens_only,
-        },
+        "window_outputs": {f"{window}d": path for window, path in sorted(window_outputs.items())},
+        "concentration_outputs": {f"{window}d": str(path) for window, path in sorted(concentration_outputs.items())},
+        "pyramid_output": str(pyramid_path),
+        "cube_output": str(cube_path),
+        "scheme_outputs": scheme_outputs,
+        "filters": filters,
     }
 
 
 __all__ = [
+    "ALLOCATION_SCHEMES",
+    "DEFAULT_GAP_FILL",
+    "GAP_FILL_MODES",
+    "HISTORY_POINT_FIELDS",
+    "REPRICING_MODES",
+    "STATE_SOURCES",
     "MarketRef",
+    "MarketTable",
     "MarketVendorAllocation",
     "VendorLeg",
     "VendorExposurePoint",
     "allocate_evenly",
     "build_current_exposure_table",
     "build_hardcoded_summary",
+    "build_historical_exposure_builder",
+    "build_historical_exposure_by_scheme",
     "build_historical_exposure_series",
     "build_market_vendor_allocation",
+    "build_weight_matrices",
     "export_csv",
+    "export_concentration_csvs",
     "export_csvs",
+    "export_window_csv",
+    "fetch_live_market_table",
     "fetch_live_markets",
     "fetch_market_history",
+    "iter_market_history",
+    "fetch_monarch_market_oracles",
     "fetch_monarch_market_universe",
     "fetch_oracle_metadata",
+    "filter_market_table",
     "flatten_vendor_legs",
+    "historical_point_rows",
     "infer_current_loan_asset_prices",
+    "iter_current_exposure_rows",
+    "refresh_current_outputs",
     "run_v1",
+    "write_v1_outputs",
 ]
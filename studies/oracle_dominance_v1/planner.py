@@ -0,0 +1,274 @@
+"""Dry-run cost estimates for v1 runs and reports.
+
+Planning resolves the market universe, Monarch oracles and oracle metadata through
+the shared market data cache, so a run started soon after reuses them. It fetches
+no history. Per endpoint it counts the requests the run would issue, how many the
+local caches (market data store, history journal) already answer, and the expected
+payload bytes. It then projects wall time from the request schedule at the run's
+concurrency. Sizes and latency are rough constants from config.py.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from studies.market_data.clients.morpho import history_windows
+from studies.market_data.config import (
+    HISTORY_CHUNK_WORKERS,
+    HISTORY_INTERVAL_SECONDS,
+    MONARCH_LOOKUP_BATCH_SIZE,
+    MONARCH_MARKETS_PAGE_SIZE,
+    MORPHO_MARKETS_PAGE_SIZE,
+)
+from studies.market_data.env import monarch_api_url
+from studies.market_data.sources import history_key, monarch_oracles_key, oracle_metadata_key, policy, universe_key
+from studies.market_data.store import MarketDataStore, default_store
+from studies.oracle_dominance_v1 import pipeline
+from studies.oracle_dominance_v1.allocation import DEFAULT_ALLOCATION_SCHEME, resolve_allocation_schemes, weight_rows
+from studies.oracle_dominance_v1.analysis import flatten_vendor_legs
+from studies.oracle_dominance_v1.config import (
+    PLAN_BYTES_PER_SECOND,
+    PLAN_HISTORY_POINT_BYTES,
+    PLAN_MARKET_ROW_BYTES,
+    PLAN_MONARCH_ROW_BYTES,
+    PLAN_ORACLE_ENTRY_BYTES,
+    PLAN_REQUEST_SECONDS,
+    SUPPORTED_CHAINS,
+)
+from studies.oracle_dominance_v1.market_table import MarketTable
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+def request_seconds(payload_bytes: float) -> float:
+    return PLAN_REQUEST_SECONDS + payload_bytes / PLAN_BYTES_PER_SECOND
+
+
+@dataclass(slots=True)
+class EndpointPlan:
+    requests: int = 0
+    cache_hits: int = 0
+    payload_bytes: int = 0
+    # Projected seconds for this endpoint's stage at its concurrency.
+    seconds: float = 0.0
+
+    def add(self, requests: int, payload_bytes: int, cached: bool = False) -> None:
+        self.requests += requests
+        if cached:
+            self.cache_hits += requests
+        else:
+            self.payload_bytes += payload_bytes
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "network_requests": self.requests - self.cache_hits,
+            "payload_bytes": self.payload_bytes,
+            "seconds": round(self.seconds, 1),
+        }
+
+
+@dataclass(slots=True)
+class RunPlan:
+    concurrency: int
+    streaming: bool = False
+    endpoints: dict[str, EndpointPlan] = field(default_factory=dict)
+    counts: dict[str, object] = field(default_factory=dict)
+
+    def endpoint(self, name: str) -> EndpointPlan:
+        return self.endpoints.setdefault(name, EndpointPlan())
+
+    # Staged runs page, look up and download metadata one request at a time, then fetch
+    # history; a streaming run overlaps all of it, so its time is the longest stage.
+    @property
+    def wall_seconds(self) -> float:
+        stages = [plan.seconds for plan in self.endpoints.values()]
+        if not stages:
+            return 0.0
+        return max(stages) if self.streaming else sum(stages)
+
+    def as_dict(self) -> dict[str, object]:
+        return {
+            **self.counts,
+            "history_concurrency": self.concurrency,
+            "streaming": self.streaming,
+            "endpoints": {name: plan.as_dict() for name, plan in sorted(self.endpoints.items())},
+            "network_requests": sum(plan.requests - plan.cache_hits for plan in self.endpoints.values()),
+            "payload_bytes": sum(plan.payload_bytes for plan in self.endpoints.values()),
+            "projected_wall_seconds": round(self.wall_seconds, 1),
+        }
+
+
+def _monarch_cached(store: MarketDataStore) -> bool:
+    try:
+        return store.contains("monarch_universe", [monarch_api_url()], policy("monarch_universe"))
+    except RuntimeError:
+        return False
+
+
+# Whether a chain's targeted Monarch lookup of exactly these markets is already cached.
+def _monarch_lookup_cached(store: MarketDataStore, chain_id: int, unique_keys: list[str]) -> bool:
+    try:
+        return store.contains("monarch_oracles", monarch_oracles_key(chain_id, unique_keys), policy("monarch_oracles"))
+    except RuntimeError:
+        return False
+
+
+# Resolve the filtered universe and its metadata as the run would, recording the
+# Morpho paging, Monarch and oracle metadata requests that takes. Every fetch goes
+# through `store`, so the history plan that follows sees the same cache.
+def plan_market_universe(
+    plan: RunPlan,
+    min_borrow_usd: float = 0.0,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+    chains: Iterable[int] = SUPPORTED_CHAINS,
+    store: MarketDataStore | None = None,
+) -> tuple[MarketTable, dict[tuple[int, str], dict]]:
+    store = store or default_store()
+    chains = list(chains)
+    universe_hits = {chain_id: store.contains("universe", universe_key(chain_id), policy("universe")) for chain_id in chains}
+    monarch_hit = _monarch_cached(store)
+
+    table = MarketTable()
+    morpho_markets = plan.endpoint("morpho_markets")
+    chain_seconds: list[float] = []
+    for chain_id in chains:
+        count = 0
+        for market in pipeline.fetch_morpho_markets_for_chain(chain_id, store=store):
+            table.append(market)
+            count += 1
+        pages = max(1, math.ceil(count / MORPHO_MARKETS_PAGE_SIZE))
+        morpho_markets.add(pages, count * PLAN_MARKET_ROW_BYTES, universe_hits[chain_id])
+        if not universe_hits[chain_id]:
+            chain_seconds.append(pages * request_seconds(count * PLAN_MARKET_ROW_BYTES / pages))
+    morpho_markets.seconds = max(chain_seconds, default=0.0) if plan.streaming else sum(chain_seconds)
+
+    monarch = plan.endpoint("monarch")
+    missing_oracle_id = table.pool.get("")
+    missing: dict[int, list[str]] = defaultdict(list)
+    for index, oracle_id in enumerate(table.oracle):
+        if oracle_id == missing_oracle_id:
+            chain_id, unique_key = table.key(index)
+            missing[chain_id].append(unique_key)
+    lookup_hits = {chain_id: _monarch_lookup_cached(store, chain_id, keys) for chain_id, keys in missing.items()}
+    monarch_oracles = pipeline.load_monarch_oracles(table, require_listed, store)
+    if require_listed:
+        pages = len(monarch_oracles) // MONARCH_MARKETS_PAGE_SIZE + 1
+        monarch.add(pages, len(monarch_oracles) * PLAN_MONARCH_ROW_BYTES, monarch_hit)
+        if not monarch_hit:
+            monarch.seconds = pages * request_seconds(len(monarch_oracles) * PLAN_MONARCH_ROW_BYTES / pages)
+    else:
+        # Looked up per chain in batches; a chain's batches are cached together under its market set.
+        for chain_id, keys in sorted(missing.items()):
+            batches = math.ceil(len(keys) / MONARCH_LOOKUP_BATCH_SIZE)
+            monarch.add(batches, len(keys) * PLAN_MONARCH_ROW_BYTES, lookup_hits[chain_id])
+            if not lookup_hits[chain_id]:
+                monarch.seconds += batches * request_seconds(MONARCH_LOOKUP_BATCH_SIZE * PLAN_MONARCH_ROW_BYTES)
+
+    markets = pipeline.filter_market_table(
+        table,
+        monarch_oracles,
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+    )
+    metadata_chains = sorted(set(markets.chain_id))
+    metadata_hits = {
+        chain_id: store.contains("oracle_metadata", oracle_metadata_key(chain_id), policy("oracle_metadata"))
+        for chain_id in metadata_chains
+    }
+    metadata = pipeline.fetch_oracle_metadata(markets, store)
+    entries = Counter(chain_id for chain_id, _ in metadata)
+    oracle_gist = plan.endpoint("oracle_gist")
+    gist_seconds: list[float] = []
+    for chain_id in metadata_chains:
+        oracle_gist.add(1, entries[chain_id] * PLAN_ORACLE_ENTRY_BYTES, metadata_hits[chain_id])
+        if not metadata_hits[chain_id]:
+            gist_seconds.append(request_seconds(entries[chain_id] * PLAN_ORACLE_ENTRY_BYTES))
+    oracle_gist.seconds = max(gist_seconds, default=0.0) if plan.streaming else sum(gist_seconds)
+
+    plan.counts["universe_markets"] = len(table)
+    plan.counts["filtered_markets"] = len(markets)
+    return markets, metadata
+
+
+# Markets the v1 history builder fetches: those with at least one attributable vendor.
+def history_markets(markets: MarketTable, metadata: dict[tuple[int, str], dict], schemes: list[str]) -> list[MarketRef]:
+    selected = []
+    for market in markets:
+        legs = flatten_vendor_legs(metadata.get((market.chain_id, market.oracle_address)) or {})
+        if any(weight_rows(legs, schemes)):
+            selected.append(market)
+    return selected
+
+
+# Chunked history requests per market, answered by the store or the journal when cached.
+def plan_history(
+    plan: RunPlan,
+    markets: Iterable[MarketRef],
+    days: int,
+    interval: str,
+    completed: set[tuple[int, str]] = frozenset(),
+    store: MarketDataStore | None = None,
+) -> None:
+    store = store or default_store()
+    windows = history_windows(days, interval)
+    points = days * 86_400 // HISTORY_INTERVAL_SECONDS[interval]
+    chunk_bytes = points * PLAN_HISTORY_POINT_BYTES // len(windows)
+    history = plan.endpoint("morpho_history")
+    fetched = cached = 0
+    for market in markets:
+        hit = (market.chain_id, market.unique_key) in completed or store.contains(
+            "history", history_key(market.unique_key, market.chain_id, days, interval), policy("history")
+        )
+        history.add(len(windows), chunk_bytes * len(windows), hit)
+        cached += hit
+        fetched += not hit
+    # Markets run `concurrency` at a time; each fetches its chunks HISTORY_CHUNK_WORKERS at a time.
+    chunk_waves = math.ceil(len(windows) / min(HISTORY_CHUNK_WORKERS, len(windows)))
+    history.seconds = math.ceil(fetched / plan.concurrency) * chunk_waves * request_seconds(chunk_bytes)
+    plan.counts["history_markets"] = fetched + cached
+    plan.counts["history_cached_markets"] = cached
+    plan.counts["history_points_per_market"] = points
+
+
+# Plan a run_v1 (or --streaming) run without fetching history.
+def plan_v1(
+    days: int = 180,
+    min_borrow_usd: float = 500_000,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+    windows: Iterable[int] = (),
+    interval: str = "DAY",
+    allocation_schemes: Iterable[str] = (),
+    streaming: bool = False,
+    concurrency: int = 1,
+    store: MarketDataStore | None = None,
+) -> dict[str, object]:
+    fetch_days = max(days, *windows) if windows else days
+    schemes = resolve_allocation_schemes([DEFAULT_ALLOCATION_SCHEME, *allocation_schemes])
+    # The staged builder fetches one market at a time.
+    plan = RunPlan(concurrency=concurrency if streaming else 1, streaming=streaming)
+    markets, metadata = plan_market_universe(
+        plan,
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+        store=store,
+    )
+    plan_history(plan, history_markets(markets, metadata, schemes), fetch_days, interval, store=store)
+    return {**plan.as_dict(), "days": fetch_days, "interval": interval}
+
+
+__all__ = [
+    "EndpointPlan",
+    "RunPlan",
+    "history_markets",
+    "plan_history",
+    "plan_market_universe",
+    "plan_v1",
+]
@@ -0,0 +1,179 @@
+"""Stratified-sample preview of historical vendor exposure.
+
+The largest markets are always fetched; the rest are stratified by chain and
+supply decade and sampled per stratum, so each sampled market stands in for
+N_h / n_h markets of its stratum (Horvitz-Thompson). Uncertainty bands come
+from a stratified bootstrap over the fetched sample.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Iterator, Sequence
+
+from studies.oracle_dominance_v1.exposure_accumulator import ExposureAccumulator
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+PREVIEW_SAMPLE_SIZE = 40
+PREVIEW_CERTAIN_MARKETS = 10
+PREVIEW_BOOTSTRAP_ROUNDS = 200
+PREVIEW_CONFIDENCE = 0.9
+CERTAIN_STRATUM = "largest"
+
+
+def supply_stratum(market: MarketRef) -> str:
+    supply = float(market.supply_assets_usd or 0)
+    decade = int(math.log10(supply)) if supply >= 1 else 0
+    return f"{market.chain_id}:1e{decade}"
+
+
+def sample_key(index: int) -> str:
+    return f"sample:{index}"
+
+
+# One unit per stratum by supply rank, then the rest by highest supply per allocated
+# unit (D'Hondt), so allocation is roughly proportional to stratum supply.
+def allocate_sample(strata: dict[str, list[tuple[MarketRef, list[str]]]], budget: int) -> dict[str, int]:
+    supply = {key: sum(float(market.supply_assets_usd or 0) for market, _ in members) for key, members in strata.items()}
+    allocation = {key: 0 for key in strata}
+    for key in sorted(strata, key=lambda key: (-supply[key], key))[:budget]:
+        allocation[key] = 1
+    remaining = budget - sum(allocation.values())
+    while remaining > 0:
+        open_keys = [key for key in strata if allocation[key] < len(strata[key])]
+        if not open_keys:
+            break
+        key = max(open_keys, key=lambda key: (supply[key] / (allocation[key] + 1), key))
+        allocation[key] += 1
+        remaining -= 1
+    return allocation
+
+
+@dataclass(slots=True)
+class PreviewSample:
+    markets: list[tuple[MarketRef, list[str]]]
+    strata: list[str]
+    stratum_sizes: dict[str, int]
+    population: int
+
+    # Horvitz-Thompson weights over fetched members. A failed market in a sampled
+    # stratum is replaced by its stratum peers; the largest markets only count once.
+    def weights(self, fetched: Sequence[bool]) -> list[Fraction]:
+        fetched_counts: dict[str, int] = defaultdict(int)
+        for stratum, ok in zip(self.strata, fetched):
+            if ok:
+                fetched_counts[stratum] += 1
+        weights: list[Fraction] = []
+        for stratum, ok in zip(self.strata, fetched):
+            if not ok:
+                weights.append(Fraction(0))
+            elif stratum == CERTAIN_STRATUM:
+                weights.append(Fraction(1))
+            else:
+                weights.append(Fraction(self.stratum_sizes[stratum], fetched_counts[stratum]))
+        return weights
+
+
+# `candidates` must be in descending supply order (as from select_top_history_markets).
+def draw_preview_sample(
+    candidates: list[tuple[MarketRef, list[str]]],
+    sample_size: int = PREVIEW_SAMPLE_SIZE,
+    certain: int = PREVIEW_CERTAIN_MARKETS,
+    seed: int = 0,
+) -> PreviewSample:
+    take_all = candidates[: min(certain, sample_size)]
+    strata: dict[str, list[tuple[MarketRef, list[str]]]] = defaultdict(list)
+    for item in candidates[len(take_all):]:
+        strata[supply_stratum(item[0])].append(item)
+    allocation = allocate_sample(strata, sample_size - len(take_all))
+
+    rng = random.Random(seed)
+    markets = list(take_all)
+    labels = [CERTAIN_STRATUM] * len(take_all)
+    stratum_sizes = {CERTAIN_STRATUM: len(take_all)}
+    for key in sorted(strata):
+        if not allocation[key]:
+            continue
+        markets.extend(rng.sample(strata[key], allocation[key]))
+        labels.extend([key] * allocation[key])
+        stratum_sizes[key] = len(strata[key])
+    return PreviewSample(markets=markets, strata=labels, stratum_sizes=stratum_sizes, population=len(candidates))
+
+
+# `market_totals` holds one key per fetched sample market (sample_key(index)).
+def estimate_vendor_totals(sample: PreviewSample, fetched: Sequence[bool], market_totals: ExposureAccumulator) -> ExposureAccumulator:
+    weights = sample.weights(fetched)
+    weights_by_key = {}
+    for index, ((_, vendors), weight) in enumerate(zip(sample.markets, weights)):
+        if fetched[index]:
+            vendor_list = sorted(set(vendors))
+            weights_by_key[sample_key(index)] = [(vendor, weight / len(vendor_list)) for vendor in vendor_list]
+    return market_totals.weigh_keys(weights_by_key)
+
+
+# Yields (offset, vendor, lower, upper) percentile bands for one metric from a
+# stratified bootstrap: each round resamples every stratum's fetched markets with
+# replacement; the largest markets are kept as-is.
+def bootstrap_bands(
+    sample: PreviewSample,
+    fetched: Sequence[bool],
+    market_totals: ExposureAccumulator,
+    metric: str,
+    rounds: int = PREVIEW_BOOTSTRAP_ROUNDS,
+    confidence: float = PREVIEW_CONFIDENCE,
+    seed: int = 0,
+) -> Iterator[tuple[int, str, float, float]]:
+    if rounds < 1:
+        return
+    weights = sample.weights(fetched)
+    metric_id = market_totals.metric_id(metric)
+    key_ids = {key: key_id for key_id, key in enumerate(market_totals.vendors)}
+    members: dict[str, list[int]] = defaultdict(list)
+    series: dict[int, list[tuple[int, float]]] = {}
+    for index, stratum in enumerate(sample.strata):
+        key_id = key_ids.get(sample_key(index))
+        if not fetched[index] or key_id is None:
+            continue
+        members[stratum].append(index)
+        values, touched = market_totals.series(key_id, metric_id)
+        series[index] = [(offset, values[offset]) for offset, flag in enumerate(touched) if flag]
+    vendors_by_index = {index: sorted(set(sample.markets[index][1])) for index in series}
+    vendors = sorted({vendor for names in vendors_by_index.values() for vendor in names})
+
+    rng = random.Random(seed)
+    replicates: dict[str, list[list[float]]] = {vendor: [] for vendor in vendors}
+    for _ in range(rounds):
+        counts: dict[int, int] = defaultdict(int)
+        for stratum, indices in members.items():
+            if stratum == CERTAIN_STRATUM:
+                for index in indices:
+                    counts[index] += 1
+            else:
+                for _ in indices:
+                    counts[rng.choice(indices)] += 1
+        estimate = {vendor: [0.0] * market_totals.buckets for vendor in vendors}
+        for index, count in counts.items():
+            names = vendors_by_index[index]
+            scale = count * float(weights[index]) / len(names)
+            for vendor in names:
+                target = estimate[vendor]
+                for offset, value in series[index]:
+                    target[offset] += scale * value
+        for vendor in vendors:
+            replicates[vendor].append(estimate[vendor])
+
+    touched = {(offset, vendor) for index, points in series.items() for offset, _ in points for vendor in vendors_by_index[index]}
+    tail = (1 - confidence) / 2
+    lower_rank = math.floor(tail * (rounds - 1))
+    upper_rank = math.ceil((1 - tail) * (rounds - 1))
+    for offset in range(market_totals.buckets):
+        for vendor in vendors:
+            if (offset, vendor) not in touched:
+                continue
+            ranked = sorted(replicate[offset] for replicate in replicates[vendor])
+            yield offset, vendor, ranked[lower_rank], ranked[upper_rank]
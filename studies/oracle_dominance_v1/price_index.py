@@ -0,0 +1,228 @@
+"""Per loan-asset price index for repricing historical exposure.
+
+Market histories are accumulated as USD and loan-asset units per (group, loan
+asset) rather than repriced point by point. Prices are derived once per asset:
+`current` uses today's price inferred from the market universe, `historical`
+uses the per-bucket mean of supply USD / units across every fetched market that
+lends the asset. Repricing is then one pass per (group, asset) series.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, Sequence
+
+from studies.oracle_dominance_v1.exposure_accumulator import HISTORY_METRICS, ExposureAccumulator
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL, resample_rows, validate_gap_fill
+
+
+REPRICING_MODES = ("current", "historical")
+HISTORY_ROW_FIELDS = ("timestamp", "supply_usd", "borrow_usd", "supply_units", "borrow_units")
+ASSET_METRICS = ("supply_usd", "borrow_usd", "supply_units", "borrow_units", "unpriced_supply_usd", "unpriced_borrow_usd")
+# (usd, units, usd of points without units) asset metrics -> (usd, repriced) group metrics.
+REPRICED_SIDES = (
+    (("supply_usd", "supply_units", "unpriced_supply_usd"), ("supply_usd", "repriced_supply_usd")),
+    (("borrow_usd", "borrow_units", "unpriced_borrow_usd"), ("borrow_usd", "repriced_borrow_usd")),
+)
+PRICE_METRICS = ("price_sum", "price_samples")
+
+# (timestamp, supply_usd, borrow_usd, supply_units, borrow_units); units are None when the API has no raw amount.
+HistoryRow = tuple[int, float, float, float | None, float | None]
+AssetKey = tuple[int, str]
+
+
+# Convert raw API points once per market; the decimals scale is computed once, not per point.
+def unit_history_rows(history: Iterable[dict], decimals: int) -> Iterator[HistoryRow]:
+    scale = 10 ** decimals
+    for point in history:
+        raw_supply = point.get("supplyAssets")
+        raw_borrow = point.get("borrowAssets")
+        yield (
+            int(point["timestamp"]),
+            float(point.get("supplyAssetsUsd") or 0),
+            float(point.get("borrowAssetsUsd") or 0),
+            None if raw_supply is None else int(raw_supply) / scale,
+            None if raw_borrow is None else int(raw_borrow) / scale,
+        )
+
+
+def validate_repricing_mode(mode: str) -> str:
+    if mode not in REPRICING_MODES:
+        raise ValueError(f"Unsupported repricing mode: {mode}")
+    return mode
+
+
+class LoanAssetPriceIndex:
+    """Mean supply USD / units per (chain, loan asset) and bucket, shared by all markets lending the asset."""
+
+    def __init__(self, days: int, interval: str = "DAY", end: datetime | None = None) -> None:
+        self.samples = ExposureAccumulator.for_window(days, interval, PRICE_METRICS, end=end)
+        self._asset_ids: dict[AssetKey, int] = {}
+        self._history_cache: dict[AssetKey, dict[int, float]] = {}
+
+    def observe(self, asset: AssetKey, timestamp: int, usd: float, units: float | None) -> None:
+        if units is None or units <= 0 or usd <= 0:
+            return
+        asset_id = self._asset_ids.get(asset)
+        if asset_id is None:
+            asset_id = self._asset_ids[asset] = self.samples.vendor_id(f"{asset[0]}:{asset[1]}")
+        offset = self.samples.offset(timestamp)
+        self.samples.add(offset, asset_id, 0, usd / units)
+        self.samples.add(offset, asset_id, 1, 1.0)
+        self._history_cache.pop(asset, None)
+
+    # (asset, [(bucket timestamp, price sum, sample count), ...]) for merging indexes built elsewhere.
+    def iter_samples(self) -> Iterator[tuple[AssetKey, list[tuple[int, float, float]]]]:
+        samples = self.samples
+        for asset, asset_id in self._asset_ids.items():
+            totals, touched = samples.series(asset_id, 0)
+            counts, _ = samples.series(asset_id, 1)
+            yield asset, [
+                (samples.bucket_timestamp(offset), totals[offset], counts[offset]) for offset, flag in enumerate(touched) if flag
+            ]
+
+    def add_samples(self, asset: AssetKey, points: Iterable[tuple[int, float, float]]) -> None:
+        asset_id = self._asset_ids.get(asset)
+        if asset_id is None:
+            asset_id = self._asset_ids[asset] = self.samples.vendor_id(f"{asset[0]}:{asset[1]}")
+        for timestamp, total, count in points:
+            offset = self.samples.offset(timestamp)
+            self.samples.add(offset, asset_id, 0, total)
+            self.samples.add(offset, asset_id, 1, count)
+        self._history_cache.pop(asset, None)
+
+    # Bucket timestamp -> mean observed price, computed once per asset until new samples arrive.
+    def historical_prices(self, asset: AssetKey) -> dict[int, float]:
+        cached = self._history_cache.get(asset)
+        if cached is not None:
+            return cached
+        prices: dict[int, float] = {}
+        asset_id = self._asset_ids.get(asset)
+        if asset_id is not None:
+            totals, touched = self.samples.series(asset_id, 0)
+            counts, _ = self.samples.series(asset_id, 1)
+            for offset, flag in enumerate(touched):
+                if flag:
+                    prices[self.samples.bucket_timestamp(offset)] = totals[offset] / counts[offset]
+        self._history_cache[asset] = prices
+        return prices
+
+    # Price per timestamp for one asset. Historical mode forward-fills buckets without
+    # samples and falls back to the current price before the first sample.
+    def series(self, asset: AssetKey, timestamps: Sequence[int], current_price: float | None, mode: str = "current") -> list[float | None]:
+        if validate_repricing_mode(mode) == "current":
+            return [current_price] * len(timestamps)
+        observed = self.historical_prices(asset)
+        prices: list[float | None] = []
+        carried = None
+        for timestamp in timestamps:
+            carried = observed.get(timestamp, carried)
+            prices.append(carried if carried is not None else current_price)
+        return prices
+
+
+class AssetExposureAccumulator:
+    """USD and unit history per (group, loan asset), repriced through a shared LoanAssetPriceIndex.
+
+    Each market's rows are resampled onto the bucket grid (gap_fill) before they are
+    added, so a market missing a bucket does not dip the totals.
+    """
+
+    def __init__(self, days: int, interval: str = "DAY", end: datetime | None = None, gap_fill: str = DEFAULT_GAP_FILL) -> None:
+        end = end or datetime.now(timezone.utc)
+        self.cells = ExposureAccumulator.for_window(days, interval, ASSET_METRICS, end=end)
+        self.index = LoanAssetPriceIndex(days, interval, end=end)
+        self.end = end
+        self.end_ts = int(end.timestamp())
+        self.gap_fill = validate_gap_fill(gap_fill)
+        self._keys: dict[str, tuple[str, AssetKey]] = {}
+
+    def add_history(self, group: str, asset: AssetKey, rows: Iterable[HistoryRow]) -> None:
+        label = f"{group}@{asset[0]}:{asset[1]}"
+        self._keys.setdefault(label, (group, asset))
+        cells = self.cells
+        key_id = cells.vendor_id(label)
+        observe = self.index.observe
+        (
+            supply_id,
+            borrow_id,
+            supply_units_id,
+            borrow_units_id,
+            unpriced_supply_id,
+            unpriced_borrow_id,
+        ) = (cells.metric_id(metric) for metric in ASSET_METRICS)
+        end_offset = (self.end_ts - cells.start_ts) // cells.bucket_seconds
+        resampled = resample_rows(rows, cells.start_ts, cells.bucket_seconds, end_offset, self.gap_fill)
+        for (timestamp, supply_usd, borrow_usd, supply_units, borrow_units), observed in resampled:
+            offset = cells.offset(timestamp)
+            cells.add(offset, key_id, supply_id, supply_usd)
+            cells.add(offset, key_id, borrow_id, borrow_usd)
+            if supply_units is None:
+                cells.add(offset, key_id, unpriced_supply_id, supply_usd)
+            cells.add(offset, key_id, supply_units_id, supply_units or 0.0)
+            if borrow_units is None:
+                cells.add(offset, key_id, unpriced_borrow_id, borrow_usd)
+            cells.add(offset, key_id, borrow_units_id, borrow_units or 0.0)
+            if observed:
+                observe(asset, timestamp, supply_usd, supply_units)
+
+    # (group, asset, metric, [(bucket timestamp, value), ...]) per touched series, in insertion order.
+    def iter_series(self) -> Iterator[tuple[str, AssetKey, str, list[tuple[int, float]]]]:
+        cells = self.cells
+        for key_id, label in enumerate(cells.vendors):
+            group, asset = self._keys[label]
+            for metric_id, metric in enumerate(cells.metrics):
+                values, touched = cells.series(key_id, metric_id)
+                points = [(cells.bucket_timestamp(offset), values[offset]) for offset, flag in enumerate(touched) if flag]
+                if points:
+                    yield group, asset, metric, points
+
+    # Merge a series exported by iter_series; price samples are merged through `index.add_samples`.
+    def add_series(self, group: str, asset: AssetKey, metric: str, points: Iterable[tuple[int, float]]) -> None:
+        label = f"{group}@{asset[0]}:{asset[1]}"
+        self._keys.setdefault(label, (group, asset))
+        cells = self.cells
+        key_id = cells.vendor_id(label)
+        metric_id = cells.metric_id(metric)
+        for timestamp, value in points:
+            cells.add(cells.offset(timestamp), key_id, metric_id, value)
+
+    # Fold (group, asset) series into per-group HISTORY_METRICS totals, or per `key(group,
+    # asset)` label (e.g. group and chain). Without a price, and for points without raw
+    # units, repriced values are either dropped (the v1 pipeline) or fall back to the
+    # point's USD value (fallback_to_usd, the report).
+    def group_totals(
+        self,
+        current_prices: dict[AssetKey, float],
+        mode: str = "current",
+        fallback_to_usd: bool = False,
+        key: Callable[[str, AssetKey], str] | None = None,
+    ) -> ExposureAccumulator:
+        cells = self.cells
+        totals = ExposureAccumulator(cells.start_ts, cells.bucket_seconds, cells.buckets, HISTORY_METRICS)
+        timestamps = [cells.bucket_timestamp(offset) for offset in range(cells.buckets)]
+        price_series: dict[AssetKey, list[float | None]] = {}
+        for key_id, label in enumerate(cells.vendors):
+            group, asset = self._keys[label]
+            prices = price_series.get(asset)
+            if prices is None:
+                prices = price_series[asset] = self.index.series(asset, timestamps, current_prices.get(asset), mode)
+            group_id = totals.vendor_id(group if key is None else key(group, asset))
+            for (usd_metric, units_metric, unpriced_metric), (total_metric, repriced_metric) in REPRICED_SIDES:
+                usd, touched = cells.series(key_id, cells.metric_id(usd_metric))
+                units, _ = cells.series(key_id, cells.metric_id(units_metric))
+                unpriced, _ = cells.series(key_id, cells.metric_id(unpriced_metric))
+                usd_id = totals.metric_id(total_metric)
+                repriced_id = totals.metric_id(repriced_metric)
+                for offset, price in enumerate(prices):
+                    if not touched[offset]:
+                        continue
+                    totals.add(offset, group_id, usd_id, usd[offset])
+                    if price is not None:
+                        repriced = units[offset] * price
+                        if fallback_to_usd:
+                            repriced += unpriced[offset]
+                        totals.add(offset, group_id, repriced_id, repriced)
+                    elif fallback_to_usd:
+                        totals.add(offset, group_id, repriced_id, usd[offset])
+        return totals
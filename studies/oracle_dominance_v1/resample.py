@@ -0,0 +1,104 @@
+"""Alignment and gap filling of per-market history on the accumulator's bucket grid.
+
+Each market's points are placed on the shared grid (`start_ts + k * bucket_seconds`)
+before aggregation, keeping the latest point per bucket since exposure is a stock.
+Buckets the market skipped are then filled from its neighbours, either carried
+forward (`ffill`) or interpolated (`linear`), when the gap is at most `max_gap`
+buckets. Longer gaps stay empty, since the market was not reporting. A history that
+stops short of the window end is carried forward by at most `max_trailing` buckets:
+the grid follows the history interval, so the default is one source interval. Every
+market then contributes one row per bucket it covers, so summed vendor series carry
+no dips from ragged timestamps or missing days.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from studies.oracle_dominance_v1.config import GAP_FILL_MAX_SECONDS
+
+# (timestamp, *values), e.g. price_index.Row; None values are carried, not interpolated.
+Row = tuple
+
+
+GAP_FILL_MODES = ("none", "ffill", "linear")
+DEFAULT_GAP_FILL = "ffill"
+
+
+def validate_gap_fill(mode: str) -> str:
+    if mode not in GAP_FILL_MODES:
+        raise ValueError(f"Unsupported gap fill mode: {mode}")
+    return mode
+
+
+def max_gap_buckets(bucket_seconds: int, max_gap_seconds: int = GAP_FILL_MAX_SECONDS) -> int:
+    return max_gap_seconds // bucket_seconds
+
+
+def _interpolate(before: Row, after: Row, fraction: float, timestamp: int) -> Row:
+    values = [timestamp]
+    for start, end in zip(before[1:], after[1:]):
+        # Units are None where the API had no raw amount; carry the earlier side then.
+        values.append(start if start is None or end is None else start + (end - start) * fraction)
+    return tuple(values)
+
+
+# Yields (row, observed) in bucket order with bucket-start timestamps; filled rows have
+# observed=False so price samples can skip them. `end_offset` is the bucket holding the
+# window end: trailing fill never passes it.
+def resample_rows(
+    rows: Iterable[Row],
+    start_ts: int,
+    bucket_seconds: int,
+    end_offset: int | None = None,
+    mode: str = DEFAULT_GAP_FILL,
+    max_gap: int | None = None,
+    max_trailing: int = 1,
+) -> Iterator[tuple[Row, bool]]:
+    latest: dict[int, Row] = {}
+    for row in rows:
+        offset = (row[0] - start_ts) // bucket_seconds
+        previous = latest.get(offset)
+        if previous is None or row[0] >= previous[0]:
+            latest[offset] = row
+    if not latest:
+        return
+    max_gap = max_gap_buckets(bucket_seconds) if max_gap is None else max_gap
+    first = min(latest)
+    last = max(latest)
+    fill_to = last if mode == "none" or end_offset is None else max(last, min(end_offset, last + max_trailing))
+    # Dense slots from the first observed bucket; None marks a gap.
+    slots: list[Row | None] = [None] * (fill_to - first + 1)
+    for offset, row in latest.items():
+        slots[offset - first] = row
+
+    gap_start = gap_end = 0
+    for index, row in enumerate(slots):
+        timestamp = start_ts + (first + index) * bucket_seconds
+        if row is not None:
+            gap_start = index
+            yield (timestamp, *row[1:]), True
+            continue
+        if mode == "none":
+            continue
+        if gap_end <= index:
+            gap_end = index + 1
+            while gap_end < len(slots) and slots[gap_end] is None:
+                gap_end += 1
+        # Trailing slots never exceed max_trailing; interior gaps longer than max_gap stay empty.
+        if gap_end < len(slots) and gap_end - gap_start - 1 > max_gap:
+            continue
+        before = slots[gap_start]
+        if mode == "linear" and gap_end < len(slots):
+            yield _interpolate(before, slots[gap_end], (index - gap_start) / (gap_end - gap_start), timestamp), False
+        else:
+            yield (timestamp, *before[1:]), False
+
+
+__all__ = [
+    "DEFAULT_GAP_FILL",
+    "GAP_FILL_MODES",
+    "max_gap_buckets",
+    "resample_rows",
+    "validate_gap_fill",
+]
@@ -4,7 +4,12 @@ import argparse
 import json
 from pathlib import Path
 
-from studies.oracle_dominance_v1.pipeline import run_v1
+from studies.market_data.store import MarketDataStore, set_default_store
+from studies.oracle_dominance_v1.config import STREAMING_HISTORY_CONCURRENCY
+from studies.oracle_dominance_v1.pipeline import ALLOCATION_SCHEMES, DEFAULT_GAP_FILL, GAP_FILL_MODES, REPRICING_MODES, STATE_SOURCES, refresh_current_outputs, run_v1
+from studies.oracle_dominance_v1.planner import plan_v1
+from studies.oracle_dominance_v1.sharding import SHARD_MODES, ShardSpec, merge_v1_shards, run_v1_shard
+from studies.oracle_dominance_v1.streaming_pipeline import run_v1_streaming
 
 
 def main() -> None:
@@ -15,6 +20,38 @@ def main() -> None:
         help="Directory for CSV outputs",
     )
     parser.add_argument("--days", type=int, default=180, help="Historical lookback window in days")
+    parser.add_argument(
+        "--windows",
+        type=int,
+        nargs="*",
+        default=[],
+        help="Extra report windows in days, served from one fetch of the longest window",
+    )
+    parser.add_argument(
+        "--interval",
+        choices=["HOUR", "DAY", "WEEK"],
+        default="DAY",
+        help="Historical point interval; long windows are fetched in concurrent time chunks",
+    )
+    parser.add_argument(
+        "--allocation-schemes",
+        nargs="*",
+        choices=sorted(ALLOCATION_SCHEMES),
+        default=[],
+        help="Extra vendor attribution schemes computed from the same history fetch (default output uses 'even')",
+    )
+    parser.add_argument(
+        "--repricing",
+        choices=REPRICING_MODES,
+        default="current",
+        help="Loan-asset price for repriced series: today's price, or the per-day price observed across markets",
+    )
+    parser.add_argument(
+        "--gap-fill",
+        choices=GAP_FILL_MODES,
+        default=DEFAULT_GAP_FILL,
+        help="Fill buckets a market's history skipped (up to 7 days) by carrying the last value forward or interpolating, before aggregation",
+    )
     parser.add_argument(
         "--min-borrow-usd",
         type=float,
@@ -31,14 +68,113 @@ def main() -> None:
         action="store_true",
         help="Exclude markets whose loan/collateral token symbols are unknown",
     )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Overlap chain paging, oracle metadata and history fetches (same outputs as the staged run)",
+    )
+    parser.add_argument(
+        "--history-concurrency",
+        type=int,
+        default=STREAMING_HISTORY_CONCURRENCY,
+        help="Concurrent market history fetches in --streaming mode",
+    )
+    parser.add_argument(
+        "--shard",
+        help="Run one INDEX/COUNT slice of the universe and write its partial aggregate instead of the outputs",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=SHARD_MODES,
+        default="chain",
+        help="Split shards by whole chains (bit-identical merge) or by a stable hash of the market key",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        nargs="+",
+        metavar="PARTIAL",
+        help="Combine every shard's partial aggregate into the normal outputs (run settings come from the partials)",
+    )
+    parser.add_argument(
+        "--current-only",
+        action="store_true",
+        help="Only refresh current outputs, rebuilding rows for markets changed since the last refresh's snapshot",
+    )
+    parser.add_argument(
+        "--state-source",
+        choices=STATE_SOURCES,
+        default="api",
+        help="With --current-only, re-read market totals on chain via Multicall3 for chains with RPC_URL_<chain_id> set",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Shared market data cache directory reused across studies and runs (default $MARKET_DATA_CACHE_DIR, memory only if unset)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Resolve filters and print expected requests, payload bytes, cache hits and wall time without fetching history",
+    )
     args = parser.parse_args()
+    # Shards always run the staged pipeline; --streaming would be silently ignored.
+    if args.shard and args.streaming:
+        parser.error("--shard cannot be combined with --streaming")
+    if args.shard:
+        try:
+            shard = ShardSpec.parse(args.shard, args.shard_by)
+        except ValueError as exc:
+            parser.error(str(exc))
+    if args.cache_dir:
+        set_default_store(MarketDataStore(args.cache_dir))
+    if args.plan:
+        plan = plan_v1(
+            days=args.days,
+            min_borrow_usd=args.min_borrow_usd,
+            require_listed=args.require_listed,
+            recognized_tokens_only=args.recognized_tokens_only,
+            windows=args.windows,
+            interval=args.interval,
+            allocation_schemes=args.allocation_schemes,
+            streaming=args.streaming,
+            concurrency=args.history_concurrency,
+        )
+        print(json.dumps(plan, indent=2, sort_keys=True))
+        return
+    if args.current_only:
+        result = refresh_current_outputs(
+            Path(args.output_dir),
+            min_borrow_usd=args.min_borrow_usd,
+            require_listed=args.require_listed,
+            recognized_tokens_only=args.recognized_tokens_only,
+            state_source=args.state_source,
+        )
+        print(json.dumps(result, indent=2, sort_keys=True))
+        return
+    if args.merge_shards:
+        print(json.dumps(merge_v1_shards(Path(args.output_dir), args.merge_shards), indent=2, sort_keys=True))
+        return
 
-    result = run_v1(
+    run_kwargs = {}
+    runner = run_v1
+    if args.shard:
+        runner = run_v1_shard
+        run_kwargs["shard"] = shard
+        args.output_dir = Path(args.output_dir) / "shards" / f"partial_{shard.by}_{shard.name}.json"
+    elif args.streaming:
+        runner = run_v1_streaming
+        run_kwargs["concurrency"] = args.history_concurrency
+    result = runner(
         Path(args.output_dir),
         days=args.days,
         min_borrow_usd=args.min_borrow_usd,
         require_listed=args.require_listed,
         recognized_tokens_only=args.recognized_tokens_only,
+        windows=args.windows,
+        interval=args.interval,
+        allocation_schemes=args.allocation_schemes,
+        repricing=args.repricing,
+        gap_fill=args.gap_fill,
+        **run_kwargs,
     )
     print(json.dumps(result, indent=2, sort_keys=True))
 
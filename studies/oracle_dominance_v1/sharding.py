@@ -0,0 +1,285 @@
+"""Sharded map-reduce execution of the v1 pipeline.
+
+A shard run fetches and aggregates only its slice of the market universe (whole
+chains, or a stable hash of `unique_key`) and writes a mergeable partial aggregate:
+its current-table markets with their canonical position, its chains' oracle
+metadata, per (weight-row group, loan asset) unit/USD series keyed by bucket
+timestamp, and per-asset price sums with sample counts. The reduce step replays the
+partials in single-process market order and writes the normal `run_v1` outputs.
+
+With `--shard-by chain` every (group, asset) series and price sample lives in one
+shard, so merged outputs are bit-identical to a single-process run. Hash shards
+split a series across partials and merge their sums in shard order, so totals can
+differ from a single-process run in the last float digit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from datetime import date
+from fractions import Fraction
+from pathlib import Path
+from typing import Iterable
+
+from studies.market_data.sources import iter_market_history
+from studies.oracle_dominance_v1.allocation import DEFAULT_ALLOCATION_SCHEME, resolve_allocation_schemes, weight_rows
+from studies.oracle_dominance_v1.analysis import (
+    GroupKey,
+    HistoricalExposureBuilder,
+    flatten_vendor_legs,
+    infer_current_loan_asset_prices,
+    iter_current_exposure_rows,
+    leg_assumption_labels,
+)
+from studies.oracle_dominance_v1.config import SUPPORTED_CHAINS
+from studies.oracle_dominance_v1.market_table import MarketTable
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.pipeline import fetch_live_market_table, fetch_oracle_metadata, write_v1_outputs
+from studies.oracle_dominance_v1.price_index import validate_repricing_mode
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL, validate_gap_fill
+
+
+SHARD_MODES = ("chain", "hash")
+PARTIAL_FORMAT = "oracle_dominance_v1.partial"
+PARTIAL_VERSION = 1
+
+# (chain order in SUPPORTED_CHAINS, index among that chain's filtered markets): the
+# order in which a single-process run sees markets, independent of sharding.
+Position = tuple[int, int]
+
+
+@dataclass(frozen=True, slots=True)
+class ShardSpec:
+    index: int
+    count: int
+    by: str = "chain"
+
+    @classmethod
+    def parse(cls, value: str, by: str = "chain") -> ShardSpec:
+        index, _, count = value.partition("/")
+        try:
+            spec = cls(int(index), int(count), by)
+        except ValueError:
+            raise ValueError(f"Shard must look like INDEX/COUNT, got {value!r}") from None
+        if spec.count < 1 or not 0 <= spec.index < spec.count:
+            raise ValueError(f"Shard index must be in [0, {spec.count}), got {value!r}")
+        if by not in SHARD_MODES:
+            raise ValueError(f"Unsupported shard mode: {by}")
+        return spec
+
+    @property
+    def name(self) -> str:
+        return f"{self.index}of{self.count}"
+
+    # Chain shards only page their own chains; hash shards page every chain and keep their keys.
+    def chains(self) -> list[int]:
+        if self.by == "hash":
+            return list(SUPPORTED_CHAINS)
+        return [chain_id for order, chain_id in enumerate(SUPPORTED_CHAINS) if order % self.count == self.index]
+
+    # blake2b rather than hash(): str hashes are salted per process.
+    def owns(self, market: MarketRef) -> bool:
+        if self.by == "chain":
+            return SUPPORTED_CHAINS.index(market.chain_id) % self.count == self.index
+        digest = hashlib.blake2b(market.unique_key.lower().encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.count == self.index
+
+
+def market_positions(markets: MarketTable) -> list[Position]:
+    seen: dict[int, int] = {}
+    positions: list[Position] = []
+    for chain_id in markets.chain_id:
+        positions.append((SUPPORTED_CHAINS.index(chain_id), seen.get(chain_id, 0)))
+        seen[chain_id] = seen.get(chain_id, 0) + 1
+    return positions
+
+
+def _encode_group(key: GroupKey) -> list:
+    rows, assumptions = key
+    return [[[[vendor, str(weight)] for vendor, weight in row] for row in rows], list(assumptions)]
+
+
+def _decode_group(encoded: list) -> GroupKey:
+    rows, assumptions = encoded
+    return tuple(tuple((vendor, Fraction(weight)) for vendor, weight in row) for row in rows), tuple(assumptions)
+
+
+def run_config(
+    days: int,
+    windows: list[int],
+    schemes: list[str],
+    filters: dict[str, object],
+) -> dict[str, object]:
+    return {"days": days, "windows": windows, "schemes": schemes, "filters": filters}
+
+
+# Map step: aggregate one shard's markets and write its partial aggregate as JSON.
+def run_v1_shard(
+    output_path: str | Path,
+    shard: ShardSpec,
+    days: int = 180,
+    min_borrow_usd: float = 500_000,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+    windows: Iterable[int] = (),
+    interval: str = "DAY",
+    allocation_schemes: Iterable[str] = (),
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
+) -> dict[str, object]:
+    report_windows = sorted({days, *windows})
+    schemes = resolve_allocation_schemes([DEFAULT_ALLOCATION_SCHEME, *allocation_schemes])
+    filters = {
+        "min_borrow_usd": min_borrow_usd,
+        "require_listed": require_listed,
+        "recognized_tokens_only": recognized_tokens_only,
+        "interval": interval,
+        "repricing": validate_repricing_mode(repricing),
+        "gap_fill": validate_gap_fill(gap_fill),
+    }
+    universe = fetch_live_market_table(
+        min_borrow_usd=min_borrow_usd,
+        require_listed=require_listed,
+        recognized_tokens_only=recognized_tokens_only,
+        chains=shard.chains(),
+    )
+    positions = market_positions(universe)
+    owned = [index for index in range(len(universe)) if shard.owns(universe.market(index))]
+    markets = universe.take(owned)
+    positions = [positions[index] for index in owned]
+    metadata = fetch_oracle_metadata(markets)
+
+    builder = HistoricalExposureBuilder(report_windows[-1], interval, schemes, repricing, gap_fill)
+    group_positions: dict[GroupKey, Position] = {}
+    series_positions: dict[tuple[str, tuple[int, str]], Position] = {}
+    for market, position in zip(markets, positions):
+        legs = flatten_vendor_legs(metadata.get((market.chain_id, market.oracle_address)) or {})
+        rows = weight_rows(legs, builder.schemes)
+        if not any(rows):
+            continue
+        key = (rows, leg_assumption_labels(legs))
+        group_positions.setdefault(key, position)
+        label = builder.group_labels.setdefault(key, f"group:{len(builder.group_labels)}")
+        series_positions.setdefault((label, (market.chain_id, market.loan_asset_address)), position)
+        history = iter_market_history(market.unique_key, market.chain_id, days=report_windows[-1], interval=interval)
+        builder.add_history(market, rows, history, key[1])
+
+    group_ids = {label: group_id for group_id, label in enumerate(builder.group_labels.values())}
+    series: dict[tuple[str, tuple[int, str]], dict[str, list]] = {}
+    for group, asset, metric, points in builder.exposure.iter_series():
+        series.setdefault((group, asset), {})[metric] = points
+    partial = {
+        "format": PARTIAL_FORMAT,
+        "version": PARTIAL_VERSION,
+        "shard": {"index": shard.index, "count": shard.count, "by": shard.by},
+        "config": run_config(days, report_windows, schemes, filters),
+        "window_end": builder.end.date().isoformat(),
+        "markets": [[list(position), asdict(market)] for market, position in zip(markets, positions)],
+        "metadata": [[chain_id, oracle, entry] for (chain_id, oracle), entry in metadata.items()],
+        "groups": [[list(group_positions[key]), _encode_group(key)] for key in builder.group_labels],
+        "series": [
+            [list(series_positions[key]), group_ids[key[0]], list(key[1]), metrics] for key, metrics in series.items()
+        ],
+        "price_samples": [[list(asset), points] for asset, points in builder.exposure.index.iter_samples()],
+    }
+    target = Path(output_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(partial, separators=(",", ":")), encoding="utf-8")
+    return {
+        "shard": shard.name,
+        "shard_by": shard.by,
+        "market_count": len(markets),
+        "group_count": len(builder.group_labels),
+        "partial_output": str(target),
+    }
+
+
+def load_partials(paths: Iterable[str | Path]) -> list[dict]:
+    partials = []
+    for path in paths:
+        partial = json.loads(Path(path).read_text(encoding="utf-8"))
+        if partial.get("format") != PARTIAL_FORMAT or partial.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"{path} is not a v{PARTIAL_VERSION} oracle dominance partial aggregate")
+        partials.append(partial)
+    if not partials:
+        raise ValueError("No partial aggregates to merge")
+    first = partials[0]
+    count, by = first["shard"]["count"], first["shard"]["by"]
+    for partial in partials[1:]:
+        if partial["config"] != first["config"] or partial["shard"]["count"] != count or partial["shard"]["by"] != by:
+            raise ValueError("Partial aggregates come from runs with different configs or shard layouts")
+    indices = sorted(partial["shard"]["index"] for partial in partials)
+    if indices != list(range(count)):
+        raise ValueError(f"Expected shards 0..{count - 1} of {count} ({by}) exactly once, got {indices}")
+    return sorted(partials, key=lambda partial: partial["shard"]["index"])
+
+
+# Reduce step: combine partial aggregates into the normal run_v1 outputs.
+def merge_v1_shards(output_dir: str | Path, partial_paths: Iterable[str | Path]) -> dict[str, object]:
+    partials = load_partials(partial_paths)
+    config = partials[0]["config"]
+    filters = config["filters"]
+
+    placed = sorted(
+        (tuple(position), MarketRef(**fields)) for partial in partials for position, fields in partial["markets"]
+    )
+    markets = MarketTable.from_markets(market for _, market in placed)
+    metadata = {
+        (chain_id, oracle): entry for partial in partials for chain_id, oracle, entry in partial["metadata"]
+    }
+
+    # Groups and (group, asset) series are created in order of the first market that
+    # touched them, which is the order a single-process run creates them in.
+    builder = HistoricalExposureBuilder(config["windows"][-1], filters["interval"], config["schemes"], filters["repricing"])
+    group_positions: dict[GroupKey, Position] = {}
+    for partial in partials:
+        for position, encoded in partial["groups"]:
+            key = _decode_group(encoded)
+            group_positions[key] = min(group_positions.get(key, tuple(position)), tuple(position))
+    for key in sorted(group_positions, key=group_positions.__getitem__):
+        builder.group_labels[key] = f"group:{len(builder.group_labels)}"
+
+    series: dict[tuple[str, tuple[int, str]], list] = {}
+    for partial in partials:
+        labels = [builder.group_labels[_decode_group(encoded)] for _, encoded in partial["groups"]]
+        for position, group_id, asset, metrics in partial["series"]:
+            key = (labels[group_id], (asset[0], asset[1]))
+            entry = series.setdefault(key, [tuple(position), []])
+            entry[0] = min(entry[0], tuple(position))
+            entry[1].append(metrics)
+    for (label, asset), (_, parts) in sorted(series.items(), key=lambda item: item[1][0]):
+        for metrics in parts:
+            for metric, points in metrics.items():
+                builder.exposure.add_series(label, asset, metric, points)
+    for partial in partials:
+        for asset, points in partial["price_samples"]:
+            builder.exposure.index.add_samples((asset[0], asset[1]), points)
+
+    current_prices = infer_current_loan_asset_prices(markets)
+    result = write_v1_outputs(
+        output_dir,
+        markets,
+        metadata,
+        current_prices,
+        iter_current_exposure_rows(markets, metadata),
+        builder.points_by_scheme(current_prices),
+        cube_cells=builder.cube_cells(current_prices),
+        end=max((date.fromisoformat(partial["window_end"]) for partial in partials if "window_end" in partial), default=None),
+        days=config["days"],
+        windows=config["windows"],
+        filters=filters,
+    )
+    result["shards"] = {"count": len(partials), "by": partials[0]["shard"]["by"]}
+    return result
+
+
+__all__ = [
+    "SHARD_MODES",
+    "ShardSpec",
+    "load_partials",
+    "market_positions",
+    "merge_v1_shards",
+    "run_v1_shard",
+]
@@ -0,0 +1,198 @@
+"""Asyncio variant of `run_v1` that overlaps the universe, metadata and history stages.
+
+Each chain is paged independently; a page is filtered and attributed as soon as it
+arrives (looking up Monarch oracles only for pages that need them) and history
+fetches for qualifying markets start immediately. Completed histories go through a
+bounded queue to a single aggregator, so slow aggregation back-pressures fetching.
+Blocking HTTP clients run in worker threads; outputs match `run_v1`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from studies.market_data.sources import fetch_market_history, iter_morpho_market_pages
+from studies.oracle_dominance_v1.allocation import DEFAULT_ALLOCATION_SCHEME, resolve_allocation_schemes, weight_rows
+from studies.oracle_dominance_v1.analysis import (
+    HistoricalExposureBuilder,
+    flatten_vendor_legs,
+    infer_current_loan_asset_prices,
+    iter_current_exposure_rows,
+    leg_assumption_labels,
+)
+from studies.oracle_dominance_v1.config import STREAMING_HISTORY_CONCURRENCY, STREAMING_QUEUE_SIZE, SUPPORTED_CHAINS
+from studies.oracle_dominance_v1.market_table import MarketTable
+from studies.oracle_dominance_v1.pipeline import (
+    MONARCH_LOOKUP_ERRORS,
+    fetch_oracle_metadata_for_chains,
+    filter_market_table,
+    load_monarch_universe,
+    lookup_missing_oracles,
+    write_v1_outputs,
+)
+from studies.oracle_dominance_v1.resample import DEFAULT_GAP_FILL, validate_gap_fill
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass(slots=True)
+class ChainStreamResult:
+    markets: MarketTable
+    metadata: dict[tuple[int, str], dict]
+
+
+async def stream_v1(
+    days: int,
+    min_borrow_usd: float,
+    require_listed: bool,
+    recognized_tokens_only: bool,
+    interval: str,
+    schemes: list[str],
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
+    concurrency: int = STREAMING_HISTORY_CONCURRENCY,
+    queue_size: int = STREAMING_QUEUE_SIZE,
+) -> tuple[list[ChainStreamResult], HistoricalExposureBuilder]:
+    loop = asyncio.get_running_loop()
+    # History workers plus one pager and one metadata download per chain, plus Monarch.
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 2 * len(SUPPORTED_CHAINS) + 1))
+
+    # Only --require-listed needs the whole indexer universe up front; otherwise pages look up
+    # their empty oracles and the universe is downloaded once if a lookup fails.
+    monarch_task = asyncio.create_task(asyncio.to_thread(load_monarch_universe)) if require_listed else None
+    metadata_tasks = {
+        chain_id: asyncio.create_task(asyncio.to_thread(fetch_oracle_metadata_for_chains, [chain_id]))
+        for chain_id in SUPPORTED_CHAINS
+    }
+    builder = HistoricalExposureBuilder(days, interval, schemes, repricing, gap_fill)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Repricing happens after aggregation, so histories never wait on their chain's current prices.
+    async def fetch_history(market, rows, assumptions) -> None:
+        async with semaphore:
+            history = await asyncio.to_thread(fetch_market_history, market.unique_key, market.chain_id, days, interval)
+        await queue.put((market, rows, history, assumptions))
+
+    async def monarch_lookup(table: MarketTable) -> dict[tuple[int, str], str]:
+        nonlocal monarch_task
+        if table.pool.get("") is None:
+            return {}
+        try:
+            return await asyncio.to_thread(lookup_missing_oracles, table)
+        except MONARCH_LOOKUP_ERRORS as exc:
+            logger.warning("Monarch oracle lookup failed (%s); falling back to the full Monarch universe", exc)
+            if monarch_task is None:
+                monarch_task = asyncio.create_task(asyncio.to_thread(load_monarch_universe))
+            return await monarch_task
+
+    async def stream_chain(chain_id: int) -> ChainStreamResult:
+        kept = MarketTable()
+        metadata: dict[tuple[int, str], dict] = {}
+        history_tasks: list[asyncio.Task] = []
+        pages = iter_morpho_market_pages(chain_id)
+        while (page := await asyncio.to_thread(next, pages, None)) is not None:
+            table = MarketTable.from_markets(page)
+            monarch = await monarch_task if monarch_task is not None else await monarch_lookup(table)
+            page_kept = filter_market_table(
+                table,
+                monarch,
+                min_borrow_usd=min_borrow_usd,
+                require_listed=require_listed,
+                recognized_tokens_only=recognized_tokens_only,
+            )
+            if not len(page_kept):
+                continue
+            if not metadata:
+                metadata = await metadata_tasks[chain_id]
+            for market in page_kept:
+                kept.append(market)
+                legs = flatten_vendor_legs(metadata.get((market.chain_id, market.oracle_address)) or {})
+                rows = weight_rows(legs, builder.schemes)
+                if any(rows):
+                    history_tasks.append(asyncio.create_task(fetch_history(market, rows, leg_assumption_labels(legs))))
+        await asyncio.gather(*history_tasks)
+        return ChainStreamResult(kept, metadata if len(kept) else {})
+
+    async def produce() -> list[ChainStreamResult]:
+        results = await asyncio.gather(*(stream_chain(chain_id) for chain_id in SUPPORTED_CHAINS))
+        await queue.put(None)
+        return results
+
+    async def aggregate() -> None:
+        while (item := await queue.get()) is not None:
+            builder.add_history(*item)
+
+    results, _ = await asyncio.gather(produce(), aggregate())
+    # Chains that kept no markets never awaited their metadata; a failed download there is not an error.
+    for task in metadata_tasks.values():
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+    return results, builder
+
+
+# Same inputs and outputs as run_v1, with the fetch stages overlapped.
+def run_v1_streaming(
+    output_dir: str | Path,
+    days: int = 180,
+    min_borrow_usd: float = 500_000,
+    require_listed: bool = False,
+    recognized_tokens_only: bool = False,
+    windows: Iterable[int] = (),
+    interval: str = "DAY",
+    allocation_schemes: Iterable[str] = (),
+    repricing: str = "current",
+    gap_fill: str = DEFAULT_GAP_FILL,
+    concurrency: int = STREAMING_HISTORY_CONCURRENCY,
+) -> dict[str, object]:
+    report_windows = sorted({days, *windows})
+    schemes = resolve_allocation_schemes([DEFAULT_ALLOCATION_SCHEME, *allocation_schemes])
+    filters = {
+        "min_borrow_usd": min_borrow_usd,
+        "require_listed": require_listed,
+        "recognized_tokens_only": recognized_tokens_only,
+        "interval": interval,
+        "repricing": repricing,
+        "gap_fill": validate_gap_fill(gap_fill),
+    }
+    results, builder = asyncio.run(
+        stream_v1(
+            report_windows[-1],
+            min_borrow_usd,
+            require_listed,
+            recognized_tokens_only,
+            interval,
+            schemes,
+            repricing=repricing,
+            gap_fill=gap_fill,
+            concurrency=concurrency,
+        )
+    )
+
+    markets = MarketTable()
+    metadata: dict[tuple[int, str], dict] = {}
+    for result in results:
+        for market in result.markets:
+            markets.append(market)
+        metadata.update(result.metadata)
+    current_prices = infer_current_loan_asset_prices(markets)
+    return write_v1_outputs(
+        output_dir,
+        markets,
+        metadata,
+        current_prices,
+        iter_current_exposure_rows(markets, metadata),
+        builder.points_by_scheme(current_prices),
+        cube_cells=builder.cube_cells(current_prices),
+        end=builder.end.date(),
+        days=days,
+        windows=report_windows,
+        filters=filters,
+    )
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import GeneratorType
+
+from studies.oracle_dominance_v1 import build_oracle_dominance_report as report
+from studies.oracle_dominance_v1.history_pyramid import build_history_pyramid
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.pipeline import export_csv
+from studies.oracle_dominance_v1.utils.csv_rows import ColumnTotals
+
+WINDOW_END = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def market(index: int) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{index:064x}",
+        chain_id=1,
+        oracle_address="0xoracle",
+        loan_asset_address=f"0xloan{index}",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+        supply_assets_usd=1_000_000.0 * (index + 1),
+    )
+
+
+def test_export_csv_reads_the_header_from_the_first_row(tmp_path):
+    rows = ({"vendor": vendor, "supply_usd": index} for index, vendor in enumerate(["Chainlink", "Pyth"]))
+    totals = ColumnTotals(["supply_usd"])
+    assert export_csv(tmp_path / "out.csv", rows, observers=(totals.add,)) == 2
+    assert (tmp_path / "out.csv").read_text().splitlines() == ["vendor,supply_usd", "Chainlink,0", "Pyth,1"]
+    assert totals.rows == 2 and totals.sums == {"supply_usd": 1.0}
+
+    assert export_csv(tmp_path / "empty.csv", iter(())) == 0
+    assert (tmp_path / "empty.csv").read_text() == ""
+
+    assert export_csv(tmp_path / "fixed.csv", [{"b": 1, "a": 2}], ["a", "b"]) == 1
+    assert (tmp_path / "fixed.csv").read_text().splitlines() == ["a,b", "2,1"]
+
+
+def test_history_rows_stream_into_the_pyramid_and_csv(monkeypatch, tmp_path):
+    def fake_fetch(self, market_ref, fetch_days, interval="DAY"):
+        end = int(WINDOW_END.timestamp())
+        return [(end - day * 86_400, 100.0, 50.0, 100.0, 50.0) for day in range(fetch_days + 1)]
+
+    monkeypatch.setattr(report.HistoryDecoder, "fetch", fake_fetch)
+    selected = [(market(0), ["Chainlink"]), (market(1), ["Pyth"])]
+    history_rows, errors, unfetched = report.build_historical_vendor_series(
+        selected, {}, days=10, decode_workers=0, end=WINDOW_END
+    )
+    assert isinstance(history_rows, GeneratorType)
+    assert not errors and not unfetched
+
+    points = report.history_rows_to_points(history_rows)
+    assert isinstance(points, GeneratorType)
+    pyramid = build_history_pyramid(points, days=10, end=WINDOW_END.date())
+    assert next(history_rows, None) is None
+    assert {point.vendor for point in pyramid.levels["day"]} == {"Chainlink", "Pyth"}
+
+    count = export_csv(tmp_path / "history.csv", report.points_to_history_rows(pyramid.window(10, pyramid.finest)))
+    assert count == len(list(pyramid.window(10, pyramid.finest)))
+    assert (tmp_path / "history.csv").read_text().splitlines()[0] == "timestamp,vendor,metric,exposure_usd"
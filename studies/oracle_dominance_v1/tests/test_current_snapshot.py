@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+
+from studies.oracle_dominance_v1.analysis import build_current_exposure_row
+from studies.oracle_dominance_v1.build_oracle_dominance_report import aggregate_current_vendor_totals
+from studies.oracle_dominance_v1.current_snapshot import CurrentSnapshot
+from studies.oracle_dominance_v1.models import MarketRef
+
+VENDORS = ["Chainlink", "Redstone", "Pyth"]
+
+
+def make_markets(count: int = 30, seed: int = 5) -> list[MarketRef]:
+    rng = random.Random(seed)
+    return [
+        MarketRef(
+            unique_key=f"0x{index:064x}",
+            chain_id=1,
+            oracle_address=f"0xo{index % 6:039x}",
+            loan_asset_address="0xloan",
+            loan_asset_symbol="USDC",
+            loan_asset_decimals=6,
+            collateral_asset_address="0xcollateral",
+            collateral_asset_symbol="WETH",
+            supply_assets="1",
+            borrow_assets="1",
+            supply_assets_usd=rng.uniform(1e5, 1e8) / 3,
+            borrow_assets_usd=rng.uniform(1e4, 1e7) / 7,
+        )
+        for index in range(count)
+    ]
+
+
+def make_metadata(markets: list[MarketRef]) -> dict[tuple[int, str], dict]:
+    metadata = {}
+    for market in markets:
+        oracle = int(market.oracle_address[3:], 16)
+        feeds = {"baseFeedOne": {"provider": VENDORS[oracle % 3], "pair": ["ETH", "USD"]}}
+        if oracle % 2:
+            feeds["quoteFeedOne"] = {"provider": VENDORS[(oracle + 1) % 3], "pair": ["USDC", "USD"]}
+        metadata[(market.chain_id, market.oracle_address)] = {"type": "standard", "data": feeds}
+    return metadata
+
+
+def rebuilt(markets: list[MarketRef], metadata: dict) -> CurrentSnapshot:
+    snapshot = CurrentSnapshot()
+    snapshot.refresh(markets, metadata)
+    return snapshot
+
+
+def test_patched_totals_match_a_full_rebuild_exactly():
+    markets = make_markets()
+    metadata = make_metadata(markets)
+    snapshot = rebuilt(markets, metadata)
+
+    rng = random.Random(11)
+    for _ in range(20):
+        markets.pop(rng.randrange(len(markets)))
+        for index in rng.sample(range(len(markets)), 5):
+            markets[index] = dataclasses.replace(markets[index], supply_assets_usd=rng.uniform(1e5, 1e8) / 3)
+        markets.append(make_markets(1, seed=rng.randrange(1 << 30))[0])
+        markets[-1].unique_key = f"0x{rng.randrange(1 << 64):064x}"
+        delta = snapshot.refresh(markets, metadata)
+        assert delta.added == 1 and delta.removed == 1 and delta.changed == 5
+
+    full = rebuilt(markets, metadata)
+    assert snapshot.totals == full.totals
+    assert list(snapshot.current_rows()) == list(full.current_rows())
+    assert snapshot.totals_rows("vendor") == full.totals_rows("vendor")
+
+
+def test_totals_rows_match_the_report_aggregation():
+    markets = make_markets()
+    metadata = make_metadata(markets)
+    snapshot = rebuilt(markets, metadata)
+    rows = [build_current_exposure_row(market, metadata[(market.chain_id, market.oracle_address)]) for market in markets]
+    assert snapshot.totals_rows("vendor") == aggregate_current_vendor_totals(rows)
+
+
+def test_metadata_change_rebuilds_affected_markets_only():
+    markets = make_markets()
+    metadata = make_metadata(markets)
+    snapshot = rebuilt(markets, metadata)
+    oracle = markets[0].oracle_address
+    metadata[(1, oracle)] = {"type": "standard", "data": {"baseFeedOne": {"provider": "Pyth", "pair": ["ETH", "USD"]}}}
+    delta = snapshot.refresh(markets, metadata)
+    assert delta.changed == sum(market.oracle_address == oracle for market in markets)
+    assert delta.unchanged == len(markets) - delta.changed
+    assert snapshot.totals == rebuilt(markets, metadata).totals
+
+
+def test_save_and_load_round_trip(tmp_path):
+    markets = make_markets()
+    metadata = make_metadata(markets)
+    snapshot = CurrentSnapshot({"min_borrow_usd": 0})
+    snapshot.refresh(markets, metadata)
+    path = snapshot.save(tmp_path / "snapshot.json")
+
+    loaded = CurrentSnapshot.load(path, {"min_borrow_usd": 0})
+    assert loaded.totals == snapshot.totals
+    assert loaded.refresh(markets, metadata).unchanged == len(markets)
+    assert not CurrentSnapshot.load(path, {"min_borrow_usd": 1}).rows
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import math
+
+from studies.oracle_dominance_v1.downsample import chart_point_budget, downsample_series, lttb
+
+
+def series(size: int) -> list[tuple[int, float]]:
+    return [(1_760_000_000 + index * 3_600, 100.0 + 10 * math.sin(index / 7)) for index in range(size)]
+
+
+def test_lttb_keeps_endpoints_and_budget():
+    points = series(1_000)
+    for threshold in (3, 4, 17, 500, 999):
+        sampled = lttb(points, threshold)
+        assert len(sampled) == threshold
+        assert sampled[0] == points[0]
+        assert sampled[-1] == points[-1]
+        timestamps = [ts for ts, _ in sampled]
+        assert timestamps == sorted(set(timestamps))
+
+
+def test_lttb_keeps_spikes():
+    points = series(1_000)
+    points[433] = (points[433][0], 1_000.0)
+    points[701] = (points[701][0], -1_000.0)
+    sampled = lttb(points, 50)
+    assert points[433] in sampled
+    assert points[701] in sampled
+
+
+def test_short_series_and_tiny_budgets_are_returned_whole():
+    points = series(10)
+    assert lttb(points, 10) == points
+    assert lttb(points, 50) == points
+    assert lttb(points, 2) == points
+    assert lttb([], 5) == []
+
+
+def test_downsample_series_applies_budget_per_vendor():
+    decimated = downsample_series({"Chainlink": series(400), "Pyth": series(20)}, max_points=100)
+    assert len(decimated["Chainlink"]) == 100
+    assert decimated["Pyth"] == series(20)
+    assert chart_point_budget(12, 180, 2) == 1_080
+    assert chart_point_budget(0.01, 10, 2) == 3
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import pytest
+
+from studies.oracle_dominance_v1 import build_oracle_dominance_report as report
+from studies.oracle_dominance_v1.allocation import weight_rows
+from studies.oracle_dominance_v1.analysis import HistoricalExposureBuilder
+from studies.oracle_dominance_v1.models import MarketRef, VendorLeg
+
+WINDOW_END = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+DAY = 86_400
+# Overlapping vendor sets; three markets share the Chainlink|Pyth signature in different leg orders.
+VENDORS = [["Chainlink"], ["Chainlink", "Pyth"], ["Pyth", "Chainlink"], ["Pyth", "Redstone"], ["Chainlink", "Pyth", "Pyth"], ["Redstone"]]
+METRICS = ("supply_usd", "borrow_usd")
+
+
+def market(index: int) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{index:064x}",
+        chain_id=1,
+        oracle_address=f"0xoracle{index}",
+        loan_asset_address=f"0xloan{index % 2}",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+    )
+
+
+def timestamps() -> list[int]:
+    today = int(WINDOW_END.timestamp()) // DAY * DAY
+    return [today - day * DAY for day in (2, 1, 0)]
+
+
+def usd(index: int, timestamp: int) -> tuple[float, float]:
+    step = (timestamp // DAY) % 7
+    return 1_000.0 * (index + 1) + 37.5 * step, 400.0 * (index + 1) + 11.25 * step
+
+
+# Each market allocated on its own: value x weight, summed per (timestamp, vendor, metric).
+def per_market_totals(weights: list[list[tuple[str, float]]]) -> dict[tuple[int, str, str], float]:
+    totals: dict[tuple[int, str, str], float] = defaultdict(float)
+    for index, row in enumerate(weights):
+        for timestamp in timestamps():
+            for metric, value in zip(METRICS, usd(index, timestamp)):
+                for vendor, weight in row:
+                    totals[(timestamp, vendor, metric)] += value * weight
+    return dict(totals)
+
+
+def test_signature_groups_match_per_market_allocation(monkeypatch):
+    def fake_fetch(self, market_ref, fetch_days, interval="DAY"):
+        index = int(market_ref.unique_key, 16)
+        return [(timestamp, *usd(index, timestamp), None, None) for timestamp in timestamps()]
+
+    monkeypatch.setattr(report.HistoryDecoder, "fetch", fake_fetch)
+    selected = [(market(index), vendors) for index, vendors in enumerate(VENDORS)]
+    history_rows, errors, unfetched = report.build_historical_vendor_series(
+        selected, {}, days=3, decode_workers=0, end=WINDOW_END
+    )
+    assert not errors and not unfetched
+    grouped = {
+        (row["timestamp"], row["vendor"], row["metric"]): row["exposure_usd"]
+        for row in history_rows
+        if row["metric"] in METRICS
+    }
+    expected = per_market_totals([[(vendor, 1 / len(set(vendors))) for vendor in set(vendors)] for vendors in VENDORS])
+    assert grouped.keys() == expected.keys()
+    for cell, value in expected.items():
+        assert grouped[cell] == pytest.approx(value, abs=0.01)
+
+
+def test_builder_groups_match_per_market_allocation():
+    schemes = ["even", "per_leg", "base_quote"]
+    builder = HistoricalExposureBuilder(3, "DAY", schemes, end=WINDOW_END)
+    legs = [
+        [VendorLeg(vendor, f"leg{position}", source_field="quoteFeedOne" if position else "baseFeedOne") for position, vendor in enumerate(vendors)]
+        for vendors in VENDORS
+    ]
+    for index, market_legs in enumerate(legs):
+        history = [
+            {"timestamp": timestamp, "supplyAssetsUsd": supply, "borrowAssetsUsd": borrow, "supplyAssets": "1", "borrowAssets": "1"}
+            for timestamp in timestamps()
+            for supply, borrow in [usd(index, timestamp)]
+        ]
+        builder.add_history(market(index), weight_rows(market_legs, builder.schemes), history)
+    assert len(builder.group_labels) < len(VENDORS)
+
+    points = builder.points_by_scheme({(1, "0xloan0"): 1.0, (1, "0xloan1"): 1.0})
+    for position, scheme in enumerate(schemes):
+        weights = [[(vendor, float(weight)) for vendor, weight in weight_rows(market_legs, schemes)[position]] for market_legs in legs]
+        expected = per_market_totals(weights)
+        grouped = {
+            (report.as_of_timestamp(point.as_of), point.vendor, point.metric): point.exposure_usd
+            for point in points[scheme]
+            if point.metric in METRICS
+        }
+        assert grouped.keys() == expected.keys()
+        for cell, value in expected.items():
+            assert grouped[cell] == pytest.approx(value, rel=1e-12)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from studies.oracle_dominance_v1 import build_oracle_dominance_report as report
+from studies.oracle_dominance_v1 import history_decode
+from studies.oracle_dominance_v1.history_decode import HistoryDecoder
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+def market(index: int) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{index:064x}",
+        chain_id=1,
+        oracle_address="0xoracle",
+        loan_asset_address="0xloan",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+    )
+
+
+def test_closed_decoder_rejects_late_fetches(monkeypatch):
+    monkeypatch.setattr(history_decode, "fetch_market_history_raw", lambda *args, **kwargs: ("[]", None))
+    with HistoryDecoder(0) as decoder:
+        assert decoder.fetch(market(0), 30) == []
+    with pytest.raises(CancelledError):
+        decoder.fetch(market(0), 30)
+
+
+def test_time_budget_abandons_in_flight_fetches_without_decoding_them(monkeypatch):
+    release = threading.Event()
+    decoded: list[str] = []
+    finished: queue.Queue = queue.Queue()
+
+    def raw(unique_key, chain_id, days, interval):
+        if unique_key != market(0).unique_key:
+            release.wait(5)
+        return unique_key, None
+
+    def decode(text, decimals):
+        decoded.append(text)
+        return []
+
+    fetch_one_history = report.fetch_one_history
+
+    def tracked(market_ref, *args):
+        try:
+            result = fetch_one_history(market_ref, *args)
+        except BaseException as exc:
+            finished.put((market_ref.unique_key, type(exc)))
+            raise
+        finished.put((market_ref.unique_key, None))
+        return result
+
+    monkeypatch.setattr(history_decode, "fetch_market_history_raw", raw)
+    monkeypatch.setattr(history_decode, "decode_history_text", decode)
+    monkeypatch.setattr(report, "fetch_one_history", tracked)
+    monkeypatch.setattr(report, "MAX_WORKERS", 2)
+
+    selected = [(market(index), ["Chainlink"]) for index in range(4)]
+    _, errors, unfetched = report.build_historical_vendor_series(
+        selected, {}, days=30, time_budget=0.2, decode_workers=0
+    )
+    release.set()
+    late = dict(finished.get(timeout=5) for _ in range(3))
+
+    assert not errors
+    assert [ref.unique_key for ref, _ in unfetched] == [market(index).unique_key for index in (1, 2, 3)]
+    assert late[market(0).unique_key] is None
+    assert late[market(1).unique_key] is CancelledError
+    assert late[market(2).unique_key] is CancelledError
+    assert decoded == [market(0).unique_key]
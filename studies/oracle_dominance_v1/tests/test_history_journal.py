@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from studies.oracle_dominance_v1 import build_oracle_dominance_report as report
+from studies.oracle_dominance_v1.history_journal import HistoryJournal, StaleJournalError, iter_completed_rows, read_journal
+from studies.oracle_dominance_v1.models import MarketRef
+
+CONFIG = {"interval": "DAY", "days": 30, "top_markets": 100}
+WINDOW_END = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def market(index: int) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{index:064x}",
+        chain_id=1,
+        oracle_address="0xoracle",
+        loan_asset_address="0xloan",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+        supply_assets_usd=1_000_000.0 * (index + 1),
+    )
+
+
+def rows(day: int) -> list[tuple]:
+    return [(1_760_000_000 + day * 86_400, 10.0, 5.0, 10.0, 5.0)]
+
+
+def test_resume_ignores_torn_line_and_keeps_appending(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with HistoryJournal(path, CONFIG, window_end=WINDOW_END) as journal:
+        journal.record_done(market(0), rows(0))
+        journal.record_failed(market(1), ["Chainlink"], "timeout")
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write('{"kind":"done","chain_id":1,"unique_key":"0x')
+
+    with HistoryJournal(path, CONFIG, resume=True) as journal:
+        assert journal.is_complete(market(0))
+        assert journal.attempts == {(1, market(1).unique_key): 1}
+        journal.record_done(market(1), rows(1))
+
+    state = read_journal(path, CONFIG)
+    assert state.completed == {(1, market(0).unique_key), (1, market(1).unique_key)}
+    assert dict(iter_completed_rows(path, [(1, market(0).unique_key)])) == {(1, market(0).unique_key): rows(0)}
+    for line in path.read_text(encoding="utf-8").splitlines()[:-2]:
+        json.loads(line)
+
+
+def test_resume_keeps_pinned_window_end(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    HistoryJournal(path, CONFIG, window_end=WINDOW_END).close()
+    later = WINDOW_END + timedelta(days=1, hours=3)
+    with HistoryJournal(path, CONFIG, resume=True, window_end=later) as journal:
+        assert journal.window_end == WINDOW_END
+    assert read_journal(path, CONFIG).window_end == WINDOW_END
+
+
+def test_stale_journal_names_the_changed_settings(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    HistoryJournal(path, CONFIG, window_end=WINDOW_END).close()
+    with pytest.raises(StaleJournalError) as error:
+        HistoryJournal(path, {**CONFIG, "days": 90}, resume=True)
+    message = str(error.value)
+    assert "days: journal 30, this run 90" in message
+    assert "without --resume" in message
+    assert "interval" not in message
+
+
+def test_resumed_window_is_fetched_back_to_its_start_and_clipped(monkeypatch):
+    days = 10
+    window_end = datetime.now(timezone.utc) - timedelta(days=2, hours=6)
+    end_ts = int(window_end.timestamp())
+    requested = []
+
+    def fake_fetch(self, market_ref, fetch_days, interval="DAY"):
+        requested.append(fetch_days)
+        now = int(datetime.now(timezone.utc).timestamp())
+        first = now - fetch_days * 86_400
+        return [(first + day * 86_400, 100.0, 50.0, 100.0, 50.0) for day in range(fetch_days + 1)]
+
+    monkeypatch.setattr(report.HistoryDecoder, "fetch", fake_fetch)
+    history_rows, errors, unfetched = report.build_historical_vendor_series(
+        [(market(0), ["Chainlink"])], {}, days=days, decode_workers=0, end=window_end
+    )
+    assert requested == [days + 3]
+    assert not errors and not unfetched
+    timestamps = sorted({row["timestamp"] for row in history_rows})
+    assert timestamps[-1] <= end_ts
+    assert timestamps[0] <= end_ts - days * 86_400 + 86_400
+    assert len(timestamps) == days + 1
+
+
+def test_resume_replays_journaled_rows_from_the_file(monkeypatch, tmp_path):
+    path = tmp_path / "journal.jsonl"
+    end_ts = int(WINDOW_END.timestamp())
+    selected = [(market(index), ["Chainlink", "Pyth"][index % 2 :]) for index in range(3)]
+
+    def fake_fetch(self, market_ref, fetch_days, interval="DAY"):
+        scale = int(market_ref.unique_key, 16) + 1
+        return [(end_ts - day * 86_400, 10.0 * scale, 5.0 * scale, 10.0 * scale, 5.0 * scale) for day in range(4)]
+
+    def build(journal):
+        history_rows, errors, unfetched = report.build_historical_vendor_series(
+            selected, {}, days=3, journal=journal, decode_workers=0, end=WINDOW_END
+        )
+        return sorted(history_rows, key=lambda row: tuple(map(str, row.values()))), errors, unfetched
+
+    monkeypatch.setattr(report.HistoryDecoder, "fetch", fake_fetch)
+    with HistoryJournal(path, CONFIG, window_end=WINDOW_END) as journal:
+        fresh = build(journal)
+        assert len(journal.completed) == len(selected)
+
+    def refuse(self, market_ref, fetch_days, interval="DAY"):
+        raise AssertionError("journaled market refetched")
+
+    monkeypatch.setattr(report.HistoryDecoder, "fetch", refuse)
+    with HistoryJournal(path, CONFIG, resume=True) as journal:
+        assert journal.completed == {(1, ref.unique_key) for ref, _ in selected}
+        assert build(journal) == fresh
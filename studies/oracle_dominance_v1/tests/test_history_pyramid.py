@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from studies.oracle_dominance_v1.analysis import HistoricalExposureBuilder
+from studies.oracle_dominance_v1.history_pyramid import build_history_pyramid, bucket_start, rollup_points
+from studies.oracle_dominance_v1.models import VendorExposurePoint
+
+
+def daily_points(end: date, days: int) -> list[VendorExposurePoint]:
+    return [
+        VendorExposurePoint(as_of=end - timedelta(days=offset), vendor="Chainlink", exposure_usd=float(offset), metric="supply_usd")
+        for offset in range(days, -1, -1)
+    ]
+
+
+def test_window_keeps_partial_first_day_of_fetch_window():
+    end = date(2026, 10, 19)
+    pyramid = build_history_pyramid(daily_points(end, 30), days=30, end=end)
+    window = pyramid.window(30, "day")
+    assert len(window) == 31
+    assert window[0].as_of == end - timedelta(days=30)
+    assert [point.as_of for point in pyramid.window(7, "day")][0] == end - timedelta(days=7)
+
+
+def test_window_follows_pinned_end_not_last_point():
+    end = date(2026, 10, 19)
+    # History stops two days short of the window end.
+    points = [point for point in daily_points(end, 30) if point.as_of <= end - timedelta(days=2)]
+    pinned = build_history_pyramid(points, days=30, end=end)
+    assert pinned.window(7, "day")[0].as_of == end - timedelta(days=7)
+    unpinned = build_history_pyramid(points, days=30)
+    assert unpinned.end == end - timedelta(days=2)
+
+
+def test_builder_window_matches_pyramid_window():
+    end = datetime(2026, 10, 19, 15, 30, tzinfo=timezone.utc)
+    builder = HistoricalExposureBuilder(days=10, end=end)
+    assert builder.end == end
+    first_bucket = datetime.fromtimestamp(builder.exposure.cells.start_ts, tz=timezone.utc).date()
+    pyramid = build_history_pyramid([], days=10, end=builder.end.date())
+    assert pyramid.window_start(10, "day") == first_bucket
+
+
+def test_rollup_keeps_bucket_close():
+    points = daily_points(date(2026, 10, 19), 13)
+    weekly = rollup_points(points, "week")
+    assert [point.as_of for point in weekly] == [date(2026, 10, 5), date(2026, 10, 12), date(2026, 10, 19)]
+    # The close is the latest day in each week: Sunday 2026-10-11 for the first full week.
+    assert weekly[0].exposure_usd == 8.0
+    assert bucket_start(date(2026, 10, 11), "month") == date(2026, 10, 1)
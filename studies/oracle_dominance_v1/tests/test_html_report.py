@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+from itertools import accumulate
+
+import pytest
+
+from studies.oracle_dominance_v1.html_report import INT32_MAX, encode_series_block, quantize
+
+HOUR = 3_600
+
+
+# What the page does: base64 -> little-endian Int32 -> prefix sums.
+def decode_int32(text: str) -> list[int]:
+    packed = array("i")
+    packed.frombytes(base64.b64decode(text))
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return list(accumulate(packed))
+
+
+def decode_series_block(block: dict) -> dict[tuple[str, str], list[tuple[int, float]]]:
+    axis = [block["t0"] + offset for offset in decode_int32(block["axis"])]
+    decoded = {}
+    for series in block["series"]:
+        scale = 10.0 ** series["exponent"]
+        positions = decode_int32(series["index"])
+        values = decode_int32(series["values"])
+        decoded[(series["metric"], series["name"])] = [(axis[position], value * scale) for position, value in zip(positions, values)]
+    return decoded
+
+
+@pytest.mark.parametrize(
+    ("values", "digits", "exponent"),
+    [
+        ([0.0, 1.4, 2.6, -3.5, 1e6], 0, 0),
+        ([0.125, 0.5, 0.875], 2, -2),
+        # A jump past Int32 in whole dollars falls back to thousands.
+        ([1.0, 2e12, 1.5e12, 0.0], 0, 3),
+        ([float(INT32_MAX), -float(INT32_MAX)], 0, 1),
+    ],
+)
+def test_quantize_steps_fit_int32_and_sum_back(values, digits, exponent):
+    found, steps = quantize(values, digits)
+    assert found == exponent
+    assert all(-INT32_MAX <= step <= INT32_MAX for step in steps)
+    scale = 10.0**found
+    for value, total in zip(values, accumulate(steps)):
+        assert abs(total * scale - value) <= scale / 2 * (1 + 1e-9)
+
+
+def test_series_block_round_trip():
+    start = 1_760_000_000
+    series = {
+        "supply": {
+            "Chainlink": [(start + hour * HOUR, 1_000_000.0 + 12_345.67 * hour) for hour in range(48)],
+            # Sparse on the shared axis, and large enough to need exponent > 0.
+            "Redstone": [(start + hour * HOUR, 4e12 * (hour % 3)) for hour in range(0, 72, 5)],
+        },
+        "share": {"Chainlink": [(start + hour * HOUR, hour / 71) for hour in range(72)]},
+    }
+    block = encode_series_block(series, {"share": 4})
+    exponents = {(entry["metric"], entry["name"]): entry["exponent"] for entry in block["series"]}
+    assert exponents == {("supply", "Chainlink"): 0, ("supply", "Redstone"): 4, ("share", "Chainlink"): -4}
+
+    decoded = decode_series_block(block)
+    assert set(decoded) == set(exponents)
+    for metric, by_name in series.items():
+        for name, values in by_name.items():
+            scale = 10.0 ** exponents[(metric, name)]
+            points = decoded[(metric, name)]
+            assert [ts for ts, _ in points] == [ts for ts, _ in values]
+            for (_, value), (_, restored) in zip(values, points):
+                assert abs(restored - value) <= scale / 2 * (1 + 1e-9)
+
+
+def test_empty_series_block():
+    assert encode_series_block({}) == {"t0": 0, "axis": "", "series": []}
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from studies.market_data import sources
+from studies.market_data.clients import morpho
+from studies.market_data.store import CachePolicy, MarketDataStore, iter_json_array
+
+
+def history(points: int) -> list[dict]:
+    return [{"timestamp": 1_760_000_000 + index * 3_600, "supplyAssets": str(10**18 + index)} for index in range(points)]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["[]", " [ ] ", "[1]", '[{"a": [1, 2]}, "x", null]', '\n[ {"a": "]"} ,\t{"b": {}} ]\n', json.dumps(history(5))],
+)
+def test_iter_json_array_matches_json_loads(text):
+    assert list(iter_json_array(text)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", ["{}", "[1 2]", "[1,", ""])
+def test_iter_json_array_rejects_malformed_text(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(text))
+
+
+def test_memory_tier_skips_large_entries(tmp_path):
+    store = MarketDataStore(tmp_path, memory_bytes=10_000, memory_entry_bytes=1_000)
+    store.put("history", ["small"], history(2))
+    store.put("history", ["large"], history(50))
+    assert store.stats["memory_skips"] == 1
+
+    store.lookup("history", ["small"])
+    store.lookup("history", ["large"])
+    assert store.stats["memory_hits"] == 1
+    assert store.stats["disk_hits"] == 1
+    assert store.lookup("history", ["large"]) == history(50)
+
+
+def test_iter_market_history_streams_cached_rows(monkeypatch, tmp_path):
+    calls = []
+
+    def fetch(unique_key, chain_id, days=180, interval="DAY"):
+        calls.append(unique_key)
+        return history(days)
+
+    monkeypatch.setattr(morpho, "fetch_market_history", fetch)
+    store = MarketDataStore(tmp_path, memory_entry_bytes=100)
+    rows = sources.iter_market_history("0xABC", 1, days=30, store=store)
+    assert not calls
+    assert list(rows) == history(30)
+    assert list(sources.iter_market_history("0xabc", 1, days=30, store=store)) == history(30)
+    assert calls == ["0xABC"]
+    assert store.stats["disk_hits"] == 1
+    assert sources.fetch_market_history("0xabc", 1, days=30, store=store) == history(30)
+    assert store.contains("history", sources.history_key("0xabc", 1, 30, "DAY"), CachePolicy())
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from studies.oracle_dominance_v1.market_table import MarketTable, mask_and
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+def _market(key: str, borrow_usd: float | None, supply_usd: float | None = None, symbol: str = "USDC") -> MarketRef:
+    return MarketRef(
+        unique_key=key,
+        chain_id=1,
+        oracle_address="0xoracle",
+        loan_asset_address=f"0xloan{symbol}",
+        loan_asset_symbol=symbol,
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+        supply_assets="1000000",
+        borrow_assets="500000",
+        supply_assets_usd=supply_usd,
+        borrow_assets_usd=borrow_usd,
+    )
+
+
+def _table() -> MarketTable:
+    return MarketTable.from_markets(
+        [
+            _market("0xa", 100.0, 5.0),
+            _market("0xb", None, None, symbol="ODD"),
+            _market("0xc", 50.0, 7.0),
+            _market("0xd", 200.0, 7.0),
+        ]
+    )
+
+
+def test_mask_min_treats_missing_values_as_zero():
+    table = _table()
+    assert table.mask_min("borrow_usd", 100) == bytearray([1, 0, 0, 1])
+    assert table.mask_min("borrow_usd", 0) == bytearray([1, 1, 1, 1])
+    assert table.mask_min("borrow_usd", -1) == bytearray([1, 1, 1, 1])
+
+
+def test_string_masks_match_per_row_lookups():
+    table = _table()
+    assert table.mask_not_in("unique_key", {"0xb", "0xmissing"}) == bytearray([1, 0, 1, 1])
+    assert table.mask_keys_in({(1, "0xc"), (1, "0xmissing"), (8453, "0xa")}) == bytearray([0, 0, 1, 0])
+    known = table.pool.flags(lambda value: value != "ODD")
+    assert table.mask_string_flags("loan_symbol", known) == bytearray([1, 0, 1, 1])
+
+
+def test_filter_keeps_masked_rows_in_order():
+    table = _table()
+    kept = table.filter(mask_and(table.mask_min("borrow_usd", 60), table.mask_not_in("unique_key", {"0xd"})))
+    assert [market.unique_key for market in kept] == ["0xa"]
+    kept = table.filter(table.mask_not_in("unique_key", {"0xa"}))
+    assert [market.unique_key for market in kept] == ["0xb", "0xc", "0xd"]
+    assert kept.market(0).borrow_assets_usd is None
+
+
+def test_top_n_keeps_original_order_among_ties():
+    table = _table()
+    assert table.top_n(2) == [2, 3]
+    assert table.top_n(4) == [2, 3, 0, 1]
+    assert table.top_n(2, candidates=[0, 1, 3]) == [3, 0]
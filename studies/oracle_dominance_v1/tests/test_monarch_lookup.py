@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+
+import pytest
+
+from studies.market_data import sources
+from studies.market_data import store as store_module
+from studies.market_data.clients import monarch, morpho
+from studies.market_data.store import MarketDataStore
+from studies.oracle_dominance_v1 import pipeline, planner
+from studies.oracle_dominance_v1.market_table import MarketTable
+from studies.oracle_dominance_v1.models import MarketRef
+
+
+def market(chain_id: int, index: int, oracle: str = "") -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{chain_id:016x}{index:048x}",
+        chain_id=chain_id,
+        oracle_address=oracle,
+        loan_asset_address="0xloan",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WBTC",
+        supply_assets="1000000000000",
+        borrow_assets="400000000000",
+        supply_assets_usd=1_000_000.0,
+        borrow_assets_usd=400_000.0,
+    )
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls: list[list[tuple[int, str]]] = []
+
+    def lookup(keys):
+        keys = list(keys)
+        calls.append(keys)
+        return {key: f"0xmonarch{key[1][-1]}" for key in keys}
+
+    monkeypatch.setattr(monarch, "fetch_monarch_market_oracles", lookup)
+    monkeypatch.setenv("MONARCH_INDEXER_ENDPOINT", "http://monarch.test")
+    monkeypatch.setattr(store_module, "_default_store", MarketDataStore())
+    return calls
+
+
+def test_lookup_is_cached_per_chain_and_market_set(lookups):
+    store = MarketDataStore()
+    first = sources.fetch_monarch_market_oracles([(1, "0xA1"), (8453, "0xb2"), (1, "0xc3")], store=store)
+    assert first == {(1, "0xa1"): "0xmonarch1", (1, "0xc3"): "0xmonarch3", (8453, "0xb2"): "0xmonarch2"}
+    assert len(lookups) == 2
+
+    # Same sets in another order and case: served from the cache.
+    assert sources.fetch_monarch_market_oracles([(1, "0xc3"), (8453, "0xB2"), (1, "0xa1")], store=store) == first
+    assert len(lookups) == 2
+
+    # A different set on one chain is looked up afresh; the other chain is still cached.
+    sources.fetch_monarch_market_oracles([(1, "0xa1"), (8453, "0xb2")], store=store)
+    assert lookups[2:] == [[(1, "0xa1")]]
+
+
+def test_failed_lookup_logs_and_falls_back_to_the_universe(lookups, monkeypatch, caplog):
+    def failing(keys):
+        raise RuntimeError("Monarch GraphQL error")
+
+    monkeypatch.setattr(monarch, "fetch_monarch_market_oracles", failing)
+    monkeypatch.setattr(monarch, "fetch_monarch_market_universe", lambda: {(1, market(1, 0).unique_key): "0xuniverse"})
+    table = MarketTable.from_markets([market(1, 0)])
+
+    with caplog.at_level(logging.WARNING, logger=pipeline.__name__):
+        assert pipeline.load_monarch_oracles(table) == {(1, market(1, 0).unique_key): "0xuniverse"}
+    assert "Monarch GraphQL error" in caplog.text
+
+
+def test_unexpected_lookup_errors_propagate(lookups, monkeypatch):
+    def broken(keys):
+        raise TypeError("bug in the caller")
+
+    monkeypatch.setattr(monarch, "fetch_monarch_market_oracles", broken)
+    monkeypatch.setattr(monarch, "fetch_monarch_market_universe", lambda: pytest.fail("universe fallback on a bug"))
+    with pytest.raises(TypeError):
+        pipeline.load_monarch_oracles(MarketTable.from_markets([market(1, 0)]))
+
+
+def test_planner_counts_a_cached_lookup(lookups, monkeypatch):
+    markets = [market(1, 0), market(1, 1, "0xapi"), market(1, 2)]
+    monkeypatch.setattr(morpho, "fetch_morpho_markets_for_chain", lambda chain_id: markets if chain_id == 1 else [])
+    monkeypatch.setattr(pipeline, "fetch_oracle_metadata", lambda markets, store=None: {})
+
+    cold = planner.RunPlan(concurrency=1)
+    planner.plan_market_universe(cold, chains=[1])
+    assert cold.endpoint("monarch").as_dict()["network_requests"] == 1
+    assert cold.endpoint("monarch").seconds > 0
+
+    warm = planner.RunPlan(concurrency=1)
+    planner.plan_market_universe(warm, chains=[1])
+    assert warm.endpoint("monarch").requests == 1
+    assert warm.endpoint("monarch").cache_hits == 1
+    assert warm.endpoint("monarch").seconds == 0
+    assert len(lookups) == 1
+
+
+def test_planner_fetches_through_the_given_store(lookups, monkeypatch):
+    markets = [market(1, 0), market(1, 1, "0xapi")]
+    monkeypatch.setattr(morpho, "fetch_morpho_markets_for_chain", lambda chain_id: markets if chain_id == 1 else [])
+    monkeypatch.setattr(pipeline, "fetch_oracle_metadata_for_chains", lambda chains, store=None: {})
+    store = MarketDataStore()
+
+    planner.plan_market_universe(planner.RunPlan(concurrency=1), chains=[1], store=store)
+    assert store.contains("universe", sources.universe_key(1), sources.policy("universe"))
+    assert not store_module.default_store().contains("universe", sources.universe_key(1), sources.policy("universe"))
+
+    warm = planner.RunPlan(concurrency=1)
+    planner.plan_market_universe(warm, chains=[1], store=store)
+    assert warm.endpoint("morpho_markets").cache_hits == warm.endpoint("morpho_markets").requests == 1
+    assert warm.endpoint("monarch").cache_hits == warm.endpoint("monarch").requests == 1
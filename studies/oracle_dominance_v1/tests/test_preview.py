@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from fractions import Fraction
+
+from studies.oracle_dominance_v1.exposure_accumulator import DAY_SECONDS, ExposureAccumulator
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.preview import (
+    CERTAIN_STRATUM,
+    bootstrap_bands,
+    draw_preview_sample,
+    estimate_vendor_totals,
+    sample_key,
+)
+
+START_TS = 1_760_000_000 - 1_760_000_000 % DAY_SECONDS
+
+
+def market(index: int, supply_usd: float, chain_id: int = 1) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{index:064x}",
+        chain_id=chain_id,
+        oracle_address="0xoracle",
+        loan_asset_address="0xloan",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+        supply_assets_usd=supply_usd,
+    )
+
+
+# 3 large markets, then 12 in a 1e6 stratum and 8 in a 1e4 stratum on another chain.
+def candidates() -> list[tuple[MarketRef, list[str]]]:
+    markets = [market(index, 1e9 - index) for index in range(3)]
+    markets += [market(3 + index, 5e6 - index) for index in range(12)]
+    markets += [market(15 + index, 5e4 - index, chain_id=8453) for index in range(8)]
+    return [(item, ["Chainlink"] if index % 2 else ["Chainlink", "Redstone"]) for index, item in enumerate(markets)]
+
+
+# Every sampled market reports the same exposure in each of three daily buckets.
+def market_totals(sample, fetched, value: float = 100.0) -> ExposureAccumulator:
+    totals = ExposureAccumulator(START_TS, DAY_SECONDS, 3)
+    metric_id = totals.metric_id("supply_usd")
+    for index, ok in enumerate(fetched):
+        if ok:
+            key_id = totals.vendor_id(sample_key(index))
+            for offset in range(3):
+                totals.add(offset, key_id, metric_id, value)
+    return totals
+
+
+def test_weights_scale_each_stratum_to_its_size():
+    sample = draw_preview_sample(candidates(), sample_size=9, certain=3)
+    assert sample.population == 23
+    assert sample.stratum_sizes == {CERTAIN_STRATUM: 3, "1:1e6": 12, "8453:1e4": 8}
+    weights = sample.weights([True] * len(sample.markets))
+    assert weights[:3] == [Fraction(1)] * 3
+    assert sum(weights) == sample.population
+    for stratum, size in sample.stratum_sizes.items():
+        assert sum(weight for label, weight in zip(sample.strata, weights) if label == stratum) == size
+
+
+def test_failed_market_is_replaced_by_its_stratum_peers():
+    sample = draw_preview_sample(candidates(), sample_size=9, certain=3)
+    failed = sample.strata.index("1:1e6")
+    fetched = [index != failed for index in range(len(sample.markets))]
+    weights = sample.weights(fetched)
+    assert weights[failed] == 0
+    peers = [weight for index, (label, weight) in enumerate(zip(sample.strata, weights)) if label == "1:1e6" and index != failed]
+    assert sum(peers) == 12
+    assert len(set(peers)) == 1
+
+    fetched = [index != 0 for index in range(len(sample.markets))]
+    assert sum(sample.weights(fetched)) == sample.population - 1
+
+
+def test_estimate_recovers_population_total_of_uniform_markets():
+    sample = draw_preview_sample(candidates(), sample_size=9, certain=3)
+    fetched = [True] * len(sample.markets)
+    estimate = estimate_vendor_totals(sample, fetched, market_totals(sample, fetched))
+    totals: dict[tuple[int, str], float] = {}
+    for offset, vendor, metric, value in estimate.iter_cells():
+        assert metric == "supply_usd"
+        totals[(offset, vendor)] = value
+    for offset in range(3):
+        assert sum(value for (cell, _), value in totals.items() if cell == offset) == 100.0 * sample.population
+
+
+def test_bootstrap_bands_bracket_the_estimate():
+    sample = draw_preview_sample(candidates(), sample_size=9, certain=3)
+    fetched = [True] * len(sample.markets)
+    totals = market_totals(sample, fetched)
+    estimate = {(offset, vendor): value for offset, vendor, _, value in estimate_vendor_totals(sample, fetched, totals).iter_cells()}
+    bands = list(bootstrap_bands(sample, fetched, totals, "supply_usd", rounds=50))
+    assert {(offset, vendor) for offset, vendor, _, _ in bands} == set(estimate)
+    for offset, vendor, lower, upper in bands:
+        assert lower <= estimate[(offset, vendor)] + 1e-6
+        assert upper >= estimate[(offset, vendor)] - 1e-6
+    assert not list(bootstrap_bands(sample, fetched, totals, "supply_usd", rounds=0))
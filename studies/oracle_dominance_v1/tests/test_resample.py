@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from studies.market_data.config import HISTORY_INTERVAL_SECONDS
+from studies.oracle_dominance_v1.exposure_accumulator import bucket_seconds_for_interval
+from studies.oracle_dominance_v1.price_index import AssetExposureAccumulator
+from studies.oracle_dominance_v1.resample import resample_rows
+
+END = datetime(2026, 10, 19, 12, 30, tzinfo=timezone.utc)
+ASSET = (1, "0xloan")
+# Window length and point count per interval: 10 source points inside each window.
+CASES = {"HOUR": (1, 10), "DAY": (30, 10), "WEEK": (90, 10)}
+
+
+def history(interval: str, points: int, skip: set[int] = frozenset(), lag: int = 0) -> list[tuple]:
+    step = HISTORY_INTERVAL_SECONDS[interval]
+    last = int(END.timestamp()) // step * step - lag * step
+    return [
+        (last - (points - 1 - index) * step, 100.0 + index, 50.0, 100.0 + index, 50.0)
+        for index in range(points)
+        if index not in skip
+    ]
+
+
+def supply_points(interval: str, rows: list[tuple], gap_fill: str = "ffill") -> list[tuple[int, float]]:
+    days, _ = CASES[interval]
+    exposure = AssetExposureAccumulator(days, interval, end=END, gap_fill=gap_fill)
+    exposure.add_history("group", ASSET, rows)
+    series = {metric: points for _, _, metric, points in exposure.iter_series()}
+    return series["supply_usd"]
+
+
+@pytest.mark.parametrize("interval", ["HOUR", "DAY", "WEEK"])
+def test_bucket_grid_follows_the_history_interval(interval):
+    assert bucket_seconds_for_interval(interval) == HISTORY_INTERVAL_SECONDS[interval]
+    _, count = CASES[interval]
+    rows = history(interval, count)
+    points = supply_points(interval, rows)
+    assert [timestamp for timestamp, _ in points] == [row[0] for row in rows]
+    assert [value for _, value in points] == [row[1] for row in rows]
+
+
+@pytest.mark.parametrize("interval", ["HOUR", "DAY", "WEEK"])
+def test_interior_gaps_are_filled_one_row_per_bucket(interval):
+    _, count = CASES[interval]
+    full = history(interval, count)
+    points = supply_points(interval, history(interval, count, skip={3, 6}))
+    assert [timestamp for timestamp, _ in points] == [row[0] for row in full]
+    values = dict(points)
+    assert values[full[3][0]] == full[2][1]
+    assert values[full[6][0]] == full[5][1]
+
+    linear = dict(supply_points(interval, history(interval, count, skip={3}), gap_fill="linear"))
+    assert linear[full[3][0]] == pytest.approx((full[2][1] + full[4][1]) / 2)
+    assert len(supply_points(interval, history(interval, count, skip={3, 6}), gap_fill="none")) == count - 2
+
+
+@pytest.mark.parametrize("interval", ["HOUR", "DAY", "WEEK"])
+def test_trailing_carry_is_one_source_interval(interval):
+    _, count = CASES[interval]
+    step = HISTORY_INTERVAL_SECONDS[interval]
+    rows = history(interval, count, lag=3)
+    points = supply_points(interval, rows)
+    assert len(points) == count + 1
+    assert points[-1] == (rows[-1][0] + step, rows[-1][1])
+    assert len(supply_points(interval, history(interval, count, lag=1))) == count + 1
+    assert len(supply_points(interval, rows, gap_fill="none")) == count
+
+
+def test_gaps_longer_than_seven_days_stay_empty():
+    rows = [(day * 86_400, 1.0) for day in (0, 1, 10, 11)]
+    resampled = list(resample_rows(rows, 0, 86_400, end_offset=11))
+    assert [row[0] // 86_400 for row, _ in resampled] == [0, 1, 10, 11]
+    rows = [(day * 86_400, 1.0) for day in (0, 1, 9)]
+    assert len(list(resample_rows(rows, 0, 86_400, end_offset=9))) == 10
+    weekly = [(week * 604_800, 1.0) for week in (0, 2, 4)]
+    resampled = list(resample_rows(weekly, 0, 604_800, end_offset=4))
+    assert [(row[0] // 604_800, observed) for row, observed in resampled] == [(0, True), (1, False), (2, True), (3, False), (4, True)]
+    sparse = [(week * 604_800, 1.0) for week in (0, 3)]
+    assert [row[0] // 604_800 for row, _ in resample_rows(sparse, 0, 604_800, end_offset=3)] == [0, 3]
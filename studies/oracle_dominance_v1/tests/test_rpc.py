@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+import pytest
+
+from studies.market_data import store as store_module
+from studies.market_data.clients import monarch, morpho
+from studies.market_data.store import MarketDataStore
+from studies.oracle_dominance_v1 import pipeline
+from studies.oracle_dominance_v1.clients import rpc
+from studies.oracle_dominance_v1.clients.rpc import (
+    AGGREGATE3_SELECTOR,
+    DECIMALS_SELECTOR,
+    MARKET_PARAMS_SELECTOR,
+    MARKET_SELECTOR,
+    SYMBOL_SELECTOR,
+    ZERO_ADDRESS,
+    MulticallReader,
+    decode_aggregate3,
+    decode_symbol,
+    encode_aggregate3,
+    fetch_rpc_markets,
+    fetch_rpc_markets_for_chain,
+    market_id_word,
+    read_market_states,
+)
+from studies.oracle_dominance_v1.config import MULTICALL3_ADDRESS
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.utils.env import morpho_blue_address
+
+MORPHO = morpho_blue_address(1)
+BLOCK = 0x1234
+
+
+def word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def address_word(address: str) -> bytes:
+    return word(int(address, 16))
+
+
+def read_word(data: bytes, offset: int) -> int:
+    return int.from_bytes(data[offset:offset + 32], "big")
+
+
+# Inverse of encode_aggregate3 (after the selector): [(target, allow_failure, calldata)].
+def decode_calls(data: bytes) -> list[tuple[str, bool, bytes]]:
+    base = read_word(data, 0) + 32
+    calls = []
+    for index in range(read_word(data, base - 32)):
+        item = base + read_word(data, base + 32 * index)
+        returned = item + read_word(data, item + 64)
+        length = read_word(data, returned)
+        target = "0x" + data[item + 12:item + 32].hex()
+        calls.append((target, bool(read_word(data, item + 32)), data[returned + 32:returned + 32 + length]))
+    return calls
+
+
+# ABI encoding of aggregate3's (bool success, bytes returnData)[] result.
+def encode_results(results: list[tuple[bool, bytes]]) -> bytes:
+    heads, tails = [], []
+    offset = 32 * len(results)
+    for success, returned in results:
+        tail = word(int(success)) + word(64) + word(len(returned)) + returned + bytes(-len(returned) % 32)
+        heads.append(word(offset))
+        tails.append(tail)
+        offset += len(tail)
+    return word(32) + word(len(results)) + b"".join(heads) + b"".join(tails)
+
+
+class FakeNode:
+    """In-process JSON-RPC node serving eth_blockNumber and Multicall3 aggregate3 over Morpho Blue
+    market() / idToMarketParams() and ERC-20 symbol() / decimals()."""
+
+    def __init__(
+        self,
+        states: dict[str, tuple[int, int]],
+        reverted=(),
+        empty=(),
+        reply=None,
+        params: dict[str, tuple[str, str, str]] | None = None,
+        tokens: dict[str, tuple[bytes | None, int | None]] | None = None,
+    ) -> None:
+        self.states = {market_id_word(key): state for key, state in states.items()}
+        self.reverted = {market_id_word(key) for key in reverted}
+        self.empty = {market_id_word(key) for key in empty}
+        self.reply = reply
+        # Market ID -> (loan token, collateral token, oracle); token -> (raw symbol() return, decimals).
+        self.params = {market_id_word(key): value for key, value in (params or {}).items()}
+        self.tokens = tokens or {}
+        self.batches: list[list[dict]] = []
+
+    def market(self, calldata: bytes) -> tuple[bool, bytes]:
+        market_id = calldata[4:]
+        if market_id in self.reverted:
+            return False, b""
+        if market_id in self.empty:
+            return True, b""
+        if calldata[:4] == MARKET_PARAMS_SELECTOR:
+            loan, collateral, oracle = self.params.get(market_id, (ZERO_ADDRESS, ZERO_ADDRESS, ZERO_ADDRESS))
+            irm = ZERO_ADDRESS if loan == ZERO_ADDRESS else "0x" + "11" * 20
+            return True, b"".join(address_word(address) for address in (loan, collateral, oracle, irm)) + word(860 * 10**15)
+        assert calldata[:4] == MARKET_SELECTOR
+        supply, borrow = self.states.get(market_id, (0, 0))
+        return True, b"".join(word(value) for value in (supply, supply // 2, borrow, borrow // 2, 1_700_000_000, 0))
+
+    def token(self, target: str, calldata: bytes) -> tuple[bool, bytes]:
+        symbol, decimals = self.tokens[target]
+        if calldata == SYMBOL_SELECTOR:
+            return symbol is not None, symbol or b""
+        assert calldata == DECIMALS_SELECTOR
+        return decimals is not None, b"" if decimals is None else word(decimals)
+
+    def __call__(self, batch: list[dict]) -> list[dict]:
+        self.batches.append(batch)
+        responses = []
+        for request in batch:
+            if request["method"] == "eth_blockNumber":
+                result = hex(BLOCK)
+            else:
+                call, tag = request["params"]
+                assert call["to"] == MULTICALL3_ADDRESS and tag == hex(BLOCK)
+                data = bytes.fromhex(call["data"][2:])
+                assert data[:4] == AGGREGATE3_SELECTOR
+                results = []
+                for target, allow_failure, calldata in decode_calls(data[4:]):
+                    assert allow_failure
+                    results.append(self.market(calldata) if target == MORPHO else self.token(target, calldata))
+                result = self.reply(results) if self.reply else "0x" + encode_results(results).hex()
+            responses.append({"jsonrpc": "2.0", "id": request["id"], "result": result})
+        # Batch responses may come back in any order.
+        return responses[::-1]
+
+
+def key(index: int) -> str:
+    return f"0x{index:064x}"
+
+
+def market(index: int, chain_id: int = 1, usd: float | None = 1.0) -> MarketRef:
+    return MarketRef(
+        unique_key=key(index),
+        chain_id=chain_id,
+        oracle_address="0xoracle",
+        loan_asset_address=f"0xloan{index % 2}",
+        loan_asset_symbol="USDC",
+        loan_asset_decimals=6,
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WETH",
+        supply_assets="1",
+        borrow_assets="1",
+        supply_assets_usd=usd,
+        borrow_assets_usd=usd,
+    )
+
+
+def test_aggregate3_abi_round_trip():
+    calls = [(MORPHO, MARKET_SELECTOR + market_id_word(key(7))), (MULTICALL3_ADDRESS, b""), (MORPHO, bytes(range(70)))]
+    encoded = encode_aggregate3(calls)
+    assert encoded[:4] == AGGREGATE3_SELECTOR
+    assert (len(encoded) - 4) % 32 == 0
+    assert decode_calls(encoded[4:]) == [(target, True, data) for target, data in calls]
+
+    single = encode_aggregate3([(MORPHO, b"\x01\x02")])
+    expected = word(32) + word(1) + word(32) + bytes(12) + bytes.fromhex(MORPHO[2:]) + word(1) + word(96) + word(2)
+    assert single[4:] == expected + b"\x01\x02" + bytes(30)
+
+    results = [(True, word(5)), (False, b""), (True, b""), (True, bytes(range(33)))]
+    assert decode_aggregate3(encode_results(results)) == [word(5), None, b"", bytes(range(33))]
+    assert decode_aggregate3(encode_results([])) == []
+
+
+def test_read_market_states_across_requests_and_batches():
+    states = {key(index): (1_000 * index, 400 * index) for index in range(7)}
+    node = FakeNode(states, reverted=[key(2)], empty=[key(5)])
+    reader = MulticallReader(node, multicall_size=2, batch_size=2, max_workers=2)
+    keys = [key(index) for index in range(7)] + [key(99)]
+    result = read_market_states(reader, MORPHO, keys)
+    expected = [states[key(index)] for index in range(7)] + [(0, 0)]
+    expected[2] = expected[5] = None
+    assert result == expected
+    # One eth_blockNumber, then four aggregate3 requests in two batches, all at that block.
+    assert [len(batch) for batch in node.batches] == [1, 2, 2]
+    assert reader.block == BLOCK
+
+
+@pytest.mark.parametrize("reply", [lambda results: "0x", lambda results: "0x" + encode_results(results[:-1]).hex()])
+def test_short_multicall_reply_is_rejected(reply):
+    node = FakeNode({key(index): (index, index) for index in range(3)}, reply=reply)
+    with pytest.raises(RuntimeError, match="results for"):
+        read_market_states(MulticallReader(node), MORPHO, [key(index) for index in range(3)])
+
+
+def test_rpc_error_is_raised():
+    def failing(batch):
+        return [{"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32000, "message": "boom"}} for request in batch]
+
+    with pytest.raises(RuntimeError, match="RPC error for eth_blockNumber"):
+        read_market_states(MulticallReader(failing), MORPHO, [key(1)])
+
+
+def abi_string(text: str) -> bytes:
+    raw = text.encode()
+    return word(32) + word(len(raw)) + raw + bytes(-len(raw) % 32)
+
+
+def test_decode_symbol_handles_string_and_bytes32_returns():
+    assert decode_symbol(abi_string("USDC")) == "USDC"
+    assert decode_symbol(abi_string("A" * 40)) == "A" * 40
+    assert decode_symbol(b"MKR".ljust(32, b"\0")) == "MKR"
+    assert decode_symbol(b"") is None and decode_symbol(None) is None
+
+
+LOAN = "0x" + "aa" * 20
+COLLATERAL = "0x" + "bb" * 20
+OLD_TOKEN = "0x" + "cc" * 20
+ORACLE = "0x" + "dd" * 20
+
+
+def chain_node(**kwargs) -> FakeNode:
+    return FakeNode(
+        {key(0): (5_000_000, 2_000_000), key(1): (3 * 10**18, 10**18), key(2): (1, 1)},
+        params={key(0): (LOAN, COLLATERAL, ORACLE), key(1): (OLD_TOKEN, LOAN, ZERO_ADDRESS), key(2): (LOAN, ZERO_ADDRESS, ZERO_ADDRESS)},
+        tokens={LOAN: (abi_string("USDC"), 6), COLLATERAL: (b"MKR".ljust(32, b"\0"), 18), OLD_TOKEN: (None, None)},
+        **kwargs,
+    )
+
+
+def test_fetch_rpc_markets_for_chain_builds_markets_from_chain_state():
+    node = chain_node()
+    markets = fetch_rpc_markets_for_chain(
+        1, [key(0), key(1), key(2), key(3)], prices={(1, LOAN): 2.0}, transport=node, block=BLOCK
+    )
+
+    assert [market.unique_key for market in markets] == [key(0), key(1)]
+    first, second = markets
+    assert (first.loan_asset_address, first.collateral_asset_address, first.oracle_address) == (LOAN, COLLATERAL, ORACLE)
+    assert (first.loan_asset_symbol, first.loan_asset_decimals, first.collateral_asset_symbol) == ("USDC", 6, "MKR")
+    assert (first.supply_assets, first.borrow_assets) == ("5000000", "2000000")
+    assert (first.supply_assets_usd, first.borrow_assets_usd) == (10.0, 4.0)
+    # A token without symbol()/decimals() reads as UNKNOWN with 18 decimals; no price leaves USD unset.
+    assert (second.loan_asset_symbol, second.loan_asset_decimals, second.collateral_asset_symbol) == ("UNKNOWN", 18, "USDC")
+    assert second.oracle_address == "" and second.supply_assets_usd is None
+    # Params, states and token reads share one block; no eth_blockNumber with a pinned block.
+    assert all(request["method"] == "eth_call" for batch in node.batches for request in batch)
+
+
+def test_fetch_rpc_markets_rebuilds_chains_with_a_transport():
+    api = [market(0), market(3, chain_id=8453), market(1), market(2), market(5)]
+    node = chain_node(reverted=[key(5)])
+    rebuilt = fetch_rpc_markets(api, {(1, LOAN): 1.0}, transports={1: node})
+
+    # Chain 1 comes from chain state (the idle and reverted markets are dropped); Base keeps the API markets.
+    assert [(market.chain_id, market.unique_key) for market in rebuilt] == [(1, key(0)), (1, key(1)), (8453, key(3))]
+    assert rebuilt[0].loan_asset_address == LOAN and rebuilt[0].supply_assets_usd == 5.0
+    assert rebuilt[2] == api[1]
+
+
+def test_rpc_state_source_builds_the_universe_from_chain_state(monkeypatch):
+    # The API's view is stale: no oracle and a far smaller borrow; market 2 is idle on chain.
+    stale = replace(market(0), loan_asset_address=LOAN, oracle_address="", supply_assets="1000000", borrow_assets="1", borrow_assets_usd=1e-6)
+    api = [stale, market(2)]
+    node = chain_node()
+    monkeypatch.setattr(store_module, "_default_store", MarketDataStore())
+    monkeypatch.setattr(morpho, "fetch_morpho_markets_for_chain", lambda chain_id: api if chain_id == 1 else [])
+    monkeypatch.setattr(monarch, "fetch_monarch_market_oracles", lambda keys: pytest.fail("chain state has every oracle"))
+    monkeypatch.setattr(rpc, "chain_transport", lambda chain_id: node)
+    monkeypatch.setenv("RPC_URL_1", "http://node.test")
+
+    table = pipeline.fetch_live_market_table(min_borrow_usd=1.5, chains=[1], state_source="rpc")
+    assert [(market.unique_key, market.oracle_address, market.borrow_assets) for market in table] == [(key(0), ORACLE, "2000000")]
+    # USD from the API's price of 1 USD per USDC.
+    assert table.market(0).borrow_assets_usd == pytest.approx(2.0)
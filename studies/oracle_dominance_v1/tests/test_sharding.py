@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+import pytest
+
+from studies.oracle_dominance_v1 import pipeline, run, sharding
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.sharding import ShardSpec, merge_v1_shards, run_v1_shard
+
+VENDORS = ["Chainlink", "Redstone", "Pyth", "Chronicle"]
+CHAINS = [1, 8453, 42161]
+DAY = 86_400
+END_TS = int(time.time()) // DAY * DAY
+RUN = {"days": 10, "windows": [5], "repricing": "historical", "allocation_schemes": ["per_leg"]}
+
+
+def make_markets(count: int = 24) -> list[MarketRef]:
+    rng = random.Random(3)
+    markets = []
+    for index in range(count):
+        units = rng.uniform(1e5, 5e7)
+        price = [1.0, 3000.0, 60000.0][index % 3]
+        markets.append(
+            MarketRef(
+                unique_key=f"0x{index:064x}",
+                chain_id=CHAINS[index % 3],
+                oracle_address=f"0xo{index % 7:039x}",
+                loan_asset_address=f"0xloan{index % 3}",
+                loan_asset_symbol=["USDC", "WETH", "WBTC"][index % 3],
+                loan_asset_decimals=6,
+                collateral_asset_address=f"0xcol{index % 5}",
+                collateral_asset_symbol=f"C{index % 5}",
+                supply_assets=str(int(units * 1e6)),
+                borrow_assets=str(int(units * 0.7e6)),
+                supply_assets_usd=units * price * rng.uniform(0.97, 1.03),
+                borrow_assets_usd=units * 0.7 * price,
+            )
+        )
+    return markets
+
+
+def make_metadata(markets: list[MarketRef]) -> dict[tuple[int, str], dict]:
+    metadata = {}
+    for market in markets:
+        oracle = int(market.oracle_address[3:], 16)
+        feeds = {
+            "baseFeedOne": {"provider": VENDORS[oracle % 4], "pair": ["ETH", "USD"]},
+            "quoteFeedOne": {"provider": VENDORS[(oracle * 3 + 1) % 4], "pair": ["USDC", "USD"]},
+        }
+        metadata[(market.chain_id, market.oracle_address)] = {"type": "standard", "data": feeds}
+    return metadata
+
+
+# Irrational-looking values and a skipped day every ninth day, so float order and gap
+# filling both matter.
+def fake_history(unique_key: str, chain_id: int, days: int = 180, interval: str = "DAY") -> list[dict]:
+    index = int(unique_key, 16)
+    rng = random.Random(index)
+    base = rng.uniform(1e4, 5e7)
+    price = [1.0, 2900.0, 59000.0][index % 3] * rng.uniform(0.9, 1.1)
+    rows = []
+    for day in range(days + 1):
+        if index % 4 == 0 and day % 9 == 4:
+            continue
+        units = base * (1 + day / 365)
+        rows.append(
+            {
+                "timestamp": END_TS - (days - day) * DAY,
+                "supplyAssets": str(int(units * 1e6)),
+                "borrowAssets": str(int(units * 0.6e6)),
+                "supplyAssetsUsd": units * price,
+                "borrowAssetsUsd": units * 0.6 * price,
+            }
+        )
+    return rows
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    markets = make_markets()
+    monkeypatch.setattr(
+        pipeline, "fetch_morpho_markets_for_chain", lambda chain_id: [m for m in markets if m.chain_id == chain_id]
+    )
+    monkeypatch.setattr(pipeline, "fetch_oracle_metadata_for_chains", lambda chains, store=None: make_metadata(markets))
+    monkeypatch.setattr(pipeline, "iter_market_history", fake_history)
+    monkeypatch.setattr(sharding, "iter_market_history", fake_history)
+    return markets
+
+
+def run_shards(tmp_path, count: int, by: str) -> dict:
+    paths = [
+        run_v1_shard(tmp_path / f"partial_{index}.json", ShardSpec.parse(f"{index}/{count}", by), **RUN)["partial_output"]
+        for index in range(count)
+    ]
+    return merge_v1_shards(tmp_path / "merged", reversed(paths))
+
+
+def output_files(directory) -> dict[str, bytes]:
+    return {path.name: path.read_bytes() for path in sorted(directory.iterdir()) if path.is_file()}
+
+
+def test_chain_shards_merge_bit_identical_to_single_process(universe, tmp_path):
+    pipeline.run_v1(tmp_path / "single", **RUN)
+    run_shards(tmp_path, 2, "chain")
+    single = output_files(tmp_path / "single")
+    merged = output_files(tmp_path / "merged")
+    assert "vendor_dominance_10d_per_leg.csv" in single
+    assert merged.keys() == single.keys()
+    for name, content in single.items():
+        assert merged[name] == content, name
+
+
+def test_hash_shards_merge_to_the_same_rows(universe, tmp_path):
+    pipeline.run_v1(tmp_path / "single", **RUN)
+    run_shards(tmp_path, 3, "hash")
+    for name in ("vendor_dominance_current.csv", "vendor_dominance_10d.csv", "vendor_dominance_5d.csv"):
+        single = (tmp_path / "single" / name).read_text().splitlines()
+        merged = (tmp_path / "merged" / name).read_text().splitlines()
+        assert len(merged) == len(single)
+        for expected, actual in zip(single, merged):
+            *expected_keys, expected_value = expected.split(",")
+            *actual_keys, actual_value = actual.split(",")
+            assert actual_keys == expected_keys
+            if expected_value != actual_value:
+                assert float(actual_value) == pytest.approx(float(expected_value), rel=1e-12, abs=0.02)
+
+
+def test_shard_rejects_streaming(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["run", "--shard", "0/2", "--streaming"])
+    with pytest.raises(SystemExit):
+        run.main()
+    assert "--shard cannot be combined with --streaming" in capsys.readouterr().err
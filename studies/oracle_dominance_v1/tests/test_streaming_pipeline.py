@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import csv
+import time
+
+import pytest
+
+from studies.market_data import store as store_module
+from studies.market_data.clients import monarch, morpho, oracle_gist
+from studies.market_data.store import MarketDataStore
+from studies.oracle_dominance_v1 import pipeline
+from studies.oracle_dominance_v1.models import MarketRef
+from studies.oracle_dominance_v1.streaming_pipeline import run_v1_streaming
+
+DAY = 86_400
+VENDORS = ["Chainlink", "Redstone", "Pyth", "Chronicle"]
+CHAINS = {1: 7, 8453: 5}
+
+
+def market(chain_id: int, index: int) -> MarketRef:
+    return MarketRef(
+        unique_key=f"0x{chain_id:016x}{index:048x}",
+        chain_id=chain_id,
+        # Every fourth market has no oracle in the API and is backfilled from Monarch.
+        oracle_address="" if index % 4 == 3 else f"0xo{index % 3:039x}",
+        loan_asset_address=f"0xloan{index % 2}",
+        loan_asset_symbol=["USDC", "WETH"][index % 2],
+        loan_asset_decimals=[6, 18][index % 2],
+        collateral_asset_address="0xcollateral",
+        collateral_asset_symbol="WBTC",
+        supply_assets=str(10 ** [6, 18][index % 2] * (index + 1) * 1_000),
+        borrow_assets=str(10 ** [6, 18][index % 2] * (index + 1) * 400),
+        supply_assets_usd=[1.0, 3_000.0][index % 2] * (index + 1) * 1_000,
+        # Market 0 on each chain sits below the borrow cutoff.
+        borrow_assets_usd=[1.0, 3_000.0][index % 2] * (index + 1) * 400 * (index > 0),
+    )
+
+
+def pages(chain_id: int):
+    markets = [market(chain_id, index) for index in range(CHAINS.get(chain_id, 0))]
+    for start in range(0, len(markets), 3):
+        yield markets[start:start + 3]
+
+
+def metadata(chain_ids: list[int]) -> dict[tuple[int, str], dict]:
+    oracles = {}
+    for chain_id in chain_ids:
+        for oracle in range(4):
+            feeds = {"baseFeedOne": {"provider": VENDORS[oracle], "pair": ["ETH", "USD"]}}
+            if oracle % 2:
+                feeds["quoteFeedOne"] = {"provider": VENDORS[(oracle + chain_id) % 4], "pair": ["USDC", "USD"]}
+            if oracle == 2:
+                feeds["baseVault"] = {"pair": ["SUSDE", "USDE"]}
+            oracles[(chain_id, f"0xo{oracle:039x}")] = {"type": "standard", "data": feeds}
+    return oracles
+
+
+def history(unique_key: str, chain_id: int, days: int = 180, interval: str = "DAY") -> list[dict]:
+    index = int(unique_key[18:], 16)
+    decimals = [6, 18][index % 2]
+    today = int(time.time()) // DAY * DAY
+    rows = []
+    for day in range(days, -1, -1):
+        # A gap on some markets exercises the fill before aggregation.
+        if index % 3 == 1 and day == 4:
+            continue
+        units = (index + 1) * 1_000 * (1 + day / 50)
+        price = [1.0, 3_000.0 - 10 * day][index % 2]
+        rows.append(
+            {
+                "timestamp": today - day * DAY,
+                "supplyAssets": str(int(units * 10**decimals)),
+                "borrowAssets": str(int(units * 0.4 * 10**decimals)),
+                "supplyAssetsUsd": units * price,
+                "borrowAssetsUsd": units * 0.4 * price,
+            }
+        )
+    return rows
+
+
+@pytest.fixture
+def stubbed_sources(monkeypatch):
+    monkeypatch.setattr(morpho, "iter_morpho_market_pages", pages)
+    monkeypatch.setattr(morpho, "fetch_morpho_markets_for_chain", lambda chain_id: [m for page in pages(chain_id) for m in page])
+    monkeypatch.setattr(morpho, "fetch_market_history", history)
+    monkeypatch.setattr(oracle_gist, "fetch_oracle_metadata", metadata)
+    universe = {(chain_id, market(chain_id, index).unique_key): f"0xo{index % 3:039x}" for chain_id, count in CHAINS.items() for index in range(count)}
+    monkeypatch.setattr(monarch, "fetch_monarch_market_universe", lambda: dict(universe))
+
+    def lookup(keys):
+        return {key: universe[key] for key in keys if key in universe}
+
+    monkeypatch.setattr(monarch, "fetch_monarch_market_oracles", lookup)
+    monkeypatch.setenv("MONARCH_INDEXER_ENDPOINT", "http://monarch.test")
+
+
+def read_csv(path) -> list[list[str]]:
+    with path.open(encoding="utf-8", newline="") as handle:
+        return list(csv.reader(handle))
+
+
+def assert_same_cells(staged: list[list[str]], streamed: list[list[str]]) -> None:
+    assert len(staged) == len(streamed)
+    for staged_row, streamed_row in zip(staged, streamed):
+        assert len(staged_row) == len(streamed_row)
+        for staged_cell, streamed_cell in zip(staged_row, streamed_row):
+            try:
+                # Histories are summed in completion order, so totals may differ in the last bits.
+                assert float(streamed_cell) == pytest.approx(float(staged_cell), rel=1e-12, abs=0.01)
+            except ValueError:
+                assert streamed_cell == staged_cell
+
+
+@pytest.mark.parametrize("options", [{}, {"require_listed": True, "allocation_schemes": ["per_leg", "base_quote"], "windows": [5]}])
+def test_streaming_run_writes_the_staged_outputs(stubbed_sources, monkeypatch, tmp_path, options):
+    kwargs = {"days": 10, "min_borrow_usd": 1_000, **options}
+    monkeypatch.setattr(store_module, "_default_store", MarketDataStore())
+    staged = pipeline.run_v1(tmp_path / "staged", **kwargs)
+    monkeypatch.setattr(store_module, "_default_store", MarketDataStore())
+    streamed = run_v1_streaming(tmp_path / "streamed", concurrency=3, **kwargs)
+
+    for key in ("market_count", "metadata_count", "price_count", "current_row_count", "filters"):
+        assert streamed[key] == staged[key]
+    assert staged["market_count"] == sum(CHAINS.values()) - len(CHAINS)
+    staged_csvs = sorted(path.name for path in (tmp_path / "staged").glob("*.csv"))
+    assert staged_csvs == sorted(path.name for path in (tmp_path / "streamed").glob("*.csv"))
+    assert "vendor_dominance_10d.csv" in staged_csvs
+    for name in staged_csvs:
+        assert_same_cells(read_csv(tmp_path / "staged" / name), read_csv(tmp_path / "streamed" / name))
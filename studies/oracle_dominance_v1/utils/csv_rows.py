@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+
+# Stream dict rows to CSV under a fixed header, holding one row at a time, and return
+# the row count. Each row is also passed to `observers`, so summary numbers can be
+# gathered in the same pass. Rows with keys outside `fields` are rejected. As before,
+# an empty stream leaves an empty file rather than a bare header.
+def write_csv_rows(
+    path: str | Path,
+    rows: Iterable[dict],
+    fields: Sequence[str],
+    observers: Iterable[Callable[[dict], None]] = (),
+) -> int:
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    observers = tuple(observers)
+    count = 0
+    with target.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=list(fields))
+        for row in rows:
+            if not count:
+                writer.writeheader()
+            writer.writerow(row)
+            for observe in observers:
+                observe(row)
+            count += 1
+    return count
+
+
+class ColumnTotals:
+    """Row count and per-column sums; pass `add` as an observer of a row stream."""
+
+    def __init__(self, columns: Iterable[str] = ()) -> None:
+        self.rows = 0
+        self.sums = dict.fromkeys(columns, 0.0)
+
+    def add(self, row: dict) -> None:
+        self.rows += 1
+        for column in self.sums:
+            self.sums[column] += float(row[column] or 0)
@@ -3,7 +3,8 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-from studies.oracle_dominance_v1.config import DEFAULT_ORACLE_GIST_BASE_URL, REPO_ROOT
+from studies.market_data.env import env
+from studies.oracle_dominance_v1.config import MORPHO_BLUE_ADDRESSES, REPO_ROOT
 
 
 def load_local_env() -> None:
@@ -24,36 +25,13 @@ def load_local_env() -> None:
             os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
 
 
-def env(name: str) -> str | None:
-    value = os.getenv(name)
-    return value.strip() if value else None
+# JSON-RPC endpoint for one chain, e.g. RPC_URL_1 or RPC_URL_8453 (a local dev node works too).
+def rpc_url(chain_id: int) -> str | None:
+    return env(f"RPC_URL_{chain_id}")
 
 
-def monarch_api_url() -> str:
-    for key in (
-        "MONARCH_INDEXER_ENDPOINT",
-        "MONARCH_API_ENDPOINT",
-        "NEXT_PUBLIC_MONARCH_API_NEW",
-        "MONARCH_API_URL",
-        "MONARCH_GRAPHQL_API_URL",
-    ):
-        value = env(key)
-        if value:
-            return value
-    raise RuntimeError("Monarch endpoint not configured. Set MONARCH_INDEXER_ENDPOINT or MONARCH_API_ENDPOINT locally.")
-
-
-def monarch_api_key() -> str | None:
-    for key in ("MONARCH_API_KEY", "NEXT_PUBLIC_MONARCH_API_KEY", "MONARCH_GRAPHQL_API_KEY"):
-        value = env(key)
-        if value:
-            return value
-    return None
-
-
-def oracle_gist_base_url() -> str:
-    for key in ("ORACLE_GIST_BASE_URL", "NEXT_PUBLIC_ORACLE_GIST_BASE_URL"):
-        value = env(key)
-        if value:
-            return value.rstrip("/")
-    return DEFAULT_ORACLE_GIST_BASE_URL
+def morpho_blue_address(chain_id: int) -> str:
+    value = env(f"MORPHO_BLUE_ADDRESS_{chain_id}") or MORPHO_BLUE_ADDRESSES.get(chain_id)
+    if not value:
+        raise RuntimeError(f"Morpho Blue address not configured for chain {chain_id}. Set MORPHO_BLUE_ADDRESS_{chain_id} locally.")
+    return value.lower()